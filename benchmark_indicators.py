@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+流式指标性能测试
+
+对比三种在 on_bar 中维护均线的方式：
+1. 列表 append + pop(0)，每根 K 线重新求和（SimpleDoubleMaStrategy 原实现）
+2. np.append 追加后取窗口求均值（BACKTESTING_OPTIMIZATION.md 原示例）
+3. strategies.indicators 中基于环形缓冲区的 O(1) 指标
+
+并用 talib 校验各流式指标与 ArrayManager 的计算结果一致。
+"""
+import sys
+import time
+
+import numpy as np
+import talib
+
+from strategies.indicators import (
+    AtrIndicator,
+    EmaIndicator,
+    MaxIndicator,
+    MinIndicator,
+    RsiIndicator,
+    SmaIndicator,
+    StdIndicator
+)
+
+# np.append 每根 K 线重新分配数组, 总耗时随数据量平方增长
+BAR_COUNT = 50_000
+WINDOWS = [10, 30, 120]
+
+def generate_prices(count: int):
+    """随机游走生成 K 线价格"""
+    rng = np.random.default_rng(0)
+    close = 3500 + np.cumsum(rng.normal(0, 2, count))
+    high = close + rng.random(count) * 3
+    low = close - rng.random(count) * 3
+    return high, low, close
+
+def run_list(close: list, window: int) -> float:
+    data = []
+    value = 0.0
+    for price in close:
+        data.append(price)
+        if len(data) > window:
+            data.pop(0)
+        if len(data) >= window:
+            value = sum(data[-window:]) / window
+    return value
+
+def run_np_append(close: list, window: int) -> float:
+    data = np.array([])
+    value = 0.0
+    for price in close:
+        data = np.append(data, price)
+        if len(data) >= window:
+            value = np.mean(data[-window:])
+    return value
+
+def run_ring_buffer(close: list, window: int) -> float:
+    sma = SmaIndicator(window)
+    value = 0.0
+    for price in close:
+        value = sma.update(price)
+    return value
+
+def benchmark():
+    """均线计算耗时对比"""
+    _, _, close = generate_prices(BAR_COUNT)
+    prices = close.tolist()
+
+    print("=" * 80)
+    print(f"均线计算耗时（{BAR_COUNT} 根 K 线）")
+    print("=" * 80)
+    print(f"{'窗口':>6} {'列表 pop(0)':>14} {'np.append':>14} {'环形缓冲区':>14}")
+
+    for window in WINDOWS:
+        results = []
+        timings = []
+        for func in (run_list, run_np_append, run_ring_buffer):
+            start = time.perf_counter()
+            results.append(func(prices, window))
+            timings.append(time.perf_counter() - start)
+
+        assert max(results) - min(results) < 1e-6
+        print(f"{window:>6} {timings[0]:>13.3f}s {timings[1]:>13.3f}s {timings[2]:>13.3f}s")
+
+def check(name: str, stream: np.ndarray, expected: np.ndarray, window: int):
+    """对比流式指标与 talib 在初始化完成后的结果"""
+    mask = ~np.isnan(expected)
+    error = np.max(np.abs(stream[mask] - expected[mask]))
+    status = "OK" if error < 1e-6 else "FAIL"
+    print(f"{name:<6} window={window:<4} 最大误差 {error:.2e} {status}")
+    return status == "OK"
+
+def validate():
+    """与 talib 计算结果对比"""
+    high, low, close = generate_prices(20_000)
+    window = 14
+
+    indicators = {
+        "SMA": (SmaIndicator(window), talib.SMA(close, window)),
+        "EMA": (EmaIndicator(window), talib.EMA(close, window)),
+        "STD": (StdIndicator(window), talib.STDDEV(close, window)),
+        "ATR": (AtrIndicator(window), talib.ATR(high, low, close, window)),
+        "MAX": (MaxIndicator(window), talib.MAX(close, window)),
+        "MIN": (MinIndicator(window), talib.MIN(close, window)),
+        "RSI": (RsiIndicator(window), talib.RSI(close, window)),
+    }
+
+    print()
+    print("=" * 80)
+    print("与 talib 结果对比")
+    print("=" * 80)
+
+    success = True
+    for name, (indicator, expected) in indicators.items():
+        values = np.zeros(len(close))
+        for i in range(len(close)):
+            if name == "ATR":
+                values[i] = indicator.update(high[i], low[i], close[i])
+            else:
+                values[i] = indicator.update(close[i])
+        success &= check(name, values, expected, window)
+    return success
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding="utf-8")
+    benchmark()
+    if not validate():
+        sys.exit(1)
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+流式指标库
+
+每根 K 线调用 update 更新一次, 更新复杂度为 O(1), 窗口数据保存在预分配的
+NumPy 环形缓冲区中, 回放过程中不产生新的列表或数组。计算方式与
+ArrayManager 使用的 talib 函数一致: 标准差为总体标准差, ATR 和 RSI 使用
+Wilder 平滑。数据不足一个窗口时 inited 为 False, value 为 0。
+"""
+from collections import deque
+
+import numpy as np
+
+# 累加和每隔固定次数更新按缓冲区重新计算, 消除浮点累加误差
+RESYNC_INTERVAL = 1024
+
+class RingBuffer:
+    """定长环形缓冲区, 写满后覆盖最早的数据"""
+
+    def __init__(self, size: int):
+        if size <= 0:
+            raise ValueError(f"窗口长度必须为正数: {size}")
+
+        self.size = size
+        self.data = np.zeros(size)
+        self.index = 0
+        self.count = 0
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.size
+
+    def append(self, value: float) -> float:
+        """写入新数据, 返回被覆盖的数据, 未写满时返回 0"""
+        index = self.index
+        evicted = self.data.item(index)
+        self.data[index] = value
+
+        index += 1
+        self.index = 0 if index == self.size else index
+        self.count += 1
+        return evicted
+
+    def last(self) -> float:
+        """最新写入的数据"""
+        return float(self.data[self.index - 1])
+
+    def to_array(self) -> np.ndarray:
+        """按时间顺序返回窗口内数据"""
+        if not self.full:
+            return self.data[:self.count].copy()
+        return np.concatenate((self.data[self.index:], self.data[:self.index]))
+
+class SmaIndicator:
+    """简单移动平均, 维护窗口内累加和"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buffer = RingBuffer(window)
+        self.total = 0.0
+        self.value = 0.0
+
+    @property
+    def inited(self) -> bool:
+        return self.buffer.full
+
+    def update(self, value: float) -> float:
+        buffer = self.buffer
+        self.total += value - buffer.append(value)
+
+        # 定期重新求和, 均摊仍为 O(1)
+        if buffer.count % RESYNC_INTERVAL == 0:
+            self.total = float(buffer.data.sum())
+
+        if buffer.count >= self.window:
+            self.value = self.total / self.window
+        return self.value
+
+class EmaIndicator:
+    """指数移动平均, 以首个窗口的简单平均作为初始值"""
+
+    def __init__(self, window: int):
+        if window <= 0:
+            raise ValueError(f"窗口长度必须为正数: {window}")
+
+        self.window = window
+        self.alpha = 2 / (window + 1)
+        self.count = 0
+        self.total = 0.0
+        self.value = 0.0
+
+    @property
+    def inited(self) -> bool:
+        return self.count >= self.window
+
+    def update(self, value: float) -> float:
+        self.count += 1
+        if self.count < self.window:
+            self.total += value
+        elif self.count == self.window:
+            self.value = (self.total + value) / self.window
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+class StdIndicator:
+    """滚动总体标准差, 按 Welford 方法维护窗口均值及离差平方和
+
+    价格远大于波动幅度时, 平方和减均值平方会抵消掉大部分有效数字,
+    离差平方和不受价格水平影响。
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buffer = RingBuffer(window)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.value = 0.0
+
+    @property
+    def inited(self) -> bool:
+        return self.buffer.full
+
+    def update(self, value: float) -> float:
+        buffer = self.buffer
+        full = buffer.full
+        evicted = buffer.append(value)
+
+        if full:
+            # 新数据替换最早的数据, 窗口长度不变
+            delta = value - evicted
+            mean = self.mean + delta / self.window
+            self.m2 += delta * (value - mean + evicted - self.mean)
+            self.mean = mean
+        else:
+            delta = value - self.mean
+            self.mean += delta / buffer.count
+            self.m2 += delta * (value - self.mean)
+
+        if buffer.count % RESYNC_INTERVAL == 0:
+            data = buffer.data if buffer.full else buffer.data[:buffer.count]
+            self.mean = float(data.mean())
+            deviation = data - self.mean
+            self.m2 = float(np.dot(deviation, deviation))
+
+        if buffer.count >= self.window:
+            self.value = max(self.m2 / self.window, 0.0) ** 0.5
+        return self.value
+
+class AtrIndicator:
+    """平均真实波幅, Wilder 平滑, 首个值为前 window 个真实波幅的平均"""
+
+    def __init__(self, window: int):
+        if window <= 0:
+            raise ValueError(f"窗口长度必须为正数: {window}")
+
+        self.window = window
+        self.pre_close = None
+        self.count = 0
+        self.total = 0.0
+        self.value = 0.0
+
+    @property
+    def inited(self) -> bool:
+        return self.count >= self.window
+
+    def update(self, high: float, low: float, close: float) -> float:
+        # 首根 K 线没有前收盘价, 只记录收盘价
+        if self.pre_close is None:
+            self.pre_close = close
+            return self.value
+
+        tr = max(high - low, abs(high - self.pre_close), abs(low - self.pre_close))
+        self.pre_close = close
+
+        self.count += 1
+        if self.count < self.window:
+            self.total += tr
+        elif self.count == self.window:
+            self.value = (self.total + tr) / self.window
+        else:
+            self.value = (self.value * (self.window - 1) + tr) / self.window
+        return self.value
+
+class MaxIndicator:
+    """滚动最大值, 单调递减队列, 均摊 O(1)"""
+
+    def __init__(self, window: int):
+        if window <= 0:
+            raise ValueError(f"窗口长度必须为正数: {window}")
+
+        self.window = window
+        self.queue = deque()
+        self.count = 0
+        self.value = 0.0
+
+    @property
+    def inited(self) -> bool:
+        return self.count >= self.window
+
+    def update(self, value: float) -> float:
+        queue = self.queue
+        while queue and queue[-1][1] <= value:
+            queue.pop()
+        queue.append((self.count, value))
+
+        # 移出已离开窗口的数据
+        if queue[0][0] <= self.count - self.window:
+            queue.popleft()
+
+        self.count += 1
+        if self.inited:
+            self.value = queue[0][1]
+        return self.value
+
+class MinIndicator:
+    """滚动最小值, 单调递增队列, 均摊 O(1)"""
+
+    def __init__(self, window: int):
+        if window <= 0:
+            raise ValueError(f"窗口长度必须为正数: {window}")
+
+        self.window = window
+        self.queue = deque()
+        self.count = 0
+        self.value = 0.0
+
+    @property
+    def inited(self) -> bool:
+        return self.count >= self.window
+
+    def update(self, value: float) -> float:
+        queue = self.queue
+        while queue and queue[-1][1] >= value:
+            queue.pop()
+        queue.append((self.count, value))
+
+        if queue[0][0] <= self.count - self.window:
+            queue.popleft()
+
+        self.count += 1
+        if self.inited:
+            self.value = queue[0][1]
+        return self.value
+
+class RsiIndicator:
+    """相对强弱指数, Wilder 平滑, 首个值由前 window 个涨跌幅的平均计算"""
+
+    def __init__(self, window: int):
+        if window <= 0:
+            raise ValueError(f"窗口长度必须为正数: {window}")
+
+        self.window = window
+        self.pre_value = None
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.value = 0.0
+
+    @property
+    def inited(self) -> bool:
+        return self.count >= self.window
+
+    def update(self, value: float) -> float:
+        if self.pre_value is None:
+            self.pre_value = value
+            return self.value
+
+        change = value - self.pre_value
+        self.pre_value = value
+        gain = max(change, 0.0)
+        loss = max(-change, 0.0)
+
+        self.count += 1
+        if self.count <= self.window:
+            self.avg_gain += gain / self.window
+            self.avg_loss += loss / self.window
+        else:
+            self.avg_gain = (self.avg_gain * (self.window - 1) + gain) / self.window
+            self.avg_loss = (self.avg_loss * (self.window - 1) + loss) / self.window
+
+        if self.inited:
+            total = self.avg_gain + self.avg_loss
+            self.value = 100 * self.avg_gain / total if total else 0.0
+        return self.value
@@ -1,61 +1,83 @@
-
 # -*- coding: utf-8 -*-
-from vnpy_ctastrategy.base import CtaTemplate
+import numpy as np
+
+from vnpy_ctastrategy import CtaTemplate
 from vnpy.trader.object import BarData, TickData, OrderData, TradeData
-from vnpy.trader.constant import Interval
+
+from .indicators import SmaIndicator
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """滚动均值, 数据不足一个窗口的位置为 NaN"""
+    result = np.full(len(values), np.nan)
+    if window <= 0 or len(values) < window:
+        return result
+
+    cumsum = np.cumsum(np.insert(values, 0, 0.0))
+    result[window - 1:] = (cumsum[window:] - cumsum[:-window]) / window
+    return result
 
 class SimpleDoubleMaStrategy(CtaTemplate):
+    author = ""
+
     fast_window = 10
     slow_window = 30
     fixed_size = 1
 
+    fast_ma = 0.0
+    slow_ma = 0.0
+
+    parameters = ["fast_window", "slow_window", "fixed_size"]
+    variables = ["fast_ma", "slow_ma"]
+
     def __init__(self, cta_engine, strategy_name, vt_symbol, setting):
-        self.cta_engine = cta_engine
-        self.strategy_name = strategy_name
-        self.vt_symbol = vt_symbol
-        self.fast_data = []
-        self.slow_data = []
-
-    def on_init(self, cta_engine, strategy_name, vt_symbol, setting):
-        print(f"策略初始化: {strategy_name}")
-        self.cta_engine = cta_engine
-        self.strategy_name = strategy_name
-        self.vt_symbol = vt_symbol
+        super().__init__(cta_engine, strategy_name, vt_symbol, setting)
+        self.fast_sma = SmaIndicator(int(self.fast_window))
+        self.slow_sma = SmaIndicator(int(self.slow_window))
+
+    def on_init(self):
+        self.write_log("策略初始化")
 
     def on_start(self):
-        print(f"策略启动: {self.strategy_name}")
+        self.write_log("策略启动")
 
     def on_stop(self):
-        print(f"策略停止: {self.strategy_name}")
+        self.write_log("策略停止")
 
-    def on_tick(self, cta_engine, cta_tick):
+    def on_tick(self, tick: TickData):
         pass
 
-    def on_bar(self, cta_engine, cta_bar):
-        self.fast_data.append(cta_bar.close_price)
-        self.slow_data.append(cta_bar.close_price)
-
-        if len(self.fast_data) > self.fast_window:
-            self.fast_data.pop(0)
-        if len(self.slow_data) > self.slow_window:
-            self.slow_data.pop(0)
+    def on_bar(self, bar: BarData):
+        self.fast_ma = self.fast_sma.update(bar.close_price)
+        self.slow_ma = self.slow_sma.update(bar.close_price)
 
-        if len(self.fast_data) >= self.fast_window:
-            fast_ma = sum(self.fast_data[-self.fast_window:]) / self.fast_window
+        if not self.fast_sma.inited or not self.slow_sma.inited:
+            return
 
-            if len(self.slow_data) >= self.slow_window:
-                slow_ma = sum(self.slow_data[-self.slow_window:]) / self.slow_window
+        if self.fast_ma > self.slow_ma and self.pos == 0:
+            self.buy(bar.close_price, self.fixed_size)
+        elif self.fast_ma < self.slow_ma and self.pos > 0:
+            self.sell(bar.close_price, self.fixed_size)
 
-                if fast_ma > slow_ma and self.pos == 0:
-                    self.buy(cta_bar.close_price, self.fixed_size)
-                elif fast_ma < slow_ma and self.pos > 0:
-                    self.sell(cta_bar.close_price, self.fixed_size)
-
-    def on_order(self, cta_engine, cta_order):
+    def on_order(self, order: OrderData):
         pass
 
-    def on_trade(self, cta_engine, cta_trade):
+    def on_trade(self, trade: TradeData):
         pass
 
-    def on_position(self, cta_engine, cta_position):
-        pass
+    @classmethod
+    def vector_positions(cls, arrays: dict, setting: dict) -> np.ndarray:
+        """向量化回测信号: 每根 K 线收盘后的目标持仓
+
+        快线上穿慢线时持有 fixed_size 多头, 下穿时平仓, 相等时维持原持仓。
+        """
+        close = arrays["close"]
+        fast_ma = rolling_mean(close, int(setting["fast_window"]))
+        slow_ma = rolling_mean(close, int(setting["slow_window"]))
+
+        positions = np.where(fast_ma > slow_ma, setting["fixed_size"], np.where(fast_ma < slow_ma, 0.0, np.nan))
+
+        # 信号不明确的位置沿用上一个目标持仓
+        index = np.where(np.isnan(positions), 0, np.arange(len(positions)))
+        np.maximum.accumulate(index, out=index)
+        positions = positions[index]
+        return np.nan_to_num(positions)
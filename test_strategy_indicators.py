@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+流式指标测试
+
+测试内容:
+1. 各指标在不同窗口下与 talib 结果一致
+2. 窗口长度超过重新求和间隔时标准差仍正确
+3. 价格远大于波动幅度时标准差的精度
+4. 数据不足一个窗口时未初始化, 无效窗口长度
+"""
+import sys
+import traceback
+sys.stdout.reconfigure(encoding='utf-8')
+
+import numpy as np
+import talib
+
+from strategies.indicators import (
+    RESYNC_INTERVAL,
+    AtrIndicator,
+    EmaIndicator,
+    MaxIndicator,
+    MinIndicator,
+    RsiIndicator,
+    SmaIndicator,
+    StdIndicator
+)
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+def generate_prices(count: int, base: float = 3500, scale: float = 2):
+    """随机游走生成 K 线价格"""
+    rng = np.random.default_rng(0)
+    close = base + np.cumsum(rng.normal(0, scale, count))
+    high = close + rng.random(count) * scale
+    low = close - rng.random(count) * scale
+    return high, low, close
+
+def run(indicator, *columns) -> np.ndarray:
+    """逐根更新指标, 返回每根 K 线后的指标值"""
+    return np.array([indicator.update(*values) for values in zip(*columns)])
+
+def max_error(values: np.ndarray, expected: np.ndarray) -> float:
+    """talib 数据不足时为 NaN, 只比较初始化完成后的结果"""
+    mask = ~np.isnan(expected)
+    assert mask.any()
+    return float(np.max(np.abs(values[mask] - expected[mask])))
+
+def rolling_std(close: np.ndarray, window: int) -> np.ndarray:
+    """按窗口逐个计算总体标准差, 数据不足时为 NaN"""
+    result = np.full(len(close), np.nan)
+    for i in range(window - 1, len(close)):
+        result[i] = np.std(close[i - window + 1:i + 1])
+    return result
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_match_talib():
+    """与 ArrayManager 使用的 talib 函数结果一致"""
+    high, low, close = generate_prices(5000)
+
+    # talib 的窗口长度至少为 2
+    for window in (2, 5, 14, 60):
+        cases = {
+            "SMA": (run(SmaIndicator(window), close), talib.SMA(close, window)),
+            "EMA": (run(EmaIndicator(window), close), talib.EMA(close, window)),
+            "STD": (run(StdIndicator(window), close), talib.STDDEV(close, window)),
+            "ATR": (run(AtrIndicator(window), high, low, close), talib.ATR(high, low, close, window)),
+            "MAX": (run(MaxIndicator(window), close), talib.MAX(close, window)),
+            "MIN": (run(MinIndicator(window), close), talib.MIN(close, window)),
+            "RSI": (run(RsiIndicator(window), close), talib.RSI(close, window)),
+        }
+
+        for name, (values, expected) in cases.items():
+            error = max_error(values, expected)
+            assert error < 1e-6, f"{name} window={window} 最大误差 {error:.2e}"
+
+def test_std_long_window():
+    """缓冲区未写满时到达重新求和间隔, 只使用已写入的数据"""
+    window = RESYNC_INTERVAL * 2
+    _, _, close = generate_prices(window * 2)
+
+    error = max_error(run(StdIndicator(window), close), talib.STDDEV(close, window))
+    assert error < 1e-6, f"最大误差 {error:.2e}"
+
+def test_std_precision():
+    """价格在 1e8 附近、波动为 1 时, 与逐窗口计算的结果一致
+
+    平方和减均值平方的算法在此数据下误差达到 6 以上。
+    """
+    window = 20
+    _, _, close = generate_prices(3000, base=1e8, scale=1)
+
+    values = run(StdIndicator(window), close)
+    expected = rolling_std(close, window)
+    error = max_error(values, expected)
+    assert error < 1e-4, f"最大误差 {error:.2e}"
+
+def test_warm_up():
+    """数据不足一个窗口时 inited 为 False, value 为 0"""
+    indicators = [
+        SmaIndicator(3), EmaIndicator(3), StdIndicator(3),
+        MaxIndicator(3), MinIndicator(3), RsiIndicator(3)
+    ]
+    for indicator in indicators:
+        values = [indicator.update(price) for price in (10, 11)]
+        assert not indicator.inited and values == [0, 0], type(indicator).__name__
+
+    atr = AtrIndicator(3)
+    for high, low, close in [(11, 9, 10)] * 3:
+        atr.update(high, low, close)
+    assert not atr.inited and atr.value == 0
+
+    for cls in (SmaIndicator, EmaIndicator, StdIndicator, AtrIndicator, MaxIndicator, MinIndicator, RsiIndicator):
+        try:
+            cls(0)
+        except ValueError:
+            continue
+        raise AssertionError(f"{cls.__name__}(0) 应抛出 ValueError")
+
+TESTS = [
+    ("与 talib 结果一致", test_match_talib),
+    ("长窗口标准差", test_std_long_window),
+    ("标准差精度", test_std_precision),
+    ("初始化", test_warm_up),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def main() -> int:
+    print("=" * 80)
+    print("流式指标测试")
+    print("=" * 80)
+    print()
+
+    failed = 0
+    for name, func in TESTS:
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
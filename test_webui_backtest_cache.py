@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Web UI 回测缓存失效测试
+
+测试内容:
+1. 直接写入数据库后数据概要 (data_stamp) 变化
+2. 回测内容键包含数据概要及持久化的数据版本号
+3. 共享内存缓存键包含数据概要
+4. 数据概要缓存及写入后失效
+5. 提交回测的接口不在事件循环中执行
+
+测试数据写入 VnPy 数据库中专用的 LOCAL 合约, 结束后删除;
+回测结果存储使用临时目录。
+"""
+import inspect
+import os
+import shutil
+import sys
+import tempfile
+import traceback
+from datetime import datetime, timedelta
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 回测结果存储在导入时按配置创建, 需在导入前指定路径
+os.environ["BACKTEST_RESULT_PATH"] = tempfile.mkdtemp(prefix="webui_backtest_")
+# 直接写入数据库后立即读取新的数据概要
+os.environ["DATA_STAMP_TTL"] = "0"
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import get_database
+from vnpy.trader.object import BarData, TickData
+
+from app.api import backtest
+from app.core.backtest_jobs import get_cache_key
+from app.core.backtest_store import backtest_store
+from app.core.data_service import data_stamp_cache, get_data_stamp, save_bars
+from app.core.shared_bars import get_history_key
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+SYMBOL = "webui_cache_test"
+VT_SYMBOL = f"{SYMBOL}.{Exchange.LOCAL.value}"
+START = datetime(2024, 1, 2, 9, 0)
+
+def create_bars(first: int, count: int) -> list:
+    """从第 first 分钟开始的 count 根 1 分钟 K 线"""
+    return [
+        BarData(
+            gateway_name="DB",
+            symbol=SYMBOL,
+            exchange=Exchange.LOCAL,
+            datetime=START + timedelta(minutes=i),
+            interval=Interval.MINUTE,
+            open_price=100,
+            high_price=101,
+            low_price=99,
+            close_price=100,
+            volume=10
+        )
+        for i in range(first, first + count)
+    ]
+
+def create_config(**kwargs) -> dict:
+    """与 parse_backtest_config 输出格式相同的回测配置"""
+    config = {
+        "class_name": "DoubleMaStrategy",
+        "engine": "event",
+        "vt_symbol": VT_SYMBOL,
+        "interval": Interval.MINUTE.value,
+        "start": START.isoformat(),
+        "end": (START + timedelta(days=1)).isoformat(),
+        "rate": 0.0001,
+        "slippage": 0,
+        "size": 1,
+        "pricetick": 1,
+        "capital": 1_000_000,
+        "parameters": {},
+        "data_version": 0,
+        "data_stamp": get_data_stamp(VT_SYMBOL, Interval.MINUTE.value)
+    }
+    config.update(kwargs)
+    return config
+
+def clean_database():
+    database = get_database()
+    database.delete_bar_data(SYMBOL, Exchange.LOCAL, Interval.MINUTE)
+    database.delete_tick_data(SYMBOL, Exchange.LOCAL)
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_bar_stamp_follows_database():
+    """绕过 save_bars 直接写入数据库时, 数据概要随之变化"""
+    assert get_data_stamp(VT_SYMBOL, Interval.MINUTE.value) == ""
+
+    database = get_database()
+    database.save_bar_data(create_bars(0, 3))
+    first = get_data_stamp(VT_SYMBOL, Interval.MINUTE.value)
+    assert first.startswith("3:"), first
+
+    # 其他周期不受影响
+    assert get_data_stamp(VT_SYMBOL, Interval.HOUR.value) == ""
+
+    database.save_bar_data(create_bars(3, 2))
+    second = get_data_stamp(VT_SYMBOL, Interval.MINUTE.value)
+    assert second.startswith("5:"), second
+    assert second != first
+
+def test_tick_stamp_follows_database():
+    database = get_database()
+    assert get_data_stamp(VT_SYMBOL, Interval.TICK.value) == ""
+
+    tick = TickData(
+        gateway_name="DB",
+        symbol=SYMBOL,
+        exchange=Exchange.LOCAL,
+        datetime=START,
+        last_price=100
+    )
+    database.save_tick_data([tick])
+    assert get_data_stamp(VT_SYMBOL, Interval.TICK.value).startswith("1:")
+
+def test_cache_key_includes_stamp():
+    """数据概要或持久化版本号变化后, 相同配置的回测不再复用"""
+    get_database().save_bar_data(create_bars(0, 3))
+    config = create_config()
+    key = get_cache_key(config)
+    assert get_cache_key(create_config()) == key
+
+    get_database().save_bar_data(create_bars(3, 1))
+    changed = create_config()
+    assert changed["data_stamp"] != config["data_stamp"]
+    assert get_cache_key(changed) != key
+
+    # 提交时带入的内存版本号不参与内容键, 以存储中的版本号为准
+    assert get_cache_key(create_config(data_version=5)) == get_cache_key(changed)
+    backtest_store.increase_data_version(VT_SYMBOL)
+    assert get_cache_key(changed) != key
+
+def test_history_key_includes_stamp():
+    """共享内存缓存键随数据概要变化, 前四项为合约、周期及区间"""
+    config = create_config(data_stamp="3:a:b")
+    key = get_history_key(config)
+    assert key[:2] == (VT_SYMBOL, Interval.MINUTE.value)
+    assert key[3].endswith("23:59:59")
+    assert get_history_key(create_config(data_stamp="4:a:c")) != key
+    assert get_history_key(create_config(data_stamp="3:a:b")) == key
+
+def test_stamp_cache():
+    """缓存期内直接写入数据库的数据不可见, 通过 save_bars 写入时立即失效"""
+    database = get_database()
+    database.save_bar_data(create_bars(0, 3))
+    first = get_data_stamp(VT_SYMBOL, Interval.MINUTE.value)
+
+    data_stamp_cache.ttl = 3600
+    try:
+        database.save_bar_data(create_bars(3, 1))
+        assert get_data_stamp(VT_SYMBOL, Interval.MINUTE.value) == first
+
+        save_bars(create_bars(4, 1))
+        assert get_data_stamp(VT_SYMBOL, Interval.MINUTE.value).startswith("5:")
+    finally:
+        data_stamp_cache.ttl = 0
+
+def test_submit_handlers_not_async():
+    """提交回测需查询数据库及计算策略源码哈希, 在线程池中执行"""
+    for handler in (backtest.run_backtest, backtest.optimize_backtest, backtest.walk_forward_backtest):
+        assert not inspect.iscoroutinefunction(handler), handler.__name__
+
+TESTS = [
+    ("K 线数据概要", test_bar_stamp_follows_database),
+    ("Tick 数据概要", test_tick_stamp_follows_database),
+    ("回测内容键", test_cache_key_includes_stamp),
+    ("共享内存缓存键", test_history_key_includes_stamp),
+    ("数据概要缓存", test_stamp_cache),
+    ("提交接口不阻塞事件循环", test_submit_handlers_not_async),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI 回测缓存失效测试")
+    print("=" * 80)
+    print()
+
+    failed = 0
+    for name, func in TESTS:
+        clean_database()
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+    clean_database()
+    shutil.rmtree(os.environ["BACKTEST_RESULT_PATH"], ignore_errors=True)
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    code = main()
+    sys.stdout.flush()
+    # vnpy_engine 模块创建的 EventEngine 线程不会自行退出
+    os._exit(code)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Web UI 回测资金曲线测试
+
+测试内容:
+1. 逐 K 线资金曲线与逐笔累加的盈亏一致
+2. 逐级合并的分辨率点数递减, 最粗一级不超过 CHART_MIN_POINTS
+3. 合并区间保留末尾资金、资金最高/最低及最大回撤
+4. 日线及周线按逐日结果生成, 周线按周一分组
+5. 按查询区间选择分辨率
+
+不访问数据库, 直接构造资金序列。
+"""
+import sys
+import traceback
+from datetime import date, datetime, timedelta
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+import numpy as np
+import pandas as pd
+
+from app.core.backtest_chart import (
+    CHART_FACTOR,
+    CHART_MIN_POINTS,
+    RESOLUTION_BAR,
+    RESOLUTION_DAILY,
+    RESOLUTION_WEEKLY,
+    build_chart,
+    calculate_bar_equity,
+    get_level_order,
+    select_resolution,
+    to_epoch
+)
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+START = datetime(2024, 1, 2, 9, 0)
+CONFIG = {"size": 10, "rate": 0.0001, "slippage": 1, "capital": 1_000_000}
+
+def create_equity(count: int, seed: int = 0) -> tuple:
+    """随机游走的资金序列及 1 分钟间隔的时间戳"""
+    rng = np.random.default_rng(seed)
+    epoch = to_epoch(START) + np.arange(count, dtype=np.int64) * 60_000
+    equity = CONFIG["capital"] + np.cumsum(rng.normal(0, 100, count))
+    return epoch, equity
+
+def create_daily_df(days: int) -> pd.DataFrame:
+    """与 vnpy 逐日结果相同的 balance 及 drawdown 列"""
+    rng = np.random.default_rng(1)
+    index = [date(2024, 1, 1) + timedelta(days=i) for i in range(days)]
+    balance = CONFIG["capital"] + np.cumsum(rng.normal(0, 1000, days))
+    drawdown = balance - np.maximum.accumulate(balance)
+    return pd.DataFrame({"balance": balance, "drawdown": drawdown}, index=index)
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_bar_equity():
+    """逐根盯市的资金与逐笔累加的持仓盈亏、交易盈亏及费用一致"""
+    close = np.array([100, 102, 101, 105, 103, 108], dtype=float)
+    trade_index = np.array([1, 1, 3, 5])
+    trade_volume = np.array([2, 1, -3, -1], dtype=float)
+    trade_price = np.array([101, 102, 104, 107], dtype=float)
+
+    equity = calculate_bar_equity(np.arange(6), close, trade_index, trade_volume, trade_price, CONFIG)
+
+    size = CONFIG["size"]
+    pos = 0
+    balance = CONFIG["capital"]
+    expected = []
+    for i, price in enumerate(close):
+        if i:
+            balance += pos * (price - close[i - 1]) * size
+        for j in np.flatnonzero(trade_index == i):
+            volume = trade_volume[j]
+            balance += volume * (price - trade_price[j]) * size
+            balance -= abs(volume) * size * (trade_price[j] * CONFIG["rate"] + CONFIG["slippage"])
+            pos += volume
+        expected.append(balance)
+    assert np.allclose(equity, expected)
+
+def test_levels():
+    """逐级合并 CHART_FACTOR 根, 最粗一级点数不超过 CHART_MIN_POINTS"""
+    epoch, equity = create_equity(100_000)
+    levels = build_chart(epoch, equity, None)
+
+    order = get_level_order(list(levels))
+    assert order[0] == RESOLUTION_BAR
+    assert order[1:] == [f"x{CHART_FACTOR ** i}" for i in range(1, len(order))]
+
+    counts = [len(levels[name]["time"]) for name in order]
+    assert counts[0] == 100_000
+    assert all(a > b for a, b in zip(counts, counts[1:]))
+    assert counts[-1] <= CHART_MIN_POINTS < counts[-2]
+
+    # 点数不超过 CHART_MIN_POINTS 时只有逐 K 线曲线
+    epoch, equity = create_equity(CHART_MIN_POINTS)
+    assert list(build_chart(epoch, equity, None)) == [RESOLUTION_BAR]
+
+def test_bucket_values():
+    """每个区间为起始时间、末尾资金、最高最低资金及区间内最大回撤"""
+    epoch, equity = create_equity(10_007)
+    levels = build_chart(epoch, equity, None)
+    drawdown = levels[RESOLUTION_BAR]["drawdown"]
+    assert np.all(drawdown <= 0)
+
+    for name in get_level_order(list(levels))[1:]:
+        bucket = int(name[1:])
+        level = levels[name]
+        assert len(level["time"]) == -(-len(equity) // bucket)
+        for i in (0, 1, len(level["time"]) - 1):
+            part = slice(i * bucket, (i + 1) * bucket)
+            assert level["time"][i] == epoch[part][0]
+            assert level["equity"][i] == equity[part][-1]
+            assert level["equity_high"][i] == equity[part].max()
+            assert level["equity_low"][i] == equity[part].min()
+            assert level["drawdown"][i] == drawdown[part].min()
+
+def test_period_levels():
+    """日线为逐日结果, 周线按周一分组"""
+    daily_df = create_daily_df(30)
+    epoch, equity = create_equity(100)
+    levels = build_chart(epoch, equity, daily_df)
+
+    daily = levels[RESOLUTION_DAILY]
+    assert len(daily["time"]) == 30
+    assert daily["time"][0] == to_epoch(datetime(2024, 1, 1))
+    assert np.array_equal(daily["equity"], daily_df["balance"].to_numpy())
+
+    # 2024-01-01 为周一, 30 天共 5 周
+    weekly = levels[RESOLUTION_WEEKLY]
+    assert weekly["time"].tolist() == [to_epoch(datetime(2024, 1, 1) + timedelta(weeks=i)) for i in range(5)]
+    balance = daily_df["balance"].to_numpy()
+    assert weekly["equity"][0] == balance[6]
+    assert weekly["equity"][-1] == balance[-1]
+    assert weekly["equity_high"][1] == balance[7:14].max()
+    assert weekly["drawdown"][-1] == daily_df["drawdown"].to_numpy()[28:].min()
+
+def test_select_resolution():
+    """选择区间内点数不超过查询点数的最细分辨率"""
+    epoch, equity = create_equity(100_000)
+    levels = build_chart(epoch, equity, create_daily_df(10))
+    times = {name: level["time"] for name, level in levels.items()}
+
+    assert select_resolution(times, None, None, 100_000) == RESOLUTION_BAR
+    assert select_resolution(times, None, None, 30_000) == "x4"
+    assert select_resolution(times, None, None, 1) == get_level_order(list(times))[-1]
+    # 缩小区间后可使用更细的分辨率
+    assert select_resolution(times, int(epoch[1000]), int(epoch[1999]), 1000) == RESOLUTION_BAR
+    assert select_resolution({RESOLUTION_DAILY: times[RESOLUTION_DAILY]}, None, None, 10) == RESOLUTION_DAILY
+
+TESTS = [
+    ("逐 K 线资金", test_bar_equity),
+    ("逐级合并", test_levels),
+    ("区间取值", test_bucket_values),
+    ("日线及周线", test_period_levels),
+    ("分辨率选择", test_select_resolution),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI 回测资金曲线测试")
+    print("=" * 80)
+    print()
+
+    failed = 0
+    for name, func in TESTS:
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
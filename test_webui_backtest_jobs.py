@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Web UI 回测任务管理测试
+
+测试内容:
+1. 未结束任务与存储中已结束任务合并分页, 总数一致且无重复
+2. 多个线程同时结束同一任务时只生效一次
+3. Tick 回测使用 Tick 模式, 不使用共享内存缓存
+
+不启动进程池, 直接创建任务记录; 回测结果存储使用临时目录。
+"""
+import os
+import shutil
+import sys
+import tempfile
+import traceback
+from datetime import datetime, timedelta
+from itertools import count
+from pathlib import Path
+from threading import Barrier, Thread
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 回测结果存储在导入时按配置创建, 需在导入前指定路径
+os.environ["BACKTEST_RESULT_PATH"] = tempfile.mkdtemp(prefix="webui_backtest_")
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+from vnpy.trader.constant import Interval
+from vnpy_ctastrategy.base import BacktestingMode
+
+from app.core.backtest_jobs import (
+    JOB_BACKTEST,
+    STATUS_FAILED,
+    STATUS_FINISHED,
+    STATUS_STOPPED,
+    BacktestJobManager
+)
+from app.core.backtest_runner import create_engine
+from app.core.backtest_store import backtest_store
+from app.core.shared_bars import shared_bar_cache
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+START = datetime(2024, 1, 2)
+
+# 任务创建时间序号, 保证各任务创建时间不同
+created_minutes = count()
+
+def create_config(interval: str = Interval.MINUTE.value) -> dict:
+    """与 parse_backtest_config 输出格式相同的回测配置"""
+    return {
+        "class_name": "DoubleMaStrategy",
+        "engine": "event",
+        "vt_symbol": "rb2405.SHFE",
+        "interval": interval,
+        "start": START.isoformat(),
+        "end": (START + timedelta(days=5)).isoformat(),
+        "rate": 0.0001,
+        "slippage": 0,
+        "size": 10,
+        "pricetick": 1,
+        "capital": 1_000_000,
+        "parameters": {},
+        "data_version": 0,
+        "data_stamp": ""
+    }
+
+def create_jobs(manager: BacktestJobManager, number: int) -> list:
+    """创建 number 个任务, 创建时间依次递增"""
+    jobs = []
+    for _ in range(number):
+        with manager.lock:
+            job = manager.create_job(create_config(), JOB_BACKTEST)
+        job["created_at"] = (START + timedelta(minutes=next(created_minutes))).isoformat()
+        jobs.append(job)
+    return jobs
+
+def read_all_pages(manager: BacktestJobManager, limit: int) -> tuple:
+    """按 limit/offset 读取全部页, 返回任务 ID 列表及每页返回的总数"""
+    ids = []
+    totals = set()
+    offset = 0
+    while True:
+        jobs, total = manager.get_all_jobs(limit, offset)
+        totals.add(total)
+        ids.extend(job["id"] for job in jobs)
+        if len(jobs) < limit:
+            return ids, totals
+        offset += limit
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_pagination():
+    """未结束的任务排在前面, 各页拼接后与一次性查询相同"""
+    manager = BacktestJobManager()
+    finished = create_jobs(manager, 7)
+    for job in finished:
+        manager.finish(job["id"], STATUS_FINISHED, {})
+    active = create_jobs(manager, 5)
+
+    everything, total = manager.get_all_jobs()
+    assert total == backtest_store.count() + 5
+    assert len(everything) == total
+    assert [job["id"] for job in everything[:5]] == [job["id"] for job in reversed(active)]
+
+    for limit in (1, 3, 5, 6, 100):
+        ids, totals = read_all_pages(manager, limit)
+        assert totals == {total}, (limit, totals)
+        assert ids == [job["id"] for job in everything], limit
+        assert len(set(ids)) == len(ids)
+
+    # offset 超出未结束任务数时直接从存储中截取
+    jobs, _ = manager.get_all_jobs(2, 6)
+    assert [job["id"] for job in jobs] == [job["id"] for job in everything[6:8]]
+
+def test_finish_once():
+    """多个线程同时结束同一任务时只保存一次, 以第一次的状态为准"""
+    manager = BacktestJobManager()
+    for _ in range(20):
+        job = create_jobs(manager, 1)[0]
+        statuses = [STATUS_FINISHED, STATUS_STOPPED, STATUS_FAILED, STATUS_STOPPED]
+        barrier = Barrier(len(statuses))
+        errors = []
+
+        def finish(status: str):
+            barrier.wait()
+            try:
+                manager.finish(job["id"], status, error="失败" if status == STATUS_FAILED else None)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [Thread(target=finish, args=(status,)) for status in statuses]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors, errors
+        assert job["id"] not in manager.jobs
+        saved = backtest_store.get(job["id"])
+        assert saved["status"] == job["status"]
+        assert saved["finished_at"] == job["finished_at"]
+
+    # 已结束的任务不再更新进度
+    manager.update_progress(job["id"], "回放", 0.5)
+    assert backtest_store.get(job["id"])["status"] in (STATUS_FINISHED, STATUS_STOPPED, STATUS_FAILED)
+
+def test_tick_backtest():
+    """Tick 回测引擎为 Tick 模式, 共享内存缓存不加载 K 线"""
+    config = create_config(Interval.TICK.value)
+    assert shared_bar_cache.get(config) is None
+    assert not shared_bar_cache.blocks
+
+    engine = create_engine("tick", config, {}, report=False)
+    assert engine.mode == BacktestingMode.TICK
+
+    engine = create_engine("bar", create_config(), {}, report=False)
+    assert engine.mode == BacktestingMode.BAR
+
+TESTS = [
+    ("任务列表分页", test_pagination),
+    ("任务只结束一次", test_finish_once),
+    ("Tick 回测", test_tick_backtest),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI 回测任务管理测试")
+    print("=" * 80)
+    print()
+
+    failed = 0
+    for name, func in TESTS:
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+    backtest_store.close()
+    shutil.rmtree(os.environ["BACKTEST_RESULT_PATH"], ignore_errors=True)
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    code = main()
+    sys.stdout.flush()
+    # vnpy_engine 模块创建的 EventEngine 线程不会自行退出
+    os._exit(code)
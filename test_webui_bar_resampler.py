@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Web UI K 线周期合成测试
+
+测试内容:
+1. 夜盘按交易日归属合成日线, 周五夜盘归属下周一
+2. 分钟周期按交易日切分
+3. 周线按交易日所在周合成
+4. 其他程序直接写入数据库后合成结果的缓存失效
+
+测试数据写入 VnPy 数据库中专用的 LOCAL 合约, 结束后删除。
+"""
+import os
+import sys
+import traceback
+from datetime import datetime, timedelta
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 直接写入数据库后立即读取新的数据概要
+os.environ["DATA_STAMP_TTL"] = "0"
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+import numpy as np
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import DB_TZ, get_database
+from vnpy.trader.object import BarData
+
+from app.core.bar_resampler import get_resampled_bars, resample_arrays, resample_cache
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+SYMBOL = "webui_resample_test"
+
+def minutes(start: datetime, count: int) -> list:
+    """从 start 开始连续 count 分钟"""
+    return [start + timedelta(minutes=i) for i in range(count)]
+
+def create_arrays(times: list) -> dict:
+    """按时间生成 1 分钟 K 线数组, 第 i 根开盘价为 i, 收盘价为 i + 0.5, 成交量为 1"""
+    count = len(times)
+    prices = np.arange(count, dtype=float)
+    return {
+        "epoch": np.array([int(dt.replace(tzinfo=DB_TZ).timestamp() * 1000) for dt in times], dtype=np.int64),
+        "wall": np.array(times, dtype="datetime64[ms]"),
+        "open": prices,
+        "high": prices + 1,
+        "low": prices - 1,
+        "close": prices + 0.5,
+        "volume": np.ones(count),
+        "turnover": np.ones(count),
+        "open_interest": prices
+    }
+
+def labels(arrays: dict) -> list:
+    return [str(label) for label in arrays["wall"].astype("datetime64[m]")]
+
+def create_bars(times: list) -> list:
+    return [
+        BarData(
+            gateway_name="DB",
+            symbol=SYMBOL,
+            exchange=Exchange.LOCAL,
+            datetime=dt.replace(tzinfo=DB_TZ),
+            interval=Interval.MINUTE,
+            open_price=100,
+            high_price=101,
+            low_price=99,
+            close_price=100,
+            volume=1
+        )
+        for dt in times
+    ]
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_daily_night_session():
+    """周一夜盘与周二日盘合成为周二日线, 周五夜盘与下周一日盘合成为周一日线"""
+    times = (
+        minutes(datetime(2024, 1, 1, 21, 0), 120)
+        + minutes(datetime(2024, 1, 2, 9, 0), 60)
+        + minutes(datetime(2024, 1, 5, 21, 0), 120)
+        + minutes(datetime(2024, 1, 8, 9, 0), 60)
+    )
+    daily = resample_arrays(create_arrays(times), "d")
+
+    assert labels(daily) == ["2024-01-02T00:00", "2024-01-08T00:00"]
+    assert daily["open"].tolist() == [0, 180]
+    assert daily["close"].tolist() == [179.5, 359.5]
+    assert daily["high"].tolist() == [180, 360]
+    assert daily["low"].tolist() == [-1, 179]
+    assert daily["volume"].tolist() == [180, 180]
+    # 时间戳为交易日零点
+    assert daily["epoch"][0] == int(datetime(2024, 1, 2, tzinfo=DB_TZ).timestamp() * 1000)
+
+def test_minutes_split_by_trading_day():
+    """跨午夜的夜盘分钟周期连续, 夜盘收盘与日盘开盘不合并"""
+    times = (
+        minutes(datetime(2024, 1, 2, 23, 50), 20)
+        + minutes(datetime(2024, 1, 3, 9, 0), 30)
+    )
+    bars = resample_arrays(create_arrays(times), "15m")
+    assert labels(bars) == [
+        "2024-01-02T23:45",
+        "2024-01-03T00:00",
+        "2024-01-03T09:00",
+        "2024-01-03T09:15",
+    ]
+    assert bars["volume"].tolist() == [10, 10, 15, 15]
+
+    # 交易日不同的 K 线即使落在同一时间桶也分开
+    times = [datetime(2024, 1, 2, 20, 59), datetime(2024, 1, 2, 21, 0)]
+    bars = resample_arrays(create_arrays(times), "1h")
+    assert labels(bars) == ["2024-01-02T20:00", "2024-01-02T21:00"]
+
+    bars = resample_arrays(create_arrays([datetime(2024, 1, 2, 20, 30), datetime(2024, 1, 2, 21, 30)]), "d")
+    assert labels(bars) == ["2024-01-02T00:00", "2024-01-03T00:00"]
+
+def test_weekly():
+    """周五夜盘归属下周一, 计入下一周"""
+    times = (
+        minutes(datetime(2024, 1, 4, 9, 0), 10)
+        + minutes(datetime(2024, 1, 5, 21, 0), 10)
+        + minutes(datetime(2024, 1, 8, 9, 0), 10)
+    )
+    weekly = resample_arrays(create_arrays(times), "w")
+    assert labels(weekly) == ["2024-01-01T00:00", "2024-01-08T00:00"]
+    assert weekly["volume"].tolist() == [10, 20]
+
+def test_cache_follows_database():
+    """缓存命中时复用结果, 其他程序直接写入数据库后重新合成"""
+    database = get_database()
+    # 与 /bars 接口相同, 查询时间不带时区
+    start = datetime(2024, 1, 2, 9, 0)
+    end = datetime(2024, 1, 2, 23, 59, 59)
+
+    database.save_bar_data(create_bars(minutes(datetime(2024, 1, 2, 9, 0), 30)))
+    first = get_resampled_bars(SYMBOL, Exchange.LOCAL, "5m", start, end)
+    assert len(first["epoch"]) == 6
+    assert get_resampled_bars(SYMBOL, Exchange.LOCAL, "5m", start, end) is first
+
+    # 绕过 save_bars 写入, 不触发 save_listeners
+    database.save_bar_data(create_bars(minutes(datetime(2024, 1, 2, 9, 30), 15)))
+    second = get_resampled_bars(SYMBOL, Exchange.LOCAL, "5m", start, end)
+    assert len(second["epoch"]) == 9
+    assert second["volume"].tolist() == [5] * 9
+
+TESTS = [
+    ("夜盘日线", test_daily_night_session),
+    ("分钟周期按交易日切分", test_minutes_split_by_trading_day),
+    ("周线", test_weekly),
+    ("数据库写入后缓存失效", test_cache_follows_database),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def clean_database():
+    get_database().delete_bar_data(SYMBOL, Exchange.LOCAL, Interval.MINUTE)
+    resample_cache.invalidate(f"{SYMBOL}.{Exchange.LOCAL.value}")
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI K 线周期合成测试")
+    print("=" * 80)
+    print()
+
+    failed = 0
+    for name, func in TESTS:
+        clean_database()
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+    clean_database()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    code = main()
+    sys.stdout.flush()
+    # vnpy_engine 模块创建的 EventEngine 线程不会自行退出
+    os._exit(code)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Web UI 批量下单及撤单测试
+
+测试内容:
+1. 批量下单时参数错误、风控拒绝及网关拒单只影响对应委托, 结果按原顺序返回
+2. 批量撤单时不存在、已结束及网关报错的委托逐笔返回错误
+3. 全部撤单按合约及策略筛选活动委托
+4. 空列表及网关未连接
+
+不连接网关, MainEngine 替换为替身对象, 通过 TestClient 调用交易接口。
+"""
+import os
+import sys
+import traceback
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from vnpy.trader.constant import Direction, Exchange, Offset, Product, Status
+from vnpy.trader.object import CancelRequest, ContractData, OrderData, OrderRequest
+
+from app.api import trade
+from app.core.order_router import order_router
+from app.core.order_store import order_store
+from app.core.risk_engine import risk_engine
+from app.core.vnpy_engine import vnpy_engine
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+# 网关拒绝该价格的委托
+REJECT_PRICE = 3999
+# 网关撤单时抛出异常的委托号
+CANCEL_ERROR_ORDERID = "broken"
+
+class FakeMainEngine:
+    """按顺序分配委托号, 记录撤单请求"""
+
+    def __init__(self):
+        self.count = 0
+        self.cancelled = []
+
+    def get_contract(self, vt_symbol: str) -> ContractData:
+        symbol, exchange = vt_symbol.split(".")
+        return ContractData(
+            gateway_name="SIM",
+            symbol=symbol,
+            exchange=Exchange(exchange),
+            name=symbol,
+            product=Product.FUTURES,
+            size=10,
+            pricetick=1,
+            min_volume=1
+        )
+
+    def send_order(self, req: OrderRequest, gateway_name: str) -> str:
+        if req.price == REJECT_PRICE:
+            return ""
+        self.count += 1
+        return f"{gateway_name}.{self.count}"
+
+    def cancel_order(self, req: CancelRequest, gateway_name: str):
+        if req.orderid == CANCEL_ERROR_ORDERID:
+            raise RuntimeError("撤单接口异常")
+        self.cancelled.append(req.orderid)
+
+def create_order(orderid: str, status: Status, symbol: str = "rb2405", reference: str = "webui") -> OrderData:
+    order = OrderData(
+        gateway_name="SIM",
+        symbol=symbol,
+        exchange=Exchange.SHFE,
+        orderid=orderid,
+        direction=Direction.LONG,
+        offset=Offset.OPEN,
+        price=3500,
+        volume=1,
+        status=status,
+        reference=reference
+    )
+    order_store.update_order(order)
+    return order
+
+def order_item(**kwargs) -> dict:
+    item = {
+        "symbol": "rb2405",
+        "exchange": "SHFE",
+        "direction": "long",
+        "offset": "open",
+        "volume": 1,
+        "price": 3500
+    }
+    item.update(kwargs)
+    return item
+
+def create_client() -> tuple:
+    main_engine = FakeMainEngine()
+    vnpy_engine.main_engine = main_engine
+    vnpy_engine.gateway_name = "SIM"
+    vnpy_engine.connected = True
+
+    app = FastAPI()
+    app.include_router(trade.router)
+    return TestClient(app), main_engine
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_batch_orders():
+    """单笔失败不影响其他委托, 按原顺序逐笔返回"""
+    client, main_engine = create_client()
+    items = [
+        order_item(),
+        order_item(volume=0),
+        order_item(volume=risk_engine.max_order_volume + 1),
+        order_item(price=REJECT_PRICE),
+        "rb2405",
+        order_item(direction="short", price=3501),
+    ]
+    response = client.post("/trade/orders/batch", json={"orders": items})
+    assert response.status_code == 200, response.text
+    data = response.json()
+
+    results = data["results"]
+    assert [result["index"] for result in results] == list(range(len(items)))
+    assert [result["success"] for result in results] == [True, False, False, False, False, True]
+    assert data["submitted"] == 2 and data["failed"] == 4
+
+    # 网关拒单不占用委托号
+    assert results[0]["vt_orderid"] == "SIM.1"
+    assert results[5]["vt_orderid"] == "SIM.2"
+    assert results[5]["order"]["direction"] == Direction.SHORT.value
+    assert "委托数量" in results[1]["error"]
+    assert "单笔上限" in results[2]["error"]
+    assert "拒绝" in results[3]["error"]
+    assert results[0]["latency"]["queue"] is not None
+
+def test_batch_cancel():
+    """不存在、已结束及网关报错的委托逐笔返回错误, 其余正常撤单"""
+    client, main_engine = create_client()
+    create_order("c1", Status.NOTTRADED)
+    create_order("c2", Status.ALLTRADED)
+    create_order(CANCEL_ERROR_ORDERID, Status.NOTTRADED)
+    create_order("c3", Status.PARTTRADED)
+
+    orderids = ["SIM.c1", "SIM.c2", "SIM.missing", f"SIM.{CANCEL_ERROR_ORDERID}", "SIM.c3", 5]
+    response = client.request("DELETE", "/trade/orders/batch", json={"orderids": orderids})
+    assert response.status_code == 200, response.text
+    data = response.json()
+
+    results = data["results"]
+    assert [result["index"] for result in results] == list(range(len(orderids)))
+    assert [result["success"] for result in results] == [True, False, False, False, True, False]
+    assert data["cancelled"] == 2 and data["failed"] == 4
+    assert "已结束" in results[1]["error"]
+    assert "不存在" in results[2]["error"]
+    assert results[3]["error"] == "撤单接口异常"
+    assert main_engine.cancelled == ["c1", "c3"]
+
+def test_cancel_all():
+    """全部撤单只撤筛选范围内的活动委托"""
+    client, main_engine = create_client()
+    create_order("a1", Status.NOTTRADED, reference="CtaStrategy_atr_rb")
+    create_order("a2", Status.NOTTRADED, symbol="hc2405", reference="CtaStrategy_atr_rb")
+    create_order("a3", Status.NOTTRADED, reference="manual")
+    create_order("a4", Status.CANCELLED, reference="CtaStrategy_atr_rb")
+
+    response = client.delete("/trade/orders", params={"vt_symbol": "rb2405.SHFE", "strategy": "atr_rb"})
+    assert response.status_code == 200, response.text
+    assert response.json()["cancelled"] == 1
+    assert main_engine.cancelled == ["a1"]
+
+def test_invalid_batches():
+    """空列表返回 400, 网关未连接时批量下单返回 503"""
+    client, _ = create_client()
+    assert client.post("/trade/orders/batch", json={"orders": []}).status_code == 400
+    assert client.request("DELETE", "/trade/orders/batch", json={"orderids": "SIM.1"}).status_code == 400
+
+    vnpy_engine.connected = False
+    assert client.post("/trade/orders/batch", json={"orders": [order_item()]}).status_code == 503
+
+TESTS = [
+    ("批量下单部分失败", test_batch_orders),
+    ("批量撤单部分失败", test_batch_cancel),
+    ("全部撤单筛选", test_cancel_all),
+    ("无效批量请求", test_invalid_batches),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI 批量下单及撤单测试")
+    print("=" * 80)
+    print()
+
+    # 风控只检查单笔数量及下单频率
+    risk_engine.max_order_volume = 100
+    risk_engine.max_order_notional = 0
+    risk_engine.max_symbol_position = 0
+    risk_engine.max_account_position = 0
+    risk_engine.self_trade_check = False
+    order_router.start()
+
+    failed = 0
+    for name, func in TESTS:
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+    order_router.stop()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    code = main()
+    sys.stdout.flush()
+    # vnpy_engine 模块创建的 EventEngine 线程不会自行退出
+    os._exit(code)
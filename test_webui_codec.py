@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Web UI 行情推送编码测试
+
+测试内容:
+1. JSON 编码与 TickRecord.to_dict 一致
+2. msgpack 编码按 layout 字段顺序解码后与原始 Tick 一致
+3. 二进制编码按 layout 解包后与原始 Tick 一致, 价格按系数还原, 缺少行情时间时为 0
+4. 合约编号进程内固定
+
+不连接网关, 直接构造 TickData。
+"""
+import json
+import struct
+import sys
+import traceback
+from datetime import datetime
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+import msgpack
+
+from vnpy.trader.constant import Exchange
+from vnpy.trader.database import DB_TZ
+from vnpy.trader.object import TickData
+
+from app.core.codec import (
+    ENCODING_BINARY,
+    ENCODING_JSON,
+    ENCODING_MSGPACK,
+    PRICE_FIELDS,
+    VOLUME_FIELDS,
+    encode_tick,
+    get_encodings,
+    get_layout,
+    get_symbol_id
+)
+from app.core.tick_cache import TickRecord
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+DATETIME = datetime(2024, 1, 2, 9, 30, 15, 500000, tzinfo=DB_TZ)
+
+def create_record(symbol: str = "rb2405") -> TickRecord:
+    """各字段取值互不相同的 Tick, 价格带有小数"""
+    tick = TickData(
+        gateway_name="SIM",
+        symbol=symbol,
+        exchange=Exchange.SHFE,
+        datetime=DATETIME,
+        name=symbol,
+        volume=123456,
+        turnover=4.32e9,
+        open_interest=789012,
+        last_volume=7
+    )
+    for i, field in enumerate(PRICE_FIELDS):
+        setattr(tick, field, 3500.5 + i * 0.25)
+    for i, field in enumerate(VOLUME_FIELDS[1:]):
+        setattr(tick, field, 10 + i)
+    return TickRecord(tick)
+
+def millis(dt: datetime) -> int:
+    return int(dt.timestamp() * 1000)
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_json():
+    """文本帧, data 与 TickRecord.to_dict 相同"""
+    record = create_record()
+    message = json.loads(encode_tick(record, ENCODING_JSON))
+    assert message["type"] == "tick"
+    assert message["data"] == json.loads(json.dumps(record.to_dict()))
+    assert get_layout(ENCODING_JSON) == {}
+
+def test_msgpack():
+    """二进制帧, 按 layout 字段顺序解码"""
+    record = create_record()
+    payload = encode_tick(record, ENCODING_MSGPACK)
+    assert isinstance(payload, bytes)
+    assert ENCODING_MSGPACK in get_encodings()
+
+    fields = get_layout(ENCODING_MSGPACK)["fields"]
+    message = dict(zip(fields, msgpack.unpackb(payload)))
+    assert len(fields) == len(msgpack.unpackb(payload))
+    assert message["type"] == "tick"
+    assert message["vt_symbol"] == record.vt_symbol
+    assert message["datetime"] == millis(DATETIME)
+    for field in PRICE_FIELDS + VOLUME_FIELDS + ["volume", "turnover", "open_interest"]:
+        assert message[field] == getattr(record, field), field
+
+def test_binary():
+    """定长二进制帧, 按 layout 的格式解包, 价格除以系数还原"""
+    record = create_record()
+    payload = encode_tick(record, ENCODING_BINARY)
+
+    layout = get_layout(ENCODING_BINARY)
+    assert len(payload) == layout["size"]
+
+    message = dict(zip(layout["fields"], struct.unpack(layout["format"], payload)))
+    assert message["type"] == 1
+    assert message["symbol_id"] == get_symbol_id(record.vt_symbol)
+    assert message["datetime"] == millis(DATETIME)
+    for field in PRICE_FIELDS:
+        assert message[field] / layout["price_scale"] == getattr(record, field), field
+    for field in VOLUME_FIELDS + ["volume"]:
+        assert message[field] == getattr(record, field), field
+    assert message["turnover"] == record.turnover
+    assert message["open_interest"] == record.open_interest
+
+def test_binary_without_datetime():
+    """缺少行情时间时编码为 0"""
+    record = create_record()
+    record.datetime = None
+    payload = encode_tick(record, ENCODING_BINARY)
+    assert payload[5:13] == bytes(8)
+
+def test_symbol_id():
+    """同一合约编号不变, 新合约分配新编号"""
+    first = get_symbol_id("codec_test_a.SHFE")
+    assert get_symbol_id("codec_test_a.SHFE") == first
+    assert get_symbol_id("codec_test_b.SHFE") == first + 1
+
+TESTS = [
+    ("JSON 编码", test_json),
+    ("msgpack 编码", test_msgpack),
+    ("二进制编码", test_binary),
+    ("二进制编码无行情时间", test_binary_without_datetime),
+    ("合约编号", test_symbol_id),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI 行情推送编码测试")
+    print("=" * 80)
+    print()
+
+    failed = 0
+    for name, func in TESTS:
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Web UI 历史数据导出测试
+
+测试内容:
+1. CSV 导出, 跨多个读取分段的数据完整且有序
+2. gzip、zstd 压缩输出解压后与未压缩输出相同
+3. Parquet 及 Arrow IPC 流 (含压缩) 读回后与数据库一致
+4. 无数据时只输出表头, 文件名及无效选项
+
+测试数据写入 VnPy 数据库中专用的 LOCAL 合约, 结束后删除。
+"""
+import csv
+import gzip
+import io
+import sys
+import traceback
+from datetime import datetime, timedelta
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+import pyarrow.ipc
+import pyarrow.parquet
+import zstandard
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import DB_TZ, get_database
+from vnpy.trader.object import BarData
+
+from app.core.data_exporter import DataExporter, get_export_filename
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+SYMBOL = "webui_export_test"
+START = datetime(2024, 1, 2, 9, 0)
+# 分钟 K 线每段读取 7 天, 20 天的数据分 3 段读取
+DAYS = 20
+BARS_PER_DAY = 5
+
+def create_bars() -> list:
+    bars = []
+    for day in range(DAYS):
+        for minute in range(BARS_PER_DAY):
+            i = len(bars)
+            bars.append(BarData(
+                gateway_name="DB",
+                symbol=SYMBOL,
+                exchange=Exchange.LOCAL,
+                datetime=(START + timedelta(days=day, minutes=minute)).replace(tzinfo=DB_TZ),
+                interval=Interval.MINUTE,
+                open_price=3500 + i,
+                high_price=3501 + i,
+                low_price=3499 + i,
+                close_price=3500.5 + i,
+                volume=i + 1
+            ))
+    return bars
+
+def export(file_format: str = "csv", compression: str = None, days: int = DAYS) -> list:
+    """导出并返回各块输出, 与 /data/export 接口相同, 查询时间不带时区"""
+    exporter = DataExporter(
+        SYMBOL,
+        Exchange.LOCAL,
+        Interval.MINUTE.value,
+        START,
+        START + timedelta(days=days),
+        file_format,
+        compression
+    )
+    return list(exporter)
+
+def read_csv(data: bytes) -> list:
+    return list(csv.reader(io.StringIO(data.decode("utf-8"))))
+
+def zstd_decompress(data: bytes) -> bytes:
+    """流式压缩的帧不含原始长度, 按流解压"""
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_csv():
+    """表头后按时间输出全部 K 线, 时间带数据库时区"""
+    chunks = export()
+    assert len(chunks) >= 3
+
+    rows = read_csv(b"".join(chunks))
+    assert rows[0] == ["datetime", "open", "high", "low", "close", "volume", "turnover", "open_interest"]
+    assert len(rows) == DAYS * BARS_PER_DAY + 1
+
+    first = rows[1]
+    assert datetime.fromisoformat(first[0]) == START.replace(tzinfo=DB_TZ)
+    assert float(first[1]) == 3500 and float(first[4]) == 3500.5
+    assert float(rows[-1][5]) == DAYS * BARS_PER_DAY
+    assert [row[0] for row in rows[1:]] == sorted(row[0] for row in rows[1:])
+
+def test_compressed_csv():
+    """压缩输出为完整的 gzip/zstd 流, 解压后与未压缩输出相同"""
+    plain = b"".join(export())
+
+    data = b"".join(export(compression="gzip"))
+    assert data[:2] == b"\x1f\x8b"
+    assert gzip.decompress(data) == plain
+
+    data = b"".join(export(compression="zstd"))
+    assert data[:4] == b"\x28\xb5\x2f\xfd"
+    assert zstd_decompress(data) == plain
+    assert len(data) < len(plain)
+
+def test_arrow_formats():
+    """Parquet 每段一个行组, Arrow IPC 流每段一个记录批"""
+    data = b"".join(export("parquet"))
+    parquet_file = pyarrow.parquet.ParquetFile(io.BytesIO(data))
+    assert parquet_file.metadata.num_row_groups >= 3
+    table = parquet_file.read()
+    assert table.num_rows == DAYS * BARS_PER_DAY
+    assert table.column("close").to_pylist()[:2] == [3500.5, 3501.5]
+
+    data = gzip.decompress(b"".join(export("parquet", "gzip")))
+    assert pyarrow.parquet.read_table(io.BytesIO(data)).equals(table)
+
+    data = zstd_decompress(b"".join(export("arrow", "zstd")))
+    stream = pyarrow.ipc.open_stream(io.BytesIO(data)).read_all()
+    assert stream.num_rows == DAYS * BARS_PER_DAY
+    assert stream.column("volume").to_pylist() == table.column("volume").to_pylist()
+    first = stream.column("datetime")[0].as_py()
+    assert first == START.replace(tzinfo=DB_TZ)
+
+def test_empty_and_options():
+    """查询区间无数据时只输出表头, 无效格式及压缩方式抛出 ValueError"""
+    get_database().delete_bar_data(SYMBOL, Exchange.LOCAL, Interval.MINUTE)
+    rows = read_csv(gzip.decompress(b"".join(export(compression="gzip"))))
+    assert len(rows) == 1
+
+    assert get_export_filename(SYMBOL, "LOCAL", "1m", "arrow", "zstd") == f"{SYMBOL}.LOCAL_1m.arrows.zst"
+    for file_format, compression in (("xlsx", None), ("csv", "bz2")):
+        try:
+            export(file_format, compression)
+        except ValueError:
+            continue
+        raise AssertionError(f"{file_format}/{compression} 应抛出 ValueError")
+
+TESTS = [
+    ("CSV 导出", test_csv),
+    ("压缩输出", test_compressed_csv),
+    ("Parquet 及 Arrow 导出", test_arrow_formats),
+    ("无数据及无效选项", test_empty_and_options),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def clean_database():
+    get_database().delete_bar_data(SYMBOL, Exchange.LOCAL, Interval.MINUTE)
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI 历史数据导出测试")
+    print("=" * 80)
+    print()
+
+    failed = 0
+    for name, func in TESTS:
+        clean_database()
+        get_database().save_bar_data(create_bars())
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+    clean_database()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
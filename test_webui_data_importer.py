@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Web UI 历史数据导入测试
+
+测试内容:
+1. 块内及跨块边界的重复时间只保留最先出现的一条, 无效行计数
+2. 分批写入后数据库的数据概要 (数量、起止时间) 准确
+3. 在已有数据之前导入时不改变数据概要的结束时间
+4. 每次导入只通知一次数据变化
+5. Tick 导入
+
+测试数据写入 VnPy 数据库中专用的 LOCAL 合约, 结束后删除。
+"""
+import os
+import sys
+import traceback
+from datetime import datetime, timedelta
+from io import BytesIO
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import get_database
+
+from app.core.data_importer import DataImporter
+from app.core.data_service import save_listeners
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+SYMBOL = "webui_import_test"
+VT_SYMBOL = f"{SYMBOL}.{Exchange.LOCAL.value}"
+START = datetime(2024, 1, 2, 9, 0)
+
+def bar_rows(first: int, count: int, price: float = 100) -> list:
+    """从第 first 分钟开始的 count 行 K 线, 收盘价为 price"""
+    return [
+        f"{START + timedelta(minutes=i)},{price},{price + 1},{price - 1},{price},10"
+        for i in range(first, first + count)
+    ]
+
+def create_csv(rows: list) -> BytesIO:
+    return BytesIO("\n".join(["datetime,open,high,low,close,volume"] + rows).encode())
+
+def run_import(rows: list, interval: str = Interval.MINUTE.value, chunk_rows: int = 4, batch_size: int = 5) -> dict:
+    importer = DataImporter(create_csv(rows), "bars.csv", SYMBOL, Exchange.LOCAL, interval)
+    importer.chunk_rows = chunk_rows
+    importer.batch_size = batch_size
+    return importer.run()
+
+def get_bar_overview():
+    for overview in get_database().get_bar_overview():
+        if overview.symbol == SYMBOL and overview.exchange == Exchange.LOCAL:
+            return overview
+    return None
+
+def load_bars() -> list:
+    return get_database().load_bar_data(
+        SYMBOL, Exchange.LOCAL, Interval.MINUTE, START - timedelta(days=10), START + timedelta(days=10)
+    )
+
+def clean_database():
+    database = get_database()
+    database.delete_bar_data(SYMBOL, Exchange.LOCAL, Interval.MINUTE)
+    database.delete_tick_data(SYMBOL, Exchange.LOCAL)
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_dedup_across_chunks():
+    """每块 4 行, 第 4、5 行时间相同且分属两块, 第 6、7 行时间相同且在同一块"""
+    rows = bar_rows(0, 4)
+    rows += bar_rows(3, 1, price=200)
+    rows += bar_rows(4, 1)
+    rows += bar_rows(4, 1, price=300)
+    rows += bar_rows(5, 1)
+    rows += ["not a time,1,2,0,1,10", f"{START + timedelta(minutes=6)},1,0,2,1,10"]
+
+    result = run_import(rows)
+    assert result["total_rows"] == 10
+    assert result["duplicate_rows"] == 2
+    assert result["invalid_rows"] == 2
+    assert result["saved_rows"] == 6
+
+    bars = load_bars()
+    assert [bar.datetime.replace(tzinfo=None) for bar in bars] == [START + timedelta(minutes=i) for i in range(6)]
+    assert [bar.close_price for bar in bars] == [100] * 6
+
+def test_overview_after_stream():
+    """中间批次流式写入, 结束后数据概要与数据库一致"""
+    database = get_database()
+    streams = []
+
+    def save_bar_data(bars: list, stream: bool = False) -> bool:
+        streams.append(stream)
+        return type(database).save_bar_data(database, bars, stream)
+
+    database.save_bar_data = save_bar_data
+    try:
+        result = run_import(bar_rows(0, 23))
+    finally:
+        del database.save_bar_data
+    assert result["saved_rows"] == 23
+    # 每批 5 条, 最后一批 3 条重新统计数据概要
+    assert streams == [True, True, True, True, False]
+
+    overview = get_bar_overview()
+    assert overview.count == 23
+    assert overview.start == START
+    assert overview.end == START + timedelta(minutes=22)
+
+    # 与已有数据部分重叠的追加, 数量不重复累加
+    run_import(bar_rows(20, 15))
+    overview = get_bar_overview()
+    assert overview.count == 35 == len(load_bars())
+    assert overview.end == START + timedelta(minutes=34)
+
+def test_import_before_existing():
+    """在已有数据之前补充历史数据, 结束时间保持不变"""
+    run_import(bar_rows(100, 10))
+    run_import(bar_rows(0, 30))
+
+    overview = get_bar_overview()
+    assert overview.count == 40 == len(load_bars())
+    assert overview.start == START
+    assert overview.end == START + timedelta(minutes=109)
+
+def test_notify_once():
+    """多批写入只触发一次数据变化回调"""
+    calls = []
+    save_listeners.append(calls.append)
+    try:
+        run_import(bar_rows(0, 23))
+    finally:
+        save_listeners.remove(calls.append)
+    assert calls == [VT_SYMBOL]
+
+def test_ticks():
+    """Tick 同样分批写入, 数据概要数量准确"""
+    rows = [f"{START + timedelta(seconds=i)},{100 + i},{i}" for i in range(12)]
+    importer = DataImporter(
+        BytesIO("\n".join(["datetime,last_price,volume"] + rows).encode()),
+        "ticks.csv",
+        SYMBOL,
+        Exchange.LOCAL,
+        Interval.TICK.value
+    )
+    importer.chunk_rows = 4
+    importer.batch_size = 5
+    assert importer.run()["saved_rows"] == 12
+
+    overviews = [overview for overview in get_database().get_tick_overview() if overview.symbol == SYMBOL]
+    assert overviews[0].count == 12
+    assert overviews[0].end == START + timedelta(seconds=11)
+
+TESTS = [
+    ("跨块去重", test_dedup_across_chunks),
+    ("流式写入后的数据概要", test_overview_after_stream),
+    ("在已有数据之前导入", test_import_before_existing),
+    ("只通知一次数据变化", test_notify_once),
+    ("Tick 导入", test_ticks),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI 历史数据导入测试")
+    print("=" * 80)
+    print()
+
+    failed = 0
+    for name, func in TESTS:
+        clean_database()
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+    clean_database()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    code = main()
+    sys.stdout.flush()
+    # vnpy_engine 模块创建的 EventEngine 线程不会自行退出
+    os._exit(code)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Web UI 图表数据降采样测试
+
+测试内容:
+1. LTTB 保留首尾点, 点数等于 max_points, 每个桶选一个点
+2. LTTB 选点与逐点实现的参考算法一致, 孤立尖峰被保留
+3. OHLC 按桶合并保留最高最低价及总成交量
+4. 数据量不超过 max_points 时原样返回, 缩放元信息
+
+不访问数据库, 直接构造 K 线数组。
+"""
+import sys
+import traceback
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+import numpy as np
+
+from app.core.downsample import DOWNSAMPLE_LTTB, DOWNSAMPLE_OHLC, downsample_arrays, lttb_indices
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+START_EPOCH = 1_704_157_200_000
+
+def create_arrays(count: int, seed: int = 0) -> dict:
+    """随机游走生成 1 分钟 K 线数组"""
+    rng = np.random.default_rng(seed)
+    close = 3500 + np.cumsum(rng.normal(0, 2, count))
+    open_price = np.concatenate(([close[0]], close[:-1]))
+    return {
+        "epoch": START_EPOCH + np.arange(count, dtype=np.int64) * 60_000,
+        "wall": (START_EPOCH + np.arange(count) * 60_000).astype("datetime64[ms]"),
+        "open": open_price,
+        "high": np.maximum(open_price, close) + rng.random(count),
+        "low": np.minimum(open_price, close) - rng.random(count),
+        "close": close,
+        "volume": rng.integers(1, 100, count).astype(float),
+        "turnover": np.ones(count),
+        "open_interest": np.arange(count, dtype=float)
+    }
+
+def reference_lttb(x: list, y: list, threshold: int) -> list:
+    """逐点实现的 LTTB, 每个桶内选与上一个选中点及下一个桶均值构成三角形面积最大的点"""
+    length = len(x)
+    every = (length - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, length)
+        avg_x = sum(x[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(y[avg_start:avg_end]) / (avg_end - avg_start)
+
+        best_area = -1
+        best = None
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best_area = area
+                best = j
+        selected.append(best)
+        a = best
+    selected.append(length - 1)
+    return selected
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_lttb_endpoints_and_count():
+    """首尾点固定保留, 点数恰好为 max_points, 下标严格递增"""
+    arrays = create_arrays(10_000)
+    for max_points in (3, 4, 100, 999, 5000, 9999):
+        indices = lttb_indices(arrays["epoch"], arrays["close"], max_points)
+        assert len(indices) == max_points, max_points
+        assert indices[0] == 0 and indices[-1] == 9999
+        assert np.all(np.diff(indices) > 0), max_points
+
+    # 点数不足时原样返回
+    assert lttb_indices(arrays["epoch"][:50], arrays["close"][:50], 100).tolist() == list(range(50))
+
+def test_lttb_matches_reference():
+    """与逐点实现的参考算法选点相同"""
+    for count, max_points, seed in ((1000, 50, 1), (997, 101, 2), (5000, 333, 3)):
+        arrays = create_arrays(count, seed)
+        x = arrays["epoch"].astype(float)
+        y = arrays["close"]
+        indices = lttb_indices(arrays["epoch"], y, max_points).tolist()
+        assert indices == reference_lttb(x.tolist(), y.tolist(), max_points), (count, max_points)
+
+def test_lttb_keeps_spike():
+    """平稳序列中的孤立尖峰被选中"""
+    arrays = create_arrays(2000)
+    arrays["close"] = np.full(2000, 3500.0)
+    arrays["close"][1234] = 4000
+
+    result, meta = downsample_arrays(arrays, 100, DOWNSAMPLE_LTTB)
+    assert meta["downsampled"] and meta["count"] == 100
+    assert 4000 in result["close"].tolist()
+    assert result["epoch"][0] == arrays["epoch"][0]
+    assert result["epoch"][-1] == arrays["epoch"][-1]
+
+def test_ohlc():
+    """按桶合并, 保留最高最低价、首尾价格及总成交量"""
+    arrays = create_arrays(10_000)
+    result, meta = downsample_arrays(arrays, 300, DOWNSAMPLE_OHLC)
+
+    assert meta["count"] == len(result["epoch"]) <= 300
+    assert result["open"][0] == arrays["open"][0]
+    assert result["close"][-1] == arrays["close"][-1]
+    assert result["high"].max() == arrays["high"].max()
+    assert result["low"].min() == arrays["low"].min()
+    assert result["volume"].sum() == arrays["volume"].sum()
+    assert np.all(np.diff(result["epoch"]) > 0)
+
+def test_meta():
+    """数据量不超过 max_points 时不降采样, 否则附带缩放信息"""
+    arrays = create_arrays(100)
+    result, meta = downsample_arrays(arrays, 100, DOWNSAMPLE_OHLC)
+    assert result is arrays
+    assert not meta["downsampled"] and meta["count"] == 100
+
+    arrays = create_arrays(1000)
+    _, meta = downsample_arrays(arrays, 100, DOWNSAMPLE_LTTB)
+    span = int(arrays["epoch"][-1] - arrays["epoch"][0])
+    assert meta["original_count"] == 1000
+    assert meta["bucket_size"] == 10
+    assert meta["full_resolution_span"] == int(span * 100 / 1000)
+
+TESTS = [
+    ("LTTB 首尾点及点数", test_lttb_endpoints_and_count),
+    ("LTTB 参考算法", test_lttb_matches_reference),
+    ("LTTB 保留尖峰", test_lttb_keeps_spike),
+    ("OHLC 合并", test_ohlc),
+    ("缩放元信息", test_meta),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI 图表数据降采样测试")
+    print("=" * 80)
+    print()
+
+    failed = 0
+    for name, func in TESTS:
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Web UI OMS 增量同步及 WebSocket 发送队列测试
+
+测试内容:
+1. 序号分配, 持仓及账户未变化时不分配序号
+2. since_seq 增量查询及全量回退
+3. 发送队列溢出时优先丢弃 Tick, 委托等控制消息不丢弃
+4. 合并模式下同一合约只保留最新 Tick
+5. 队列中全部为控制消息仍然溢出时关闭连接
+
+不连接网关, WebSocket 使用只记录调用的替身对象。
+"""
+import asyncio
+import json
+import os
+import sys
+import traceback
+from datetime import datetime
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+from vnpy.trader.constant import Direction, Exchange, Offset, Status
+from vnpy.trader.object import OrderData
+
+from app.core.oms_hub import ACCOUNTS, COLLECTIONS, ORDERS, POSITIONS, OmsHub
+from app.core.websocket import (
+    CLOSE_CODE_OVERFLOW,
+    QUEUE_POLICY_CONFLATE,
+    QUEUE_POLICY_DROP_OLDEST,
+    ClientConnection,
+    manager
+)
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+class FakeWebSocket:
+    """记录发送内容及关闭状态码"""
+
+    def __init__(self):
+        self.sent = []
+        self.close_code = None
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+    async def send_bytes(self, data: bytes):
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+
+def create_order(orderid: str, status: Status = Status.NOTTRADED) -> OrderData:
+    return OrderData(
+        gateway_name="SIM",
+        symbol="rb2405",
+        exchange=Exchange.SHFE,
+        orderid=orderid,
+        direction=Direction.LONG,
+        offset=Offset.OPEN,
+        price=3500,
+        volume=1,
+        status=status,
+        datetime=datetime.now()
+    )
+
+def create_client(maxsize: int, policy: str = QUEUE_POLICY_DROP_OLDEST) -> ClientConnection:
+    """创建连接并登记到 manager, 不启动发送任务以便观察队列"""
+    websocket = FakeWebSocket()
+    client = ClientConnection(websocket, 0, maxsize, policy)
+    manager.active_connections[websocket] = client
+    return client
+
+def control_message(seq: int) -> str:
+    return json.dumps({"type": "order", "seq": seq})
+
+def queued_seqs(client: ClientConnection) -> list:
+    """队列中控制消息的 seq"""
+    return [json.loads(payload)["seq"] for key, payload in client.queue if not key]
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_update_assigns_seq():
+    """每次变化分配递增序号, 快照相同的持仓和账户不分配"""
+    hub = OmsHub()
+    position = {"vt_positionid": "SIM.rb2405.SHFE.多", "volume": 1}
+
+    assert hub.update(ORDERS, "SIM.1", create_order("1")) == 1
+    assert hub.update(POSITIONS, position["vt_positionid"], dict(position)) == 2
+    assert hub.update(POSITIONS, position["vt_positionid"], dict(position)) is None
+    assert hub.update(POSITIONS, position["vt_positionid"], {**position, "volume": 2}) == 3
+    assert hub.update(ORDERS, "SIM.1", create_order("1", Status.ALLTRADED)) == 4
+    assert hub.seq == 4
+
+def test_get_delta():
+    """只返回 since_seq 之后变化的记录, 按变化顺序排列"""
+    hub = OmsHub()
+    hub.update(ORDERS, "SIM.1", create_order("1"))
+    hub.update(ORDERS, "SIM.2", create_order("2"))
+    hub.update(ACCOUNTS, "SIM.A", {"vt_accountid": "SIM.A", "balance": 1})
+    hub.update(ORDERS, "SIM.1", create_order("1", Status.CANCELLED))
+
+    delta = hub.get_delta(COLLECTIONS, 2, hub.session)
+    assert not delta["full"]
+    assert delta["seq"] == 4
+    assert [order["vt_orderid"] for order in delta[ORDERS]] == ["SIM.1"]
+    assert delta[ORDERS][0]["status"] == Status.CANCELLED.value
+    assert delta[ACCOUNTS] == [{"vt_accountid": "SIM.A", "balance": 1}]
+
+    assert hub.get_delta([ORDERS], 4, hub.session)[ORDERS] == []
+    assert [order["vt_orderid"] for order in hub.get_changes(ORDERS, 0)] == ["SIM.2", "SIM.1"]
+
+def test_get_delta_full():
+    """未提供序号、session 不一致或序号无效时返回全量"""
+    hub = OmsHub()
+    hub.update(ORDERS, "SIM.1", create_order("1"))
+    hub.update(ORDERS, "SIM.2", create_order("2"))
+
+    for since_seq, session in ((None, None), (1, "other"), (-1, None), (3, None)):
+        delta = hub.get_delta([ORDERS], since_seq, session)
+        assert delta["full"], (since_seq, session)
+        assert len(delta[ORDERS]) == 2
+
+def test_queue_keeps_control_messages():
+    """队列已满时丢弃最早的 Tick, 委托消息全部保留且保持顺序"""
+    client = create_client(4)
+    for i in range(4):
+        client.put(f"tick{i}", f"rb240{i}.SHFE")
+
+    for seq in range(1, 5):
+        client.put(control_message(seq))
+
+    assert len(client.queue) == 4
+    assert queued_seqs(client) == [1, 2, 3, 4]
+    assert client.dropped_count == 4
+    assert not client.pending
+
+    # 队列已满且没有 Tick 可丢弃时, 新到的 Tick 被丢弃
+    client.put("tick", "rb2405.SHFE")
+    assert queued_seqs(client) == [1, 2, 3, 4]
+    assert client.dropped_count == 5
+    assert client.websocket in manager.active_connections
+    manager.disconnect(client.websocket)
+
+def test_queue_conflate():
+    """合并模式下同一合约的 Tick 只保留最新一条, 位置不变"""
+    client = create_client(10, QUEUE_POLICY_CONFLATE)
+    client.put("rb-1", "rb2405.SHFE")
+    client.put(control_message(1))
+    client.put("rb-2", "rb2405.SHFE")
+    client.put("hc-1", "hc2405.SHFE")
+
+    assert [payload for _, payload in client.queue] == ["rb-2", control_message(1), "hc-1"]
+    assert client.conflated_count == 1
+    manager.disconnect(client.websocket)
+
+def test_queue_overflow_closes_connection():
+    """控制消息无法入队时断开连接, 关闭状态码为 1013"""
+    async def run():
+        client = create_client(2)
+        client.put(control_message(1))
+        client.put(control_message(2))
+        client.put(control_message(3))
+
+        await asyncio.sleep(0)
+        assert client.websocket not in manager.active_connections
+        assert client.websocket.close_code == CLOSE_CODE_OVERFLOW
+        assert queued_seqs(client) == [1, 2]
+
+    asyncio.run(run())
+
+def test_send_in_order():
+    """发送任务按入队顺序发送"""
+    async def run():
+        client = create_client(10)
+        client.start()
+        client.put("tick", "rb2405.SHFE")
+        client.put(control_message(1))
+
+        await asyncio.sleep(0.05)
+        assert client.websocket.sent == ["tick", control_message(1)]
+        assert client.sent_count == 2
+        manager.disconnect(client.websocket)
+
+    asyncio.run(run())
+
+TESTS = [
+    ("序号分配", test_update_assigns_seq),
+    ("增量查询", test_get_delta),
+    ("全量回退", test_get_delta_full),
+    ("队列溢出保留控制消息", test_queue_keeps_control_messages),
+    ("合并 Tick", test_queue_conflate),
+    ("控制消息溢出关闭连接", test_queue_overflow_closes_connection),
+    ("按顺序发送", test_send_in_order),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI OMS 增量同步及 WebSocket 发送队列测试")
+    print("=" * 80)
+    print()
+
+    failed = 0
+    for name, func in TESTS:
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    code = main()
+    sys.stdout.flush()
+    # vnpy_engine 模块创建的 EventEngine 线程不会自行退出
+    os._exit(code)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Web UI 下单通道测试
+
+测试内容:
+1. 首个回报在网关接口返回后到达
+2. 首个回报在网关接口返回委托号之前到达
+3. 网关拒单不留下计时记录
+4. 其他来源委托的回报不被记录
+
+不连接网关, MainEngine 替换为在发送时按需同步推送回报的替身对象。
+"""
+import os
+import sys
+import time
+import traceback
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+from vnpy.trader.constant import Direction, Exchange, Offset, OrderType, Status
+from vnpy.trader.object import OrderRequest
+
+from app.core.order_router import HOP_ACK, HOP_TOTAL, GatewayError, OrderRouter
+from app.core.risk_engine import risk_engine
+from app.core.vnpy_engine import vnpy_engine
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+class FakeMainEngine:
+    """按顺序分配委托号, early_ack 为 True 时在返回前同步推送首个回报"""
+
+    def __init__(self, router: OrderRouter):
+        self.router = router
+        self.count = 0
+        self.early_ack = False
+        self.reject = False
+        # 发送期间推送的其他来源委托回报
+        self.other_acks = []
+
+    def send_order(self, req: OrderRequest, gateway_name: str) -> str:
+        if self.reject:
+            return ""
+
+        self.count += 1
+        orderid = str(self.count)
+        for order in self.other_acks:
+            self.router.record_ack(order)
+        if self.early_ack:
+            self.router.record_ack(create_ack(req, orderid))
+        return f"{gateway_name}.{orderid}"
+
+def create_request() -> OrderRequest:
+    return OrderRequest(
+        symbol="rb2405",
+        exchange=Exchange.SHFE,
+        direction=Direction.LONG,
+        type=OrderType.LIMIT,
+        volume=1,
+        price=3500,
+        offset=Offset.OPEN
+    )
+
+def create_ack(req: OrderRequest, orderid: str):
+    order = req.create_order_data(orderid, "SIM")
+    order.status = Status.NOTTRADED
+    return order
+
+def create_router() -> tuple:
+    router = OrderRouter()
+    main_engine = FakeMainEngine(router)
+    vnpy_engine.main_engine = main_engine
+    vnpy_engine.gateway_name = "SIM"
+    vnpy_engine.connected = True
+    return router, main_engine
+
+def ack_count(router: OrderRouter) -> int:
+    return router.get_latency_stats()["hops"][HOP_ACK]["count"]
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_ack_after_return():
+    """回报到达后取出计时记录并计入各段耗时"""
+    router, _ = create_router()
+    req = create_request()
+
+    vt_orderid, latency = router.send_order_sync(req, time.perf_counter_ns())
+    assert vt_orderid == "SIM.1"
+    assert router.get_latency_stats()["pending"] == 1
+
+    # 网关本地生成的提交中状态不算作回报
+    submitting = create_ack(req, "1")
+    submitting.status = Status.SUBMITTING
+    assert router.record_ack(submitting) is None
+
+    result = router.record_ack(create_ack(req, "1"))
+    assert result and result[HOP_ACK] is not None
+    assert router.get_latency_stats()["pending"] == 0
+    assert ack_count(router) == 1
+
+    # 后续回报不再计入
+    assert router.record_ack(create_ack(req, "1")) is None
+    assert ack_count(router) == 1
+
+def test_ack_before_return():
+    """网关返回委托号前到达的回报在登记时补记, 不留下计时记录"""
+    router, main_engine = create_router()
+    main_engine.early_ack = True
+
+    vt_orderid, latency = router.send_order_sync(create_request(), time.perf_counter_ns())
+    assert latency.acked >= latency.sent
+    assert latency.to_dict()[HOP_TOTAL] is not None
+
+    stats = router.get_latency_stats()
+    assert stats["pending"] == 0
+    assert stats["orders"] == 1
+    assert ack_count(router) == 1
+    assert not router.early_acks
+
+def test_rejected_order():
+    """网关拒单时抛出 GatewayError, 不登记计时记录"""
+    router, main_engine = create_router()
+    main_engine.reject = True
+
+    try:
+        router.send_order_sync(create_request(), time.perf_counter_ns())
+    except GatewayError:
+        pass
+    else:
+        raise AssertionError("拒单应抛出 GatewayError")
+
+    stats = router.get_latency_stats()
+    assert stats["orders"] == 0 and stats["pending"] == 0
+    assert not router.sending
+
+def test_other_acks_ignored():
+    """发送期间到达的其他委托回报不计入, 发送结束后清理"""
+    router, main_engine = create_router()
+    req = create_request()
+    main_engine.other_acks = [create_ack(req, "strategy_1")]
+
+    router.send_order_sync(req, time.perf_counter_ns())
+    assert not router.early_acks
+    assert ack_count(router) == 0
+
+    # 没有发送中的委托时不暂存
+    main_engine.other_acks = []
+    assert router.record_ack(create_ack(req, "strategy_2")) is None
+    assert not router.early_acks
+
+TESTS = [
+    ("回报在返回后到达", test_ack_after_return),
+    ("回报在返回前到达", test_ack_before_return),
+    ("网关拒单", test_rejected_order),
+    ("其他委托回报", test_other_acks_ignored),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI 下单通道测试")
+    print("=" * 80)
+    print()
+
+    # 风控只检查下单频率
+    risk_engine.max_order_volume = 0
+    risk_engine.max_order_notional = 0
+    risk_engine.max_symbol_position = 0
+    risk_engine.max_account_position = 0
+    risk_engine.self_trade_check = False
+
+    failed = 0
+    for name, func in TESTS:
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    code = main()
+    sys.stdout.flush()
+    # vnpy_engine 模块创建的 EventEngine 线程不会自行退出
+    os._exit(code)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Web UI 委托及成交索引测试
+
+测试内容:
+1. 按合约、状态、策略筛选委托
+2. 游标分页完整且不重复
+3. 按委托/成交时间筛选, 无时间时按到达时间, 乱序及超前的时间
+4. 按委托号及策略筛选成交
+5. 无效条件
+
+不连接网关, 直接构造委托和成交写入 OrderStore。
+"""
+import os
+import sys
+import traceback
+from datetime import datetime, timedelta
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+from vnpy.trader.constant import Direction, Exchange, Offset, Status
+from vnpy.trader.database import DB_TZ
+from vnpy.trader.object import OrderData, TradeData
+
+from app.core.order_store import OrderStore
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+START = datetime(2024, 1, 2, 9, 0, tzinfo=DB_TZ)
+SYMBOLS = ["rb2405", "hc2405", "i2405"]
+REFERENCES = ["webui", "CtaStrategy_atr_rb", "manual"]
+
+def create_order(i: int, status: Status = Status.NOTTRADED, dt: datetime = None) -> OrderData:
+    """第 i 笔委托, 合约及来源轮流取值, 每笔间隔 1 分钟"""
+    return OrderData(
+        gateway_name="SIM",
+        symbol=SYMBOLS[i % len(SYMBOLS)],
+        exchange=Exchange.SHFE,
+        orderid=str(i),
+        direction=Direction.LONG,
+        offset=Offset.OPEN,
+        price=3500,
+        volume=1,
+        status=status,
+        datetime=dt if dt else START + timedelta(minutes=i),
+        reference=REFERENCES[i % len(REFERENCES)]
+    )
+
+def create_trade(i: int, order: OrderData) -> TradeData:
+    return TradeData(
+        gateway_name="SIM",
+        symbol=order.symbol,
+        exchange=order.exchange,
+        orderid=order.orderid,
+        tradeid=str(i),
+        direction=order.direction,
+        offset=order.offset,
+        price=order.price,
+        volume=1,
+        datetime=order.datetime + timedelta(seconds=1)
+    )
+
+def create_store(count: int = 300) -> OrderStore:
+    """写入 count 笔委托, 序号为 3 的倍数的委托保持活动, 其余全部成交"""
+    store = OrderStore()
+    for i in range(count):
+        status = Status.NOTTRADED if i % 3 == 0 else Status.ALLTRADED
+        order = create_order(i, status)
+        store.update_order(order)
+        if status == Status.ALLTRADED:
+            store.update_trade(create_trade(i, order))
+    return store
+
+def read_all_pages(query, **kwargs) -> list:
+    """按游标读取全部页"""
+    records = []
+    cursor = None
+    while True:
+        page, cursor = query(cursor=cursor, **kwargs)
+        records.extend(page)
+        if cursor is None:
+            return records
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_filter_orders():
+    """筛选结果与逐笔判断一致, 按到达顺序排列"""
+    store = create_store()
+
+    orders, _ = store.query_orders(vt_symbol="rb2405.SHFE", status="active", limit=1000)
+    expected = [i for i in range(300) if i % 3 == 0 and SYMBOLS[i % 3] == "rb2405"]
+    assert [int(order.orderid) for order in orders] == expected
+
+    # 策略名匹配 CTA 策略下单时的 reference
+    orders, _ = store.query_orders(strategy="atr_rb", status="finished", limit=1000)
+    assert orders and all(order.reference == "CtaStrategy_atr_rb" and not order.is_active() for order in orders)
+    assert len(orders) == 100
+
+def test_status_change_moves_between_indexes():
+    """委托结束后不再出现在活动委托中"""
+    store = create_store(30)
+    assert len(store.get_active_orders()) == 10
+
+    order = store.get_order("SIM.0")
+    order.status = Status.CANCELLED
+    store.update_order(order)
+
+    active = store.get_active_orders()
+    assert len(active) == 9
+    assert "SIM.0" not in {order.vt_orderid for order in active}
+    assert store.get_stats() == {"orders": 30, "active_orders": 9, "trades": 20}
+
+def test_cursor_pagination():
+    """各页拼接后与一次性查询相同, 无重复无遗漏"""
+    store = create_store()
+
+    for kwargs in ({}, {"status": "active"}, {"vt_symbol": "hc2405.SHFE"}, {"strategy": "manual"}):
+        everything, cursor = store.query_orders(limit=1000, **kwargs)
+        assert cursor is None
+
+        paged = read_all_pages(store.query_orders, limit=7, **kwargs)
+        assert [order.vt_orderid for order in paged] == [order.vt_orderid for order in everything], kwargs
+
+def test_time_filter_uses_record_time():
+    """时间筛选使用委托自带时间, 而非写入时间"""
+    store = create_store()
+
+    start = (START + timedelta(minutes=100)).timestamp()
+    end = (START + timedelta(minutes=109)).timestamp()
+    orders, _ = store.query_orders(start=start, end=end)
+    assert [int(order.orderid) for order in orders] == list(range(100, 110))
+
+    trades, _ = store.query_trades(start=start, end=end + 1)
+    assert [int(trade.tradeid) for trade in trades] == [i for i in range(100, 110) if i % 3]
+
+def test_time_without_timestamp():
+    """网关未提供时间的委托按到达时间索引"""
+    store = OrderStore()
+    store.update_order(create_order(0))
+
+    order = create_order(1)
+    order.datetime = None
+    store.update_order(order)
+
+    assert store.orders.times[1] > START.timestamp()
+
+    orders, _ = store.query_orders(start=datetime.now().timestamp() - 60)
+    assert [order.orderid for order in orders] == ["1"]
+
+def test_time_out_of_order():
+    """时间超前或乱序的委托不影响其他委托的时间筛选"""
+    night = datetime(2024, 1, 2, 21, 0, tzinfo=DB_TZ)
+    store = OrderStore()
+    for i in range(1, 6):
+        dt = night + timedelta(minutes=i - 1)
+        # 夜盘委托带交易日日期
+        if i == 2:
+            dt += timedelta(days=1)
+        store.update_order(create_order(i, dt=dt))
+
+    # 晚到的早盘委托
+    store.update_order(create_order(6, dt=night - timedelta(hours=12)))
+
+    start = night.timestamp()
+    end = (night + timedelta(hours=1)).timestamp()
+    orders, _ = store.query_orders(start=start, end=end)
+    assert [order.orderid for order in orders] == ["1", "3", "4", "5"]
+
+    orders, _ = store.query_orders(start=(night + timedelta(days=1)).timestamp())
+    assert [order.orderid for order in orders] == ["2"]
+
+    orders, _ = store.query_orders(end=start - 1)
+    assert [order.orderid for order in orders] == ["6"]
+
+    # 时间筛选结果按到达顺序分页
+    orders = read_all_pages(store.query_orders, start=start - 86400, end=end, limit=2)
+    assert [order.orderid for order in orders] == ["1", "3", "4", "5", "6"]
+
+def test_filter_trades():
+    """按委托号及策略筛选成交"""
+    store = create_store()
+
+    trades, _ = store.query_trades(vt_orderid="SIM.4")
+    assert [trade.tradeid for trade in trades] == ["4"]
+
+    trades = read_all_pages(store.query_trades, strategy="atr_rb", limit=9)
+    assert len(trades) == 100
+    assert all(store.get_order(trade.vt_orderid).reference == "CtaStrategy_atr_rb" for trade in trades)
+
+def test_invalid_conditions():
+    store = create_store(3)
+    for kwargs in ({"status": "done"}, {"limit": 0}, {"limit": 100000}):
+        try:
+            store.query_orders(**kwargs)
+        except ValueError:
+            continue
+        raise AssertionError(f"{kwargs} 应抛出 ValueError")
+
+TESTS = [
+    ("按合约、状态、策略筛选委托", test_filter_orders),
+    ("委托状态变化", test_status_change_moves_between_indexes),
+    ("游标分页", test_cursor_pagination),
+    ("按委托时间筛选", test_time_filter_uses_record_time),
+    ("无委托时间", test_time_without_timestamp),
+    ("乱序及超前的委托时间", test_time_out_of_order),
+    ("筛选成交", test_filter_trades),
+    ("无效条件", test_invalid_conditions),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI 委托及成交索引测试")
+    print("=" * 80)
+    print()
+
+    failed = 0
+    for name, func in TESTS:
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    code = main()
+    sys.stdout.flush()
+    # vnpy_engine 模块创建的 EventEngine 线程不会自行退出
+    os._exit(code)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Web UI 下单前置风控测试
+
+测试内容:
+1. 令牌桶限速
+2. 活动委托最优价 (PriceBook) 及堆大小
+3. 单笔数量、合约及账户持仓限额
+4. 自成交检查
+5. 委托回报、成交及持仓推送对计数的更新
+
+不连接网关, 直接构造委托请求和事件。
+"""
+import os
+import sys
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+from vnpy.event import Event
+from vnpy.trader.constant import Direction, Exchange, Offset, OrderType, Status
+from vnpy.trader.event import EVENT_ORDER, EVENT_POSITION, EVENT_TRADE
+from vnpy.trader.object import OrderData, OrderRequest, PositionData, TradeData
+
+from app.core.risk_engine import (
+    RULE_ACCOUNT_POSITION,
+    RULE_ORDER_RATE,
+    RULE_ORDER_VOLUME,
+    RULE_SELF_TRADE,
+    RULE_SYMBOL_POSITION,
+    PriceBook,
+    RiskEngine,
+    RiskError,
+    TokenBucket
+)
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+def create_engine(**limits) -> RiskEngine:
+    """创建风控引擎, 未指定的限额不检查"""
+    engine = RiskEngine()
+    engine.max_order_volume = limits.get("max_order_volume", 0)
+    engine.max_order_notional = 0
+    engine.max_symbol_position = limits.get("max_symbol_position", 0)
+    engine.max_account_position = limits.get("max_account_position", 0)
+    engine.self_trade_check = limits.get("self_trade_check", False)
+    engine.bucket = TokenBucket(limits.get("order_rate", 0), limits.get("order_burst", 0))
+    return engine
+
+def create_request(
+    direction: Direction = Direction.LONG,
+    volume: float = 1,
+    price: float = 3500,
+    offset: Offset = Offset.OPEN,
+    symbol: str = "rb2405"
+) -> OrderRequest:
+    return OrderRequest(
+        symbol=symbol,
+        exchange=Exchange.SHFE,
+        direction=direction,
+        type=OrderType.LIMIT,
+        volume=volume,
+        price=price,
+        offset=offset
+    )
+
+def create_order(orderid: str, req: OrderRequest, status: Status, traded: float = 0) -> OrderData:
+    order = req.create_order_data(orderid, "SIM")
+    order.status = status
+    order.traded = traded
+    return order
+
+def expect_reject(engine: RiskEngine, req: OrderRequest, rule: str):
+    """检查应被拒绝, 并核对拒绝规则"""
+    try:
+        engine.check(req)
+    except RiskError as e:
+        assert e.rule == rule, f"拒绝规则 {e.rule}, 应为 {rule}"
+        return
+    raise AssertionError(f"委托应被 {rule} 拒绝")
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_token_bucket():
+    """令牌用尽后拒绝, 按速率补充"""
+    engine = create_engine(order_rate=50, order_burst=3)
+    req = create_request()
+
+    for _ in range(3):
+        engine.check(req)
+    expect_reject(engine, req, RULE_ORDER_RATE)
+
+    time.sleep(0.05)
+    engine.check(req)
+    assert engine.rejects[RULE_ORDER_RATE] == 1
+
+def test_price_book_best():
+    """多头取最高价, 空头取最低价, 撤销后回到次优价"""
+    long_book = PriceBook(Direction.LONG)
+    short_book = PriceBook(Direction.SHORT)
+    for price in (10.0, 12.0, 11.0, 12.0):
+        long_book.add(price)
+        short_book.add(price)
+
+    assert long_book.best() == 12.0
+    assert short_book.best() == 10.0
+
+    long_book.remove(12.0)
+    assert long_book.best() == 12.0
+    long_book.remove(12.0)
+    assert long_book.best() == 11.0
+
+    short_book.remove(10.0)
+    assert short_book.best() == 11.0
+
+    for price in (10.0, 11.0):
+        long_book.remove(price)
+    assert long_book.best() is None
+
+def test_price_book_heap_bounded():
+    """最优价长期不变时, 反复挂撤其他价格不会使堆无限增长"""
+    book = PriceBook(Direction.LONG)
+    book.add(5000.0)
+
+    for i in range(100000):
+        price = 4000.0 + i % 50
+        book.add(price)
+        book.remove(price)
+
+    assert book.best() == 5000.0
+    assert len(book.heap) <= 2 * len(book.counts) + 1, f"堆大小 {len(book.heap)}"
+
+def test_order_volume_limit():
+    engine = create_engine(max_order_volume=10)
+    engine.check(create_request(volume=10))
+    expect_reject(engine, create_request(volume=11), RULE_ORDER_VOLUME)
+
+def test_position_limits_include_pending():
+    """开仓挂单计入持仓额度, 平仓委托不检查持仓限额"""
+    engine = create_engine(max_symbol_position=10, max_account_position=15)
+
+    req = create_request(volume=6)
+    engine.check(req)
+    engine.add_order(req, "SIM.1")
+
+    expect_reject(engine, create_request(volume=5), RULE_SYMBOL_POSITION)
+    engine.check(create_request(volume=5, offset=Offset.CLOSE))
+
+    # 其他合约只受账户限额约束
+    other = create_request(volume=9, symbol="hc2405")
+    engine.check(other)
+    engine.add_order(other, "SIM.2")
+    expect_reject(engine, create_request(volume=1, symbol="i2405"), RULE_ACCOUNT_POSITION)
+
+    # 撤单后释放额度
+    engine.process_order_event(Event(EVENT_ORDER, create_order("2", other, Status.CANCELLED)))
+    engine.check(create_request(volume=4))
+    assert engine.total_pending == 6
+
+def test_trade_and_position_updates():
+    """成交将挂单转为持仓, 网关推送的持仓覆盖本地计数"""
+    engine = create_engine(max_symbol_position=10)
+
+    req = create_request(volume=4)
+    engine.add_order(req, "SIM.1")
+    engine.process_order_event(Event(EVENT_ORDER, create_order("1", req, Status.PARTTRADED, traded=3)))
+
+    trade = TradeData(
+        gateway_name="SIM",
+        symbol="rb2405",
+        exchange=Exchange.SHFE,
+        orderid="1",
+        tradeid="1",
+        direction=Direction.LONG,
+        offset=Offset.OPEN,
+        price=3500,
+        volume=3,
+        datetime=datetime.now()
+    )
+    engine.process_trade_event(Event(EVENT_TRADE, trade))
+
+    key = ("rb2405.SHFE", Direction.LONG)
+    assert engine.positions[key] == 3
+    assert engine.pending[key] == 1
+
+    position = PositionData(
+        gateway_name="SIM",
+        symbol="rb2405",
+        exchange=Exchange.SHFE,
+        direction=Direction.LONG,
+        volume=8
+    )
+    engine.process_position_event(Event(EVENT_POSITION, position))
+    assert engine.positions[key] == 8
+    assert engine.total_position == 8
+
+    engine.check(create_request(volume=1))
+    expect_reject(engine, create_request(volume=2), RULE_SYMBOL_POSITION)
+
+def test_self_trade():
+    """新委托价格与自己的反向挂单交叉时拒绝"""
+    engine = create_engine(self_trade_check=True)
+
+    sell = create_request(direction=Direction.SHORT, price=3510)
+    engine.add_order(sell, "SIM.1")
+
+    engine.check(create_request(price=3509))
+    expect_reject(engine, create_request(price=3510), RULE_SELF_TRADE)
+
+    # 反向挂单结束后不再拦截
+    engine.process_order_event(Event(EVENT_ORDER, create_order("1", sell, Status.ALLTRADED, traded=1)))
+    engine.check(create_request(price=3520))
+
+def test_ack_before_add_order():
+    """回报先于下单返回到达时, add_order 不重复登记"""
+    engine = create_engine()
+
+    req = create_request(volume=2)
+    engine.process_order_event(Event(EVENT_ORDER, create_order("1", req, Status.ALLTRADED, traded=2)))
+    engine.add_order(req, "SIM.1")
+
+    assert not engine.orders
+    assert engine.total_pending == 0
+
+TESTS = [
+    ("令牌桶限速", test_token_bucket),
+    ("最优价查询", test_price_book_best),
+    ("最优价堆大小", test_price_book_heap_bounded),
+    ("单笔数量限额", test_order_volume_limit),
+    ("持仓限额含挂单", test_position_limits_include_pending),
+    ("成交及持仓推送", test_trade_and_position_updates),
+    ("自成交检查", test_self_trade),
+    ("回报先于下单返回", test_ack_before_add_order),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI 下单前置风控测试")
+    print("=" * 80)
+    print()
+
+    failed = 0
+    for name, func in TESTS:
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    code = main()
+    sys.stdout.flush()
+    # vnpy_engine 模块创建的 EventEngine 线程不会自行退出
+    os._exit(code)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Web UI 行情批量推送测试
+
+测试内容:
+1. 二进制批量帧头 (消息类型、Tick 数量) 及定长记录拆分
+2. msgpack 批量帧在各长度的数组头下可直接解码
+3. JSON 批量帧
+4. 批量窗口内同一合约只保留最新 Tick, 控制消息保持顺序, 单条 Tick 不打包
+5. 发送任务按窗口合并发送
+
+不连接网关, WebSocket 使用只记录调用的替身对象。
+"""
+import asyncio
+import json
+import os
+import sys
+import traceback
+from datetime import datetime
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+import msgpack
+
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import TickData
+
+from app.core.codec import (
+    BATCH_HEADER_STRUCT,
+    BINARY_BATCH_TYPE,
+    ENCODING_BINARY,
+    ENCODING_JSON,
+    ENCODING_MSGPACK,
+    TICK_STRUCT,
+    encode_batch,
+    encode_tick,
+    get_symbol_id
+)
+from app.core.tick_cache import TickRecord
+from app.core.websocket import QUEUE_POLICY_DROP_OLDEST, ClientConnection, manager
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+class FakeWebSocket:
+    """记录发送内容"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+    async def send_bytes(self, data: bytes):
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000):
+        pass
+
+def create_record(symbol: str, price: float) -> TickRecord:
+    tick = TickData(
+        gateway_name="SIM",
+        symbol=symbol,
+        exchange=Exchange.SHFE,
+        datetime=datetime(2024, 1, 2, 9, 30),
+        last_price=price
+    )
+    return TickRecord(tick)
+
+def create_client(encoding: str, batch_window: float = 0) -> ClientConnection:
+    websocket = FakeWebSocket()
+    client = ClientConnection(websocket, 0, 100, QUEUE_POLICY_DROP_OLDEST, encoding, batch_window)
+    manager.active_connections[websocket] = client
+    return client
+
+def split_binary_batch(frame: bytes) -> tuple:
+    """拆分二进制批量帧, 返回 (消息类型, Tick 数量, 各 Tick 记录)"""
+    message_type, count = BATCH_HEADER_STRUCT.unpack_from(frame)
+    body = frame[BATCH_HEADER_STRUCT.size:]
+    assert len(body) == count * TICK_STRUCT.size
+    records = [TICK_STRUCT.unpack_from(body, i * TICK_STRUCT.size) for i in range(count)]
+    return message_type, count, records
+
+def control_message(seq: int) -> str:
+    return json.dumps({"type": "order", "seq": seq})
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_binary_batch():
+    """帧头后依次为定长 Tick 记录"""
+    records = [create_record("rb2405", 3500), create_record("hc2405", 3600.5)]
+    frame = encode_batch([encode_tick(record, ENCODING_BINARY) for record in records], ENCODING_BINARY)
+
+    message_type, count, ticks = split_binary_batch(frame)
+    assert message_type == BINARY_BATCH_TYPE
+    assert count == 2
+    assert [tick[1] for tick in ticks] == [get_symbol_id("rb2405.SHFE"), get_symbol_id("hc2405.SHFE")]
+    assert [tick[3] for tick in ticks] == [35_000_000, 36_005_000]
+
+def test_msgpack_batch():
+    """fixarray、array16 及 array32 数组头"""
+    for count in (2, 15, 16, 65535, 65536):
+        payloads = [msgpack.packb(i) for i in range(count)]
+        assert msgpack.unpackb(encode_batch(payloads, ENCODING_MSGPACK)) == list(range(count)), count
+
+    record = create_record("rb2405", 3500)
+    frame = encode_batch([encode_tick(record, ENCODING_MSGPACK)] * 2, ENCODING_MSGPACK)
+    messages = msgpack.unpackb(frame)
+    assert len(messages) == 2 and messages[0][:2] == ["tick", "rb2405.SHFE"]
+
+def test_json_batch():
+    """文本帧, data 为各条 Tick 消息"""
+    record = create_record("rb2405", 3500)
+    frame = encode_batch([encode_tick(record, ENCODING_JSON)] * 3, ENCODING_JSON)
+    message = json.loads(frame)
+    assert message["type"] == "ticks"
+    # 各元素为单条推送的完整消息
+    assert [tick["type"] for tick in message["data"]] == ["tick"] * 3
+    assert [tick["data"]["last_price"] for tick in message["data"]] == [3500] * 3
+
+def test_send_batch():
+    """控制消息两侧的 Tick 分别打包, 同一合约只保留最新一条"""
+    async def run():
+        client = create_client(ENCODING_BINARY)
+        tick = lambda symbol, price: encode_tick(create_record(symbol, price), ENCODING_BINARY)
+
+        items = [
+            ["rb2405.SHFE", tick("rb2405", 1)],
+            ["hc2405.SHFE", tick("hc2405", 2)],
+            ["rb2405.SHFE", tick("rb2405", 3)],
+            [None, control_message(1)],
+            ["rb2405.SHFE", tick("rb2405", 4)],
+            [None, control_message(2)],
+        ]
+        await client.send_batch(items)
+
+        sent = client.websocket.sent
+        assert len(sent) == 4
+        _, count, ticks = split_binary_batch(sent[0])
+        assert count == 2
+        assert sorted(tick[3] for tick in ticks) == [20_000, 30_000]
+        assert sent[1] == control_message(1)
+        # 单条 Tick 直接发送, 不加批量帧头
+        assert sent[2] == tick("rb2405", 4)
+        assert sent[3] == control_message(2)
+
+        assert client.batch_count == 1
+        assert client.conflated_count == 1
+        manager.disconnect(client.websocket)
+
+    asyncio.run(run())
+
+def test_batch_window():
+    """窗口内入队的 Tick 合并为一帧发送"""
+    async def run():
+        client = create_client(ENCODING_JSON, batch_window=0.02)
+        client.start()
+        for i in range(5):
+            client.put(encode_tick(create_record(f"rb240{i}", 3500 + i), ENCODING_JSON), f"rb240{i}.SHFE")
+
+        await asyncio.sleep(0.1)
+        sent = client.websocket.sent
+        assert len(sent) == 1
+        assert len(json.loads(sent[0])["data"]) == 5
+        assert client.get_stats()["batch_ms"] == 20
+        client.stop()
+        manager.disconnect(client.websocket)
+
+    asyncio.run(run())
+
+TESTS = [
+    ("二进制批量帧", test_binary_batch),
+    ("msgpack 批量帧", test_msgpack_batch),
+    ("JSON 批量帧", test_json_batch),
+    ("批量发送", test_send_batch),
+    ("批量窗口", test_batch_window),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI 行情批量推送测试")
+    print("=" * 80)
+    print()
+
+    failed = 0
+    for name, func in TESTS:
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    code = main()
+    sys.stdout.flush()
+    # vnpy_engine 模块创建的 EventEngine 线程不会自行退出
+    os._exit(code)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Web UI 向量化回测测试
+
+测试内容:
+1. 开盘价等于前收盘价时, 限价单在下一根 K 线按开盘价成交, 向量化与事件驱动
+   回测的成交、逐日盈亏及统计指标一致
+2. 向量化回测结果结构与事件驱动回测相同, 标明成交模型
+3. 传给信号函数的数据只读
+
+测试数据写入 VnPy 数据库中专用的 LOCAL 合约, 结束后删除。
+"""
+import math
+import os
+import sys
+import traceback
+from datetime import datetime, timedelta
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 策略目录及数据概要在导入时按配置读取, 需在导入前指定
+os.environ["STRATEGY_PATH"] = str(Path(__file__).parent / "strategies")
+os.environ["DATA_STAMP_TTL"] = "0"
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+import numpy as np
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import DB_TZ, get_database
+from vnpy.trader.object import BarData
+
+from app.core.backtest_chart import RESOLUTION_BAR, RESOLUTION_DAILY
+from app.core.backtest_runner import run_backtest
+from app.core.data_service import get_data_stamp
+from app.core.vector_backtest import FILL_NEXT_OPEN, load_arrays, run_vector_backtest
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+SYMBOL = "webui_vector_test"
+VT_SYMBOL = f"{SYMBOL}.{Exchange.LOCAL.value}"
+START = datetime(2024, 1, 2, 9, 0)
+DAYS = 10
+BARS_PER_DAY = 120
+
+# 逐日结果中比较的列
+DAILY_COLUMNS = [
+    "trade_count", "start_pos", "end_pos", "turnover", "commission",
+    "slippage", "trading_pnl", "holding_pnl", "total_pnl", "net_pnl"
+]
+
+def create_bars() -> list:
+    """正弦波动的整数价格, 每根 K 线开盘价等于前一根收盘价"""
+    bars = []
+    pre_close = 3500
+    for day in range(DAYS):
+        for minute in range(BARS_PER_DAY):
+            i = len(bars)
+            close = round(3500 + 40 * math.sin(i / 37) + 15 * math.sin(i / 7))
+            bars.append(BarData(
+                gateway_name="DB",
+                symbol=SYMBOL,
+                exchange=Exchange.LOCAL,
+                datetime=(START + timedelta(days=day, minutes=minute)).replace(tzinfo=DB_TZ),
+                interval=Interval.MINUTE,
+                open_price=pre_close,
+                high_price=max(pre_close, close) + 1,
+                low_price=min(pre_close, close) - 1,
+                close_price=close,
+                volume=10
+            ))
+            pre_close = close
+    return bars
+
+def create_config(engine: str) -> dict:
+    """与 parse_backtest_config 输出格式相同的回测配置"""
+    return {
+        "class_name": "SimpleDoubleMaStrategy",
+        "engine": engine,
+        "vt_symbol": VT_SYMBOL,
+        "interval": Interval.MINUTE.value,
+        "start": START.isoformat(),
+        "end": (START + timedelta(days=DAYS)).isoformat(),
+        "rate": 0.0001,
+        "slippage": 1,
+        "size": 10,
+        "pricetick": 1,
+        "capital": 1_000_000,
+        "parameters": {"fast_window": 5, "slow_window": 20, "fixed_size": 2},
+        "data_version": 0,
+        "data_stamp": get_data_stamp(VT_SYMBOL, Interval.MINUTE.value)
+    }
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_pnl_parity():
+    """相同信号及成交价下两种引擎的成交、逐日盈亏和统计指标一致"""
+    event = run_backtest("parity_event", create_config("event"))
+    vector = run_vector_backtest("parity_vector", create_config("vector"))
+
+    assert len(event["trades"]) > 10
+    assert len(vector["trades"]) == len(event["trades"])
+    for event_trade, vector_trade in zip(event["trades"], vector["trades"]):
+        for key in ("datetime", "direction", "price", "volume"):
+            assert event_trade[key] == vector_trade[key], (key, event_trade, vector_trade)
+
+    assert event["daily"]["date"] == vector["daily"]["date"]
+    for column in DAILY_COLUMNS:
+        assert np.allclose(event["daily"][column], vector["daily"][column]), column
+
+    for key in ("total_net_pnl", "total_commission", "total_slippage", "total_trade_count", "max_drawdown", "sharpe_ratio"):
+        assert np.isclose(event["statistics"][key], vector["statistics"][key]), key
+
+    # 逐 K 线资金曲线及日线相同
+    for resolution in (RESOLUTION_BAR, RESOLUTION_DAILY):
+        assert np.array_equal(event["chart"][resolution]["time"], vector["chart"][resolution]["time"])
+        assert np.allclose(event["chart"][resolution]["equity"], vector["chart"][resolution]["equity"]), resolution
+
+def test_result_format():
+    """结果字段与事件驱动回测相同, 成交模型为下一根开盘价"""
+    event = run_backtest("format_event", create_config("event"))
+    vector = run_vector_backtest("format_vector", create_config("vector"))
+    assert set(vector) == set(event)
+    assert vector["fill_model"] == FILL_NEXT_OPEN != event["fill_model"]
+    assert set(vector["trades"][0]) == set(event["trades"][0])
+
+def test_readonly_arrays():
+    """缓存的列式数据只读, 信号函数无法改写"""
+    arrays = load_arrays(create_config("vector"))
+    try:
+        arrays["close"][0] = 0
+    except ValueError:
+        return
+    raise AssertionError("列式数据应为只读")
+
+TESTS = [
+    ("盈亏一致", test_pnl_parity),
+    ("结果结构", test_result_format),
+    ("只读数据", test_readonly_arrays),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def clean_database():
+    get_database().delete_bar_data(SYMBOL, Exchange.LOCAL, Interval.MINUTE)
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI 向量化回测测试")
+    print("=" * 80)
+    print()
+
+    clean_database()
+    get_database().save_bar_data(create_bars())
+
+    failed = 0
+    for name, func in TESTS:
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+    clean_database()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
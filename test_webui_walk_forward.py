@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Web UI 滚动窗口回测测试
+
+测试内容:
+1. 回测区间按样本内/样本外天数及滚动步长拆分窗口, 锚定模式样本内从开始日期起算
+2. 区间不足一个窗口或窗口数与参数组合数之积超过上限时抛出 ValueError
+3. 汇总样本外盈亏及目标均值, 样本内目标均值为正时计算效率
+4. 样本内目标均值不为正时效率为空
+
+不执行回测, 直接设置各窗口结果。
+"""
+import sys
+import traceback
+from datetime import date, timedelta
+from pathlib import Path
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 后端目录放在最后, 避免其中的 vnpy 目录覆盖已安装的 vnpy
+sys.path.append(str(Path(__file__).parent / "vnpy-webui" / "backend"))
+
+from app.core.backtest_walk_forward import WalkForwardRunner, check_walk_forward, split_windows
+from app.utils.config import settings
+
+# ==============================================================================
+# 辅助函数
+# ==============================================================================
+
+CONFIG = {"start": "2024-01-01", "end": "2024-03-31"}
+OPTIMIZATION = {
+    "target": "sharpe_ratio",
+    "parameters": {"fast_window": {"start": 5, "end": 10, "step": 5}, "slow_window": [20, 30]}
+}
+WALK_FORWARD = {"in_sample_days": 30, "out_sample_days": 10, "step_days": 10, "anchored": False}
+
+def create_runner(in_targets: list, out_targets: list) -> WalkForwardRunner:
+    """各窗口结果依次为给定的样本内及样本外目标值"""
+    runner = WalkForwardRunner(None, "walk_forward_test", CONFIG, OPTIMIZATION, WALK_FORWARD)
+    for i, (in_target, out_target) in enumerate(zip(in_targets, out_targets)):
+        runner.results[i] = {
+            **runner.windows[i],
+            "setting": {"fast_window": 5, "slow_window": 20},
+            "in_sample_target": in_target,
+            "out_sample_target": out_target,
+            "out_sample_statistics": {"total_net_pnl": 100 * (i + 1)}
+        }
+    return runner
+
+def day(value: str) -> date:
+    return date.fromisoformat(value[:10])
+
+# ==============================================================================
+# 测试用例
+# ==============================================================================
+
+def test_split_windows():
+    """样本外紧接样本内, 每次滚动 step_days, 最后一个样本外截止到结束日期"""
+    # 样本外开始日期不晚于结束日期即可成窗, 最后一个窗口的样本外只有 3 月 31 日
+    windows = split_windows("2024-01-01", "2024-03-31", 30, 10, 10)
+    assert len(windows) == 7
+    for i, window in enumerate(windows):
+        assert window["index"] == i
+        assert day(window["in_sample_start"]) == date(2024, 1, 1) + timedelta(days=10 * i)
+        assert day(window["out_sample_start"]) - day(window["in_sample_end"]) == timedelta(days=1)
+        assert day(window["out_sample_start"]) - day(window["in_sample_start"]) == timedelta(days=30)
+    assert day(windows[0]["out_sample_end"]) == date(2024, 2, 9)
+    assert day(windows[-1]["out_sample_end"]) == date(2024, 3, 31)
+
+    anchored = split_windows("2024-01-01", "2024-03-31", 30, 10, 10, anchored=True)
+    assert {window["in_sample_start"] for window in anchored} == {windows[0]["in_sample_start"]}
+    assert [w["out_sample_start"] for w in anchored] == [w["out_sample_start"] for w in windows]
+
+def test_check_walk_forward():
+    """区间过短或总组合数超过上限时抛出 ValueError"""
+    assert len(check_walk_forward(CONFIG, OPTIMIZATION, WALK_FORWARD)) == 7
+
+    # 单个窗口的组合数未超过上限, 约 90 个窗口时总数超过上限
+    limit = settings.BACKTEST_OPTIMIZATION_MAX_SETTINGS
+    optimization = {**OPTIMIZATION, "parameters": {"fast_window": list(range(limit // 60 + 1))}}
+    for walk_forward in (
+        {**WALK_FORWARD, "in_sample_days": 120},
+        {**WALK_FORWARD, "step_days": 1, "in_sample_days": 1, "out_sample_days": 1},
+    ):
+        try:
+            check_walk_forward(CONFIG, optimization, walk_forward)
+        except ValueError:
+            continue
+        raise AssertionError(f"{walk_forward} 应抛出 ValueError")
+
+def test_summary():
+    """只汇总已完成的窗口, 效率为样本外与样本内目标均值之比"""
+    runner = create_runner([2.0, 1.0, 3.0], [1.0, None, 0.5])
+    results = runner.get_results()
+    summary = results["summary"]
+
+    assert summary["windows"] == 7
+    assert summary["finished_windows"] == 3
+    assert len(results["windows"]) == 3
+    assert summary["out_sample_net_pnl"] == 600
+    assert summary["average_in_sample_target"] == 2.0
+    assert summary["average_out_sample_target"] == 0.75
+    assert summary["efficiency"] == 0.375
+
+def test_efficiency_non_positive():
+    """样本内目标均值为零或负值时效率为空, 两个负值之比不被当作外推效果好"""
+    for in_targets in ([-1.0, -2.0], [1.0, -1.0]):
+        runner = create_runner(in_targets, [-3.0, -3.0])
+        summary = runner.get_results()["summary"]
+        assert summary["average_out_sample_target"] == -3.0
+        assert summary["efficiency"] is None, in_targets
+
+    # 没有窗口完成时各均值及效率均为空
+    summary = create_runner([], []).get_results()["summary"]
+    assert summary["average_in_sample_target"] is None
+    assert summary["efficiency"] is None
+
+TESTS = [
+    ("窗口拆分", test_split_windows),
+    ("设置校验", test_check_walk_forward),
+    ("结果汇总", test_summary),
+    ("非正样本内目标的效率", test_efficiency_non_positive),
+]
+
+# ==============================================================================
+# 执行测试
+# ==============================================================================
+
+def main() -> int:
+    print("=" * 80)
+    print("Web UI 滚动窗口回测测试")
+    print("=" * 80)
+    print()
+
+    failed = 0
+    for name, func in TESTS:
+        try:
+            func()
+            print(f"✅ 通过 - {name}")
+        except Exception:
+            failed += 1
+            print(f"❌ 失败 - {name}")
+            traceback.print_exc()
+
+    print()
+    print("=" * 80)
+    print(f"测试完成: {len(TESTS) - failed} 通过 / {failed} 失败 / {len(TESTS)} 总计")
+    print("=" * 80)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,41 @@
 # 账户 API
 
 from fastapi import APIRouter, HTTPException, status
-from typing import List
+from typing import List, Optional
 import json
 
+from app.core.oms_hub import ACCOUNTS, oms_hub
+
 # 创建路由器
 router = APIRouter(
     prefix="/accounts",
     tags=["账户"]
 )
 
-# TODO: 集成 VnPy 引擎
-# from app.core.vnpy_engine import VnPyEngine
+def find_account(account_id: str) -> Optional[dict]:
+    """按 vt_accountid 或资金账号查询账户"""
+    account = oms_hub.get(ACCOUNTS, account_id)
+    if account:
+        return account
 
-# 临时数据存储
-accounts_db = {}
+    for account in oms_hub.get_all(ACCOUNTS):
+        if account["accountid"] == account_id:
+            return account
+    return None
 
 @router.get("/")
-async def get_all_accounts():
-    """获取所有账户"""
-    # TODO: 从 VnPy 引擎获取账户数据
-    return {
-        "accounts": list(accounts_db.values())
-    }
+async def get_all_accounts(since_seq: Optional[int] = None, session: Optional[str] = None):
+    """获取所有账户
+
+    传入上次返回的 seq 及 session 时只返回之后变化的账户, full 为 true 时
+    返回的是全量数据。
+    """
+    return oms_hub.get_delta([ACCOUNTS], since_seq, session)
 
 @router.get("/{account_id}")
 async def get_account(account_id: str):
     """获取账户详情"""
-    # TODO: 从 VnPy 引擎获取账户详情
-    account = accounts_db.get(account_id)
+    account = find_account(account_id)
     if not account:
         raise HTTPException(
             status_code=404,
@@ -41,7 +48,7 @@ async def get_account(account_id: str):
 @router.get("/{account_id}/balance")
 async def get_account_balance(account_id: str):
     """获取账户余额"""
-    account = accounts_db.get(account_id)
+    account = find_account(account_id)
     if not account:
         raise HTTPException(
             status_code=404,
@@ -59,7 +66,7 @@ async def get_account_balance(account_id: str):
 async def refresh_account(account_id: str):
     """刷新账户数据"""
     # TODO: 从 VnPy 引擎刷新账户数据
-    account = accounts_db.get(account_id)
+    account = find_account(account_id)
     if not account:
         raise HTTPException(
             status_code=404,
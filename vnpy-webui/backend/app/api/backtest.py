@@ -1,121 +1,342 @@
 # 回测 API
 
 from fastapi import APIRouter, HTTPException, status
-from typing import List
+from typing import List, Optional
 import json
 from datetime import datetime
 
+from vnpy.trader.constant import Interval
+
+from app.core.backtest_jobs import (
+    FINISHED_STATUSES,
+    QueueFullError,
+    backtest_job_manager,
+    get_job_summary
+)
+from app.core.backtest_optimizer import OPTIMIZATION_BF, OPTIMIZATION_MODES, build_optimization_setting
+from app.core.backtest_chart import to_epoch
+from app.core.backtest_runner import get_strategy_class
+from app.core.backtest_store import backtest_store
+from app.core.backtest_walk_forward import check_walk_forward
+from app.core.data_service import get_data_stamp, get_data_version, parse_datetime, parse_exchange, parse_interval
+from app.core.vector_backtest import ENGINE_EVENT, ENGINE_MODES, ENGINE_VECTOR, has_vector_signals
+
 # 创建路由器
 router = APIRouter(
     prefix="/backtest",
     tags=["回测"]
 )
 
-# TODO: 集成 VnPy 回测引擎
-# from app.core.vnpy_engine import VnPyEngine
+@router.get("/")
+def get_all_backtests(limit: Optional[int] = None, offset: int = 0):
+    """获取所有回测
 
-# 临时数据存储
-backtests_db = {}
+    只读取任务概要, 不加载回测结果。未结束的任务在前, 已结束的任务按创建
+    时间倒序, 可通过 limit/offset 分页, total 包含未结束的任务。
+    """
+    if (limit is not None and limit < 0) or offset < 0:
+        raise HTTPException(status_code=400, detail="limit 和 offset 不能为负数")
 
-@router.get("/")
-async def get_all_backtests():
-    """获取所有回测"""
+    backtests, total = backtest_job_manager.get_all_jobs(limit, offset)
     return {
-        "backtests": list(backtests_db.values())
+        "backtests": backtests,
+        "total": total
     }
 
 @router.get("/{backtest_id}")
-async def get_backtest(backtest_id: str):
-    """获取回测详情"""
-    backtest = backtests_db.get(backtest_id)
+def get_backtest(backtest_id: str):
+    """获取回测详情, 不含回测结果"""
+    backtest = backtest_job_manager.get_job(backtest_id)
     if not backtest:
         raise HTTPException(
             status_code=404,
             detail=f"回测 {backtest_id} 不存在"
         )
     return {
-        "backtest": backtest
+        "backtest": {**get_job_summary(backtest), "config": backtest.get("config")}
     }
 
 @router.get("/{backtest_id}/chart")
-async def get_backtest_chart(backtest_id: str):
-    """获取回测图表"""
-    backtest = backtests_db.get(backtest_id)
+def get_backtest_chart(
+    backtest_id: str,
+    resolution: str = "auto",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    points: int = 1000
+):
+    """获取回测资金及回撤曲线
+
+    回测完成时已生成逐 K 线、逐级 4 倍合并、日线及周线多个分辨率。
+    resolution 为 auto 时按 start/end 区间选择点数不超过 points 的最细
+    分辨率, 也可指定 bar、x4、x16...、daily、weekly。合并后的点带有
+    区间内的资金最高/最低值, time 为毫秒时间戳。
+    """
+    backtest = backtest_job_manager.get_job(backtest_id)
     if not backtest:
         raise HTTPException(
             status_code=404,
             detail=f"回测 {backtest_id} 不存在"
         )
-    # TODO: 返回实际图表数据
+
+    try:
+        if points <= 0:
+            raise ValueError("points 必须为正数")
+        chart = backtest_store.load_chart(
+            backtest_id,
+            resolution,
+            to_epoch(parse_datetime(start, None)),
+            to_epoch(parse_datetime(end, None)),
+            points
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
     return {
         "backtest_id": backtest_id,
-        "chart": {
-            "equity": [],
-            "drawdown": []
-        }
+        **chart
     }
 
 @router.post("/run")
-async def run_backtest(request: dict):
-    """运行回测"""
-    strategy_name = request.get("strategy_name")
-    symbol = request.get("symbol")
-    start_date = request.get("start_date")
-    end_date = request.get("end_date")
-    parameters = request.get("parameters", {})
-
-    # TODO: 从 VnPy 引擎运行回测
-    backtest_id = f"backtest_{len(backtests_db) + 1}"
-
-    backtest = {
-        "id": backtest_id,
-        "strategy_name": strategy_name,
-        "symbol": symbol,
-        "start_date": start_date,
-        "end_date": end_date,
-        "parameters": parameters,
-        "status": "running",
-        "created_at": datetime.now().isoformat(),
-        "results": {}
+def run_backtest(request: dict):
+    """运行回测
+
+    回测提交到进程池后台执行, 立即返回任务, 进度通过 WebSocket 以
+    backtest 消息推送。等待中的任务已满时返回 503。
+    engine=vector 时使用策略声明的向量化信号函数快速回测, 收盘信号在
+    下一根 K 线开盘价成交, 统计指标的计算方式与事件驱动回测相同。两种引擎的成交模型
+    不同 (结果中的 fill_model), 相同信号下盈亏会有差异, 向量化结果用于筛选参数,
+    不应与事件驱动回测直接比较。
+    策略源码、参数、合约区间及数据版本均相同的回测不会重复执行:
+    已完成时直接返回已有回测, 正在执行时返回该任务, reused 为 True。
+    """
+    try:
+        config = parse_backtest_config(request)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+    try:
+        backtest, reused = backtest_job_manager.submit(config)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e)
+        )
+
+    if reused:
+        message = "相同回测已完成" if backtest["status"] in FINISHED_STATUSES else "相同回测正在执行"
+    else:
+        message = "回测已提交"
+
+    return {
+        "message": message,
+        "reused": reused,
+        "backtest": get_job_summary(backtest)
     }
 
-    backtests_db[backtest_id] = backtest
+@router.post("/optimize")
+def optimize_backtest(request: dict):
+    """参数优化
+
+    请求字段与 /run 相同, 另加 optimization:
+    {"mode": "bf"/"ga", "target": "sharpe_ratio", "parameters": {...}, "top_n": 20}
+    parameters 中每个参数可以是 {"start", "end", "step"} 范围、取值列表或固定值,
+    mode=ga 时可指定 pop_size 和 ngen。任务在回测进程池中并行执行,
+    当前最优的 top_n 组参数随进度通过 WebSocket 推送。
+    """
+    try:
+        config = parse_backtest_config(request)
+        optimization = parse_optimization(request.get("optimization") or {})
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+    try:
+        backtest = backtest_job_manager.submit_optimization(config, optimization)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e)
+        )
 
     return {
-        "message": "回测开始运行",
-        "backtest": backtest
+        "message": "参数优化已提交",
+        "backtest": get_job_summary(backtest)
     }
 
+@router.post("/walk_forward")
+def walk_forward_backtest(request: dict):
+    """滚动窗口回测
+
+    请求字段与 /optimize 相同, 另加 walk_forward:
+    {"in_sample_days": 120, "out_sample_days": 30, "step_days": 30, "anchored": false}
+    回测区间按样本内/样本外窗口滚动拆分, 每个窗口在样本内优化参数后,
+    以最优参数回测样本外区间。step_days 默认与 out_sample_days 相同,
+    anchored 为 True 时样本内区间始终从开始日期起算。已完成的窗口随进度
+    通过 WebSocket 推送。
+    """
+    try:
+        config = parse_backtest_config(request)
+        optimization = parse_optimization(request.get("optimization") or {})
+        walk_forward = parse_walk_forward(request.get("walk_forward") or {})
+        check_walk_forward(config, optimization, walk_forward)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+    try:
+        backtest = backtest_job_manager.submit_walk_forward(config, optimization, walk_forward)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e)
+        )
+
+    return {
+        "message": "滚动窗口回测已提交",
+        "backtest": get_job_summary(backtest)
+    }
+
+def parse_walk_forward(walk_forward: dict) -> dict:
+    """校验滚动窗口设置"""
+    try:
+        result = {
+            "in_sample_days": int(walk_forward["in_sample_days"]),
+            "out_sample_days": int(walk_forward["out_sample_days"]),
+            "anchored": bool(walk_forward.get("anchored", False))
+        }
+        result["step_days"] = int(walk_forward.get("step_days") or result["out_sample_days"])
+    except KeyError as e:
+        raise ValueError(f"缺少滚动窗口参数 {e.args[0]}")
+    except (TypeError, ValueError):
+        raise ValueError("滚动窗口参数格式错误")
+
+    if result["in_sample_days"] <= 0 or result["out_sample_days"] <= 0 or result["step_days"] <= 0:
+        raise ValueError("in_sample_days、out_sample_days、step_days 必须为正数")
+    return result
+
+def parse_optimization(optimization: dict) -> dict:
+    """校验优化设置"""
+    mode = optimization.get("mode", OPTIMIZATION_BF)
+    if mode not in OPTIMIZATION_MODES:
+        raise ValueError(f"无效的优化算法: {mode}")
+
+    target = optimization.get("target", "sharpe_ratio")
+    parameters = optimization.get("parameters")
+    if not isinstance(parameters, dict):
+        raise ValueError("缺少优化参数")
+    # 提前校验参数范围, 避免提交后才失败
+    build_optimization_setting(parameters, target)
+
+    try:
+        result = {
+            "mode": mode,
+            "target": target,
+            "parameters": parameters,
+            "top_n": int(optimization.get("top_n", 20)),
+            "pop_size": int(optimization.get("pop_size", 100)),
+            "ngen": int(optimization.get("ngen", 30))
+        }
+    except (TypeError, ValueError):
+        raise ValueError("优化参数格式错误")
+
+    if result["top_n"] <= 0 or result["pop_size"] <= 1 or result["ngen"] <= 0:
+        raise ValueError("top_n、pop_size、ngen 必须为正数")
+    return result
+
+def parse_backtest_config(request: dict) -> dict:
+    """校验回测请求, 转换为子进程使用的回测配置"""
+    strategy_name = request.get("strategy_name")
+    if not strategy_name or not get_strategy_class(strategy_name):
+        raise ValueError(f"策略 {strategy_name} 不存在")
+
+    # symbol 可直接传 vt_symbol, 也可分别传 symbol 和 exchange
+    symbol = request.get("symbol") or ""
+    exchange = request.get("exchange")
+    if exchange:
+        symbol = f"{symbol}.{exchange}"
+    if "." not in symbol:
+        raise ValueError(f"无效的合约代码: {symbol}")
+    parse_exchange(symbol.rsplit(".", 1)[1])
+
+    interval = request.get("interval", Interval.MINUTE.value)
+    parse_interval(interval)
+
+    engine = request.get("engine", ENGINE_EVENT)
+    if engine not in ENGINE_MODES:
+        raise ValueError(f"无效的回测引擎: {engine}")
+    if engine == ENGINE_VECTOR:
+        if interval == Interval.TICK.value:
+            raise ValueError("向量化回测只支持 K 线数据")
+        if not has_vector_signals(get_strategy_class(strategy_name)):
+            raise ValueError(f"策略 {strategy_name} 不支持向量化回测")
+
+    start = parse_datetime(request.get("start_date"), None)
+    end = parse_datetime(request.get("end_date"), datetime.now())
+    if not start or start >= end:
+        raise ValueError("回测开始日期必须早于结束日期")
+
+    try:
+        return {
+            "class_name": strategy_name,
+            "engine": engine,
+            "vt_symbol": symbol,
+            "interval": interval,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "rate": float(request.get("rate", 0.0001)),
+            "slippage": float(request.get("slippage", 0)),
+            "size": float(request.get("size", 1)),
+            "pricetick": float(request.get("pricetick", 1)),
+            "capital": int(request.get("capital", 1_000_000)),
+            "parameters": dict(request.get("parameters") or {}),
+            "data_version": get_data_version(symbol),
+            "data_stamp": get_data_stamp(symbol, interval)
+        }
+    except (TypeError, ValueError):
+        raise ValueError("回测参数格式错误")
+
 @router.post("/{backtest_id}/stop")
 async def stop_backtest(backtest_id: str):
     """停止回测"""
-    # TODO: 从 VnPy 引擎停止回测
-    backtest = backtests_db.get(backtest_id)
+    backtest = backtest_job_manager.get_job(backtest_id)
     if not backtest:
         raise HTTPException(
             status_code=404,
             detail=f"回测 {backtest_id} 不存在"
         )
+    if backtest["status"] in FINISHED_STATUSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"回测 {backtest_id} 已结束"
+        )
 
-    backtest["status"] = "stopped"
-    backtest["stopped_at"] = datetime.now().isoformat()
+    backtest_job_manager.cancel(backtest_id)
 
     return {
-        "message": f"回测 {backtest_id} 已停止",
-        "backtest": backtest
+        "message": f"回测 {backtest_id} 正在停止",
+        "backtest": get_job_summary(backtest)
     }
 
 @router.get("/{backtest_id}/results")
-async def get_backtest_results(backtest_id: str):
+def get_backtest_results(backtest_id: str):
     """获取回测结果"""
-    backtest = backtests_db.get(backtest_id)
-    if not backtest:
+    results = backtest_job_manager.get_results(backtest_id)
+    if results is None:
         raise HTTPException(
             status_code=404,
             detail=f"回测 {backtest_id} 不存在"
         )
-    # TODO: 从 VnPy 引擎获取回测结果
     return {
         "backtest_id": backtest_id,
-        "results": backtest.get("results", {})
+        "results": results
     }
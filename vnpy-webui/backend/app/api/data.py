@@ -1,9 +1,41 @@
 # 数据 API
 
-from fastapi import APIRouter, HTTPException, status, UploadFile, File
-from typing import List
-import pandas as pd
-from io import BytesIO
+from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timedelta
+import asyncio
+import json
+import uuid
+
+from vnpy.trader.constant import Interval
+
+from app.core.data_service import (
+    BAR_COLUMNS,
+    bar_to_dict,
+    bars_to_columns,
+    get_db,
+    iter_bar_chunks,
+    parse_datetime,
+    parse_exchange,
+    parse_interval
+)
+from app.core.bar_resampler import (
+    RESAMPLE_PERIODS,
+    arrays_to_columns,
+    arrays_to_rows,
+    get_resampled_bars,
+    load_bar_arrays
+)
+from app.core.data_importer import DataImporter
+from app.core.data_exporter import (
+    EXPORT_COMPRESSIONS,
+    EXPORT_FORMATS,
+    DataExporter,
+    get_export_filename
+)
+from app.core.websocket import broadcast_data_import
+from app.core.downsample import DOWNSAMPLE_MODES, DOWNSAMPLE_OHLC, downsample_arrays
 
 # 创建路由器
 router = APIRouter(
@@ -11,29 +43,132 @@ router = APIRouter(
     tags=["数据"]
 )
 
-# TODO: 集成 VnPy 数据管理
-# from vnpy.trader.database import get_database
-# database = get_database()
+# 未指定开始时间时默认查询的天数
+DEFAULT_QUERY_DAYS = 30
+
+# 合成周期 K 线列式输出时每行的数量
+COLUMNAR_CHUNK_SIZE = 10000
 
 @router.get("/bars")
-async def get_bars(
+def get_bars(
     symbol: str,
     exchange: str,
     interval: str = "1m",
     start: str = None,
-    end: str = None
+    end: str = None,
+    layout: str = "rows",
+    resample: bool = True,
+    max_points: int = None,
+    downsample: str = DOWNSAMPLE_OHLC
 ):
-    """获取 K 线数据"""
-    # TODO: 从数据库查询 K 线数据
-    # bars = database.load_bar_data(...)
+    """获取 K 线数据
+
+    layout=rows 返回 K 线对象列表; layout=columnar 以 NDJSON 流式返回,
+    首行为元信息, 之后每行是一段按列组织的数据, 不会一次性加载全部 K 线。
+    interval 为 5m/15m/30m/1h/d/w 且 resample=true 时由 1 分钟 K 线合成,
+    日线按交易日 (含前一晚夜盘) 合成, 结果缓存至该合约有新数据写入。
+    指定 max_points 时返回不超过该数量的点: downsample=ohlc 按桶合并保留
+    开高低收, downsample=lttb 按收盘价选点用于折线, 并附带缩放元信息。
+    """
+    if max_points is not None and max_points < 3:
+        raise HTTPException(
+            status_code=400,
+            detail="max_points 不能小于 3"
+        )
+    if downsample not in DOWNSAMPLE_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"无效的降采样方式: {downsample}"
+        )
+
+    try:
+        vn_exchange = parse_exchange(exchange)
+        # 默认时间范围取整到天, 便于命中合成周期缓存
+        today_end = datetime.now().replace(hour=23, minute=59, second=59, microsecond=0)
+        end_dt = parse_datetime(end, today_end)
+        start_dt = parse_datetime(
+            start,
+            (end_dt - timedelta(days=DEFAULT_QUERY_DAYS)).replace(hour=0, minute=0, second=0)
+        )
+
+        if resample and interval in RESAMPLE_PERIODS:
+            arrays = get_resampled_bars(symbol, vn_exchange, interval, start_dt, end_dt)
+            if max_points:
+                arrays, meta = downsample_arrays(arrays, max_points, downsample)
+                return format_bar_arrays(symbol, exchange, interval, arrays, layout, meta)
+            return format_bar_arrays(symbol, exchange, interval, arrays, layout)
+
+        vn_interval = parse_interval(interval)
+        if max_points:
+            arrays = load_bar_arrays(symbol, vn_exchange, vn_interval, start_dt, end_dt)
+            arrays, meta = downsample_arrays(arrays, max_points, downsample)
+            return format_bar_arrays(symbol, exchange, interval, arrays, layout, meta)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+    if layout == "columnar":
+        def generate():
+            yield json.dumps({
+                "symbol": symbol,
+                "exchange": exchange,
+                "interval": interval,
+                "columns": BAR_COLUMNS
+            }) + "\n"
+
+            chunks = iter_bar_chunks(symbol, vn_exchange, vn_interval, start_dt, end_dt)
+            for bars in chunks:
+                yield json.dumps(bars_to_columns(bars)) + "\n"
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    bars = get_db().load_bar_data(symbol, vn_exchange, vn_interval, start_dt, end_dt)
     return {
         "symbol": symbol,
         "exchange": exchange,
         "interval": interval,
-        "bars": [],
-        "message": "待实现"
+        "bars": [bar_to_dict(bar) for bar in bars]
     }
 
+def format_bar_arrays(
+    symbol: str,
+    exchange: str,
+    interval: str,
+    arrays: dict,
+    layout: str,
+    meta: dict = None
+):
+    """按 layout 输出列式 K 线数组, meta 为降采样元信息"""
+    if layout == "columnar":
+        def generate():
+            header = {
+                "symbol": symbol,
+                "exchange": exchange,
+                "interval": interval,
+                "columns": BAR_COLUMNS
+            }
+            if meta:
+                header["downsample"] = meta
+            yield json.dumps(header) + "\n"
+
+            for i in range(0, len(arrays["epoch"]), COLUMNAR_CHUNK_SIZE):
+                chunk = {key: values[i: i + COLUMNAR_CHUNK_SIZE] for key, values in arrays.items()}
+                yield json.dumps(arrays_to_columns(chunk)) + "\n"
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    data = {
+        "symbol": symbol,
+        "exchange": exchange,
+        "interval": interval,
+        "bars": arrays_to_rows(arrays)
+    }
+    if meta:
+        data["downsample"] = meta
+    return data
+
 @router.get("/ticks")
 async def get_ticks(
     symbol: str,
@@ -56,61 +191,115 @@ async def import_data(
     file: UploadFile = File(...),
     symbol: str = None,
     exchange: str = None,
-    interval: str = None
+    interval: str = "1m",
+    format: str = None
 ):
-    """导入数据"""
+    """导入数据
+
+    支持 CSV、Parquet、Feather 格式, interval=tick 时导入 Tick 数据。
+    文件按块流式解析并批量写入数据库, 导入在线程池中执行不阻塞事件循环,
+    进度通过 WebSocket 以 data_import 消息推送。
+    """
     try:
-        # TODO: 解析文件并导入到数据库
-        # 支持的格式: CSV, Excel, JSON
-        content = await file.read()
-        
-        # TODO: 实现数据导入逻辑
-        return {
-            "message": "数据导入功能待实现",
-            "file": file.filename
-        }
+        if not symbol:
+            raise ValueError("缺少合约代码")
+        vn_exchange = parse_exchange(exchange)
+        if interval != Interval.TICK.value:
+            parse_interval(interval)
+
+        loop = asyncio.get_running_loop()
+        import_id = uuid.uuid4().hex[:12]
+
+        def on_progress(progress: dict):
+            progress["import_id"] = import_id
+            asyncio.run_coroutine_threadsafe(broadcast_data_import(progress), loop)
+
+        importer = DataImporter(
+            file.file,
+            file.filename,
+            symbol,
+            vn_exchange,
+            interval,
+            format,
+            on_progress
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+    try:
+        result = await run_in_threadpool(importer.run)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"数据导入失败: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"数据导入失败: {str(e)}"
         )
 
+    return {
+        "message": "数据导入完成",
+        "import_id": import_id,
+        "result": result
+    }
+
 @router.post("/export")
-async def export_data(
+def export_data(
     symbol: str,
     exchange: str,
-    interval: str = None,
+    interval: str = "1m",
     format: str = "csv",
     start: str = None,
-    end: str = None
+    end: str = None,
+    compression: str = None
 ):
-    """导出数据"""
+    """导出数据
+
+    支持 CSV、Parquet、Arrow IPC (arrow) 格式, interval=tick 时导出 Tick 数据。
+    数据按时间分段从数据库读取并流式输出, 内存占用与时间范围无关;
+    compression 可选 gzip/zstd, 在输出过程中压缩。
+    """
     try:
-        # TODO: 从数据库查询数据并导出
-        # 支持的格式: CSV, Excel, JSON
-        
-        if format == "csv":
-            # TODO: 导出为 CSV
-            pass
-        elif format == "excel":
-            # TODO: 导出为 Excel
-            pass
-        elif format == "json":
-            # TODO: 导出为 JSON
-            pass
-        
-        return {
-            "message": "数据导出功能待实现",
-            "symbol": symbol,
-            "exchange": exchange,
-            "format": format
-        }
-    except Exception as e:
+        vn_exchange = parse_exchange(exchange)
+        if interval != Interval.TICK.value:
+            parse_interval(interval)
+
+        today_end = datetime.now().replace(hour=23, minute=59, second=59, microsecond=0)
+        end_dt = parse_datetime(end, today_end)
+        start_dt = parse_datetime(
+            start,
+            (end_dt - timedelta(days=DEFAULT_QUERY_DAYS)).replace(hour=0, minute=0, second=0)
+        )
+
+        exporter = DataExporter(
+            symbol,
+            vn_exchange,
+            interval,
+            start_dt,
+            end_dt,
+            format,
+            compression
+        )
+    except ValueError as e:
         raise HTTPException(
-            status_code=500,
-            detail=f"数据导出失败: {str(e)}"
+            status_code=400,
+            detail=str(e)
         )
 
+    filename = get_export_filename(symbol, exchange, interval, format, compression)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    media_type = EXPORT_FORMATS[format][1]
+    if compression:
+        # 压缩后的文件整体下载, 不设置 Content-Encoding 以免客户端自动解压
+        media_type = EXPORT_COMPRESSIONS[compression][1]
+
+    return StreamingResponse(exporter, media_type=media_type, headers=headers)
+
 @router.delete("/clean")
 async def clean_data(
     symbol: str = None,
@@ -1,8 +1,9 @@
 # 持仓 API
 
-from fastapi import APIRouter, HTTPException, status
-from typing import List
-import json
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+
+from app.core.oms_hub import POSITIONS, oms_hub
 
 # 创建路由器
 router = APIRouter(
@@ -10,24 +11,30 @@ router = APIRouter(
     tags=["持仓"]
 )
 
-# TODO: 集成 VnPy 引擎
-# from app.core.vnpy_engine import VnPyEngine
-# vnpy_engine = VnPyEngine()
+def find_position(symbol: str) -> Optional[dict]:
+    """按 vt_positionid 查询持仓, 也可为合约代码或 vt_symbol, 返回第一个匹配的持仓"""
+    position = oms_hub.get(POSITIONS, symbol)
+    if position:
+        return position
 
-# 临时数据存储
-positions_db = {}
+    for position in oms_hub.get_all(POSITIONS):
+        if symbol in (position["symbol"], position["vt_symbol"]):
+            return position
+    return None
 
 @router.get("/")
-async def get_all_positions():
-    """获取所有持仓"""
-    return {
-        "positions": list(positions_db.values())
-    }
+async def get_all_positions(since_seq: Optional[int] = None, session: Optional[str] = None):
+    """获取所有持仓
+
+    传入上次返回的 seq 及 session 时只返回之后变化的持仓, full 为 true 时
+    返回的是全量数据。
+    """
+    return oms_hub.get_delta([POSITIONS], since_seq, session)
 
 @router.get("/{symbol}")
 async def get_position(symbol: str):
     """获取持仓详情"""
-    position = positions_db.get(symbol)
+    position = find_position(symbol)
     if not position:
         raise HTTPException(
             status_code=404,
@@ -39,34 +46,33 @@ async def get_position(symbol: str):
 
 @router.get("/{symbol}/pnl")
 async def get_position_pnl(symbol: str):
-    """获取持仓盈亏"""
-    position = positions_db.get(symbol)
+    """获取持仓盈亏, pnl 为网关推送的持仓盈亏"""
+    position = find_position(symbol)
     if not position:
         raise HTTPException(
             status_code=404,
             detail=f"持仓 {symbol} 不存在"
         )
-    
-    # TODO: 计算实际盈亏
+
     return {
         "symbol": symbol,
-        "unrealized_pnl": position.get("unrealized_pnl", 0),
-        "realized_pnl": position.get("realized_pnl", 0),
-        "total_pnl": position.get("unrealized_pnl", 0) + position.get("realized_pnl", 0)
+        "vt_positionid": position["vt_positionid"],
+        "pnl": position["pnl"]
     }
 
 @router.post("/refresh")
 async def refresh_position(symbol: str):
-    """刷新持仓数据"""
-    # TODO: 从 VnPy 引擎刷新持仓数据
-    position = positions_db.get(symbol)
+    """获取最新持仓数据
+
+    网关定时推送持仓, 变化时即时更新, 直接返回最近一次推送的数据。
+    """
+    position = find_position(symbol)
     if not position:
         raise HTTPException(
             status_code=404,
             detail=f"持仓 {symbol} 不存在"
         )
-    
-    # TODO: 实际刷新逻辑
+
     return {
         "message": f"持仓 {symbol} 数据已刷新",
         "position": position
@@ -1,9 +1,13 @@
 # 行情 API
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List
-import json
-import asyncio
+from fastapi import APIRouter, HTTPException, WebSocket
+from typing import List, Set
+
+from vnpy.trader.constant import Exchange
+
+from app.core.tick_cache import tick_cache
+from app.core.vnpy_engine import vnpy_engine
+from app.core.websocket import manager, websocket_endpoint
 
 # 创建路由器
 router = APIRouter(
@@ -11,42 +15,32 @@ router = APIRouter(
     tags=["行情"]
 )
 
-# TODO: 集成 VnPy 引擎
-# from app.core.vnpy_engine import VnPyEngine
-# vnpy_engine = VnPyEngine()
-
-# WebSocket 连接管理
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-manager = ConnectionManager()
+# 通过 REST 接口订阅的合约, 每个合约只持有一次引用, 与 WebSocket 连接的引用分开计数
+rest_subscriptions: Set[str] = set()
 
 @router.get("/")
 async def get_all_quotes():
     """获取所有订阅的行情"""
-    # TODO: 从 VnPy 引擎获取订阅的行情
     return {
-        "quotes": []
+        "quotes": [record.to_dict() for record in tick_cache.get_all()]
     }
 
 @router.get("/{symbol}")
 async def get_quote(symbol: str):
-    """获取指定合约的行情"""
-    # TODO: 从 VnPy 引擎获取最新行情
+    """获取指定合约的行情, symbol 可为 vt_symbol 或合约代码"""
+    record = tick_cache.get(symbol)
+    if not record:
+        raise HTTPException(
+            status_code=404,
+            detail=f"合约 {symbol} 暂无行情"
+        )
     return {
         "symbol": symbol,
-        "last_price": None,
-        "bid_price": None,
-        "ask_price": None,
-        "volume": None
+        "last_price": record.last_price,
+        "bid_price": record.bid_price_1,
+        "ask_price": record.ask_price_1,
+        "volume": record.volume,
+        "tick": record.to_dict()
     }
 
 @router.post("/subscribe")
@@ -55,8 +49,16 @@ async def subscribe_quote(request: dict):
     symbol = request.get("symbol")
     exchange = request.get("exchange")
 
-    # TODO: 实现订阅逻辑
-    # vnpy_engine.subscribe(symbol, exchange)
+    if not symbol or exchange not in Exchange._value2member_map_:
+        raise HTTPException(
+            status_code=400,
+            detail=f"无效的合约: {symbol}.{exchange}"
+        )
+
+    vt_symbol = f"{symbol}.{exchange}"
+    if vt_symbol not in rest_subscriptions:
+        rest_subscriptions.add(vt_symbol)
+        vnpy_engine.subscribe(symbol, exchange)
 
     return {
         "message": f"已订阅 {symbol} 行情",
@@ -66,39 +68,42 @@ async def subscribe_quote(request: dict):
 
 @router.post("/unsubscribe")
 async def unsubscribe_quote(request: dict):
-    """取消订阅行情"""
+    """取消通过 REST 接口订阅的行情, 不影响 WebSocket 连接的订阅"""
     symbol = request.get("symbol")
+    exchange = request.get("exchange")
+
+    if not symbol or exchange not in Exchange._value2member_map_:
+        raise HTTPException(
+            status_code=400,
+            detail=f"无效的合约: {symbol}.{exchange}"
+        )
 
-    # TODO: 实现取消订阅逻辑
-    # vnpy_engine.unsubscribe(symbol)
+    vt_symbol = f"{symbol}.{exchange}"
+    if vt_symbol in rest_subscriptions:
+        rest_subscriptions.discard(vt_symbol)
+        vnpy_engine.unsubscribe(symbol, exchange)
 
     return {
         "message": f"已取消订阅 {symbol} 行情",
-        "symbol": symbol
+        "symbol": symbol,
+        "exchange": exchange
+    }
+
+@router.get("/stream/stats")
+async def get_stream_stats():
+    """获取行情推送连接的发送统计"""
+    return {
+        "connections": manager.get_stats()
     }
 
 @router.websocket("/stream")
 async def quote_stream(websocket: WebSocket):
-    """实时行情流"""
-    await manager.connect(websocket)
-
-    try:
-        while True:
-            # TODO: 获取最新行情数据
-            # ticks = vnpy_engine.get_latest_ticks()
-            ticks = []
-
-            if ticks:
-                await websocket.send_json({
-                    "type": "quotes",
-                    "data": ticks,
-                    "timestamp": asyncio.get_event_loop().time()
-                })
-
-            await asyncio.sleep(1)
-
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
-    except Exception as e:
-        print(f"WebSocket 错误: {e}")
-        manager.disconnect(websocket)
+    """实时行情流
+
+    客户端发送 subscribe_quote/unsubscribe_quote 消息订阅合约,
+    Tick 由 TickHub 在收到 EVENT_TICK 时直接推送, 不再轮询。
+    可通过 ?policy=drop_oldest|conflate 指定发送队列溢出策略,
+    通过 ?encoding=json|msgpack|binary 协商行情帧编码, 默认 JSON,
+    通过 ?batch_ms= 设置批量发送窗口, 窗口内的 Tick 合并为一帧。
+    """
+    await websocket_endpoint(websocket)
@@ -1,7 +1,25 @@
 # 交易 API
 
-from fastapi import APIRouter, HTTPException, status
-from typing import List
+import time
+
+from fastapi import APIRouter, HTTPException
+from typing import List, Optional
+
+from vnpy.trader.object import OrderData
+
+from app.core.data_service import parse_datetime
+from app.core.order_router import (
+    GatewayError,
+    build_order_request,
+    match_order,
+    order_router,
+    order_to_dict,
+    trade_to_dict
+)
+from app.core.oms_hub import COLLECTIONS, ORDERS, TRADES, oms_hub
+from app.core.order_store import DEFAULT_PAGE_SIZE, order_store
+from app.core.risk_engine import risk_engine
+from app.utils.config import settings
 
 # 创建路由器
 router = APIRouter(
@@ -9,102 +27,316 @@ router = APIRouter(
     tags=["交易"]
 )
 
-# TODO: 集成 VnPy 引擎
-# from app.core.vnpy_engine import VnPyEngine
+@router.get("/orders")
+async def get_all_orders(
+    vt_symbol: Optional[str] = None,
+    status: Optional[str] = None,
+    strategy: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    since_seq: Optional[int] = None,
+    session: Optional[str] = None
+):
+    """获取订单
 
-# 临时数据存储
-orders_db = {}
-trades_db = {}
+    可按合约 vt_symbol、状态 status (active/finished)、策略 strategy 及委托时间
+    start/end 筛选 (网关未提供委托时间时按到达时间), 按到达顺序分页, 将返回的 next_cursor 作为下一页的 cursor,
+    next_cursor 为 null 时没有更多订单。
+    传入 since_seq 时忽略其他条件, 只返回该序号之后变化的订单, 见 /sync。
+    """
+    if since_seq is not None:
+        return oms_hub.get_delta([ORDERS], since_seq, session)
+
+    try:
+        orders, next_cursor = order_store.query_orders(
+            vt_symbol,
+            status,
+            strategy,
+            to_timestamp(start),
+            to_timestamp(end),
+            cursor,
+            limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/orders")
-async def get_all_orders():
-    """获取所有订单"""
     return {
-        "orders": list(orders_db.values())
+        "orders": [order_to_dict(order) for order in orders],
+        "next_cursor": next_cursor
     }
 
 @router.get("/orders/{orderid}")
 async def get_order(orderid: str):
-    """获取订单详情"""
-    order = orders_db.get(orderid)
+    """获取订单详情, orderid 为 vt_orderid"""
+    order = order_store.get_order(orderid)
     if not order:
         raise HTTPException(
             status_code=404,
             detail=f"订单 {orderid} 不存在"
         )
     return {
-        "order": order
+        "order": order_to_dict(order)
     }
 
 @router.post("/orders")
 async def create_order(request: dict):
-    """下单"""
-    symbol = request.get("symbol")
-    direction = request.get("direction")
-    offset = request.get("offset")
-    volume = request.get("volume")
-    price = request.get("price")
-    order_type = request.get("order_type", "limit")
-
-    # TODO: 从 VnPy 引擎下单
-    orderid = f"order_{len(orders_db) + 1}"
-
-    order = {
-        "id": orderid,
-        "symbol": symbol,
-        "direction": direction,
-        "offset": offset,
-        "volume": volume,
-        "price": price,
-        "order_type": order_type,
-        "status": "submitted",
-        "created_at": "2026-02-20T00:00:00Z"
-    }
+    """下单
+
+    委托发送前经过风控检查, 未通过时返回 400。网关返回委托号后立即响应,
+    委托状态变化通过 WebSocket 的 order 消息推送, 首个回报中附带各段耗时。
+    """
+    received = time.perf_counter_ns()
 
-    orders_db[orderid] = order
+    try:
+        order_router.get_gateway_name()
+        req = build_order_request(request)
+        result = await order_router.send_order(req, received)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except GatewayError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    vt_orderid = result["vt_orderid"]
+    gateway_name, orderid = vt_orderid.split(".", 1)
+    order = req.create_order_data(orderid, gateway_name)
 
     return {
         "message": "订单已提交",
-        "order": order
+        "vt_orderid": vt_orderid,
+        "order": order_to_dict(order),
+        "latency": result["latency"]
     }
 
+@router.post("/orders/batch")
+async def create_orders(request: dict):
+    """批量下单
+
+    请求体为 {"orders": [...]}, 每笔委托的参数与单笔下单相同。各委托在下单线程
+    的同一次任务中依次发送, 按原顺序逐笔返回结果, 单笔校验失败或被网关拒绝
+    不影响其他委托。
+    """
+    received = time.perf_counter_ns()
+
+    items = request.get("orders")
+    check_batch_size(items, "orders")
+    try:
+        order_router.get_gateway_name()
+    except GatewayError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    results: List[Optional[dict]] = [None] * len(items)
+    reqs = []
+    indexes = []
+    for i, item in enumerate(items):
+        try:
+            reqs.append(build_order_request(item if isinstance(item, dict) else {}))
+            indexes.append(i)
+        except ValueError as e:
+            results[i] = {"index": i, "success": False, "error": str(e)}
+
+    sent = await order_router.send_orders(reqs, received) if reqs else []
+    for i, req, result in zip(indexes, reqs, sent):
+        if "error" in result:
+            results[i] = {"index": i, "success": False, "error": result["error"]}
+            continue
+
+        gateway_name, orderid = result["vt_orderid"].split(".", 1)
+        results[i] = {
+            "index": i,
+            "success": True,
+            "vt_orderid": result["vt_orderid"],
+            "order": order_to_dict(req.create_order_data(orderid, gateway_name)),
+            "latency": result["latency"]
+        }
+
+    submitted = sum(1 for result in results if result["success"])
+    return {
+        "message": f"已提交 {submitted} 笔委托, 失败 {len(results) - submitted} 笔",
+        "submitted": submitted,
+        "failed": len(results) - submitted,
+        "results": results
+    }
+
+@router.delete("/orders/batch")
+async def cancel_orders(request: dict):
+    """批量撤单, 请求体为 {"orderids": [...]}, 按原顺序逐笔返回结果"""
+    orderids = request.get("orderids")
+    check_batch_size(orderids, "orderids")
+
+    results: List[Optional[dict]] = [None] * len(orderids)
+    orders = []
+    indexes = []
+    for i, orderid in enumerate(orderids):
+        order = order_store.get_order(orderid) if isinstance(orderid, str) else None
+        if not order:
+            results[i] = {"index": i, "vt_orderid": orderid, "success": False, "error": f"订单 {orderid} 不存在"}
+        elif not order.is_active():
+            results[i] = {
+                "index": i,
+                "vt_orderid": orderid,
+                "success": False,
+                "error": f"订单 {orderid} 已结束, 状态: {order.status.value}"
+            }
+        else:
+            orders.append(order)
+            indexes.append(i)
+
+    for i, result in zip(indexes, await send_cancels(orders)):
+        results[i] = {"index": i, **result}
+
+    cancelled = sum(1 for result in results if result["success"])
+    return {
+        "message": f"已发送 {cancelled} 笔撤单请求, 失败 {len(results) - cancelled} 笔",
+        "cancelled": cancelled,
+        "failed": len(results) - cancelled,
+        "results": results
+    }
+
+@router.delete("/orders")
+async def cancel_all_orders(vt_symbol: Optional[str] = None, strategy: Optional[str] = None):
+    """全部撤单, 可按合约 vt_symbol 及策略筛选
+
+    strategy 匹配下单时的 reference 或 CTA 策略名称。
+    """
+    orders = [
+        order for order in order_store.get_active_orders()
+        if match_order(order, vt_symbol, strategy)
+    ]
+    results = await send_cancels(orders)
+
+    cancelled = sum(1 for result in results if result["success"])
+    return {
+        "message": f"已发送 {cancelled} 笔撤单请求",
+        "cancelled": cancelled,
+        "failed": len(results) - cancelled,
+        "results": results
+    }
+
+def to_timestamp(value: Optional[str]) -> Optional[float]:
+    """查询时间转换为时间戳, 不带时区时按本地时间处理"""
+    dt = parse_datetime(value, None)
+    return dt.timestamp() if dt else None
+
+def check_batch_size(items, name: str):
+    """校验批量请求的列表长度"""
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail=f"{name} 必须为非空列表")
+    if len(items) > settings.TRADE_BATCH_MAX_ORDERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"单次最多 {settings.TRADE_BATCH_MAX_ORDERS} 笔委托, 当前 {len(items)} 笔"
+        )
+
+async def send_cancels(orders: List[OrderData]) -> List[dict]:
+    """在下单线程中依次撤单, 返回逐笔结果"""
+    if not orders:
+        return []
+
+    try:
+        errors = await order_router.cancel_orders(orders)
+    except GatewayError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return [
+        {"vt_orderid": order.vt_orderid, "success": error is None, "error": error}
+        for order, error in zip(orders, errors)
+    ]
+
 @router.delete("/orders/{orderid}")
 async def cancel_order(orderid: str):
-    """撤单"""
-    order = orders_db.get(orderid)
+    """撤单, 撤单结果通过委托回报推送"""
+    order = order_store.get_order(orderid)
     if not order:
         raise HTTPException(
             status_code=404,
             detail=f"订单 {orderid} 不存在"
         )
+    if not order.is_active():
+        raise HTTPException(
+            status_code=400,
+            detail=f"订单 {orderid} 已结束, 状态: {order.status.value}"
+        )
 
-    # TODO: 从 VnPy 引擎撤单
-    order["status"] = "cancelled"
-    order["cancelled_at"] = "2026-02-20T00:00:00Z"
-
-    orders_db[orderid] = order
+    try:
+        await order_router.cancel_order(order)
+    except GatewayError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
     return {
-        "message": f"订单 {orderid} 已撤消",
-        "order": order
+        "message": f"订单 {orderid} 撤单请求已发送",
+        "order": order_to_dict(order)
     }
 
+@router.get("/sync")
+async def sync_oms(since_seq: Optional[int] = None, session: Optional[str] = None):
+    """委托、成交、持仓及账户的增量同步
+
+    OMS 数据每次变化分配一个全局递增的 seq, WebSocket 推送消息中带有 seq。
+    传入上次同步返回的 seq 及 session 时只返回之后变化的记录; 不传入、服务
+    重启导致 session 变化或 seq 无效时返回全量数据, 此时 full 为 true。
+    WebSocket 断线重连后也可发送 {"type": "resync", "since_seq", "session"}。
+    """
+    return oms_hub.get_delta(COLLECTIONS, since_seq, session)
+
+@router.get("/latency")
+async def get_order_latency():
+    """下单各段耗时统计 (微秒)
+
+    queue 为 HTTP 接收到网关发送, gateway 为网关下单接口调用,
+    ack 为网关发送到首个委托回报, total 为 HTTP 接收到首个委托回报。
+    """
+    return order_router.get_latency_stats()
+
+@router.get("/risk")
+async def get_risk_stats():
+    """风控限额、当前持仓及挂单计数、各规则拒绝次数"""
+    return risk_engine.get_stats()
+
 @router.get("/trades")
-async def get_all_trades():
-    """获取所有成交"""
+async def get_all_trades(
+    vt_symbol: Optional[str] = None,
+    vt_orderid: Optional[str] = None,
+    strategy: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    since_seq: Optional[int] = None,
+    session: Optional[str] = None
+):
+    """获取成交, 筛选、分页及增量方式与订单相同, 另可按委托 vt_orderid 筛选"""
+    if since_seq is not None:
+        return oms_hub.get_delta([TRADES], since_seq, session)
+
+    try:
+        trades, next_cursor = order_store.query_trades(
+            vt_symbol,
+            vt_orderid,
+            strategy,
+            to_timestamp(start),
+            to_timestamp(end),
+            cursor,
+            limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     return {
-        "trades": list(trades_db.values())
+        "trades": [trade_to_dict(trade) for trade in trades],
+        "next_cursor": next_cursor
     }
 
 @router.get("/trades/{tradeid}")
 async def get_trade(tradeid: str):
-    """获取成交详情"""
-    trade = trades_db.get(tradeid)
+    """获取成交详情, tradeid 为 vt_tradeid"""
+    trade = order_store.get_trade(tradeid)
     if not trade:
         raise HTTPException(
             status_code=404,
             detail=f"成交 {tradeid} 不存在"
         )
     return {
-        "trade": trade
+        "trade": trade_to_dict(trade)
     }
@@ -0,0 +1,156 @@
+# 回测资金曲线
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from vnpy.trader.database import DB_TZ
+
+# 逐级合并的 K 线数
+CHART_FACTOR = 4
+
+# 合并到不超过该点数后停止
+CHART_MIN_POINTS = 500
+
+# 按 K 线及逐级合并的分辨率名称, 合并后为 x4、x16 ...
+RESOLUTION_BAR = "bar"
+RESOLUTION_DAILY = "daily"
+RESOLUTION_WEEKLY = "weekly"
+
+ChartLevel = Dict[str, np.ndarray]
+
+def calculate_bar_equity(
+    epoch: np.ndarray,
+    close: np.ndarray,
+    trade_index: np.ndarray,
+    trade_volume: np.ndarray,
+    trade_price: np.ndarray,
+    config: dict
+) -> np.ndarray:
+    """按 K 线逐根盯市计算资金曲线
+
+    trade_volume 多头为正、空头为负。每根 K 线的盈亏为上一根持仓的价差盈亏
+    加上本根成交的交易盈亏并扣除手续费和滑点, 与 vnpy 逐日盯市的计算方式
+    一致, 每日最后一根 K 线的资金等于逐日结果中的 balance。
+    """
+    n = len(close)
+    size = config["size"]
+
+    volume = np.bincount(trade_index, weights=trade_volume, minlength=n)
+    value = np.bincount(trade_index, weights=trade_volume * trade_price, minlength=n)
+    abs_volume = np.abs(trade_volume)
+    cost = np.bincount(
+        trade_index,
+        weights=abs_volume * trade_price * size * config["rate"] + abs_volume * size * config["slippage"],
+        minlength=n
+    )
+
+    pos = np.cumsum(volume)
+    pre_pos = pos - volume
+    price_change = np.diff(close, prepend=close[:1])
+
+    pnl = pre_pos * price_change * size + (volume * close - value) * size - cost
+    return config["capital"] + np.cumsum(pnl)
+
+def build_chart(
+    epoch: np.ndarray,
+    equity: np.ndarray,
+    daily_df: Optional[pd.DataFrame]
+) -> Dict[str, ChartLevel]:
+    """生成多分辨率资金及回撤曲线
+
+    逐 K 线曲线每 CHART_FACTOR 根逐级合并, 每个区间保留起始时间、末尾资金、
+    资金最高/最低及最大回撤, 直到点数不超过 CHART_MIN_POINTS。
+    另按逐日结果生成日线和周线。
+    """
+    drawdown = equity - np.maximum.accumulate(equity)
+    levels = {RESOLUTION_BAR: {"time": epoch, "equity": equity, "drawdown": drawdown}}
+
+    n = len(equity)
+    bucket = CHART_FACTOR
+    while n > CHART_MIN_POINTS and bucket < n * CHART_FACTOR:
+        starts = np.arange(0, n, bucket)
+        ends = np.minimum(starts + bucket, n) - 1
+        levels[f"x{bucket}"] = {
+            "time": epoch[starts],
+            "equity": equity[ends],
+            "equity_high": np.maximum.reduceat(equity, starts),
+            "equity_low": np.minimum.reduceat(equity, starts),
+            "drawdown": np.minimum.reduceat(drawdown, starts)
+        }
+        if len(starts) <= CHART_MIN_POINTS:
+            break
+        bucket *= CHART_FACTOR
+
+    if daily_df is not None and not daily_df.empty and "balance" in daily_df:
+        levels.update(build_period_levels(daily_df))
+    return levels
+
+def build_period_levels(daily_df: pd.DataFrame) -> Dict[str, ChartLevel]:
+    """由逐日结果生成日线及周线, 时间为当天零点"""
+    dates = pd.DatetimeIndex(daily_df.index)
+    balance = daily_df["balance"].to_numpy(dtype=np.float64)
+    drawdown = daily_df["drawdown"].to_numpy(dtype=np.float64)
+
+    levels = {
+        RESOLUTION_DAILY: {
+            "time": get_date_epoch(dates),
+            "equity": balance,
+            "drawdown": drawdown
+        }
+    }
+
+    weeks = (dates - pd.to_timedelta(dates.weekday, unit="D")).values
+    starts = np.flatnonzero(np.concatenate(([True], weeks[1:] != weeks[:-1])))
+    ends = np.append(starts[1:], len(weeks)) - 1
+    levels[RESOLUTION_WEEKLY] = {
+        "time": get_date_epoch(pd.DatetimeIndex(weeks[starts])),
+        "equity": balance[ends],
+        "equity_high": np.maximum.reduceat(balance, starts),
+        "equity_low": np.minimum.reduceat(balance, starts),
+        "drawdown": np.minimum.reduceat(drawdown, starts)
+    }
+    return levels
+
+def get_date_epoch(dates: pd.DatetimeIndex) -> np.ndarray:
+    """日期转换为数据库时区零点的毫秒时间戳
+
+    由 date 构造的索引精度为秒, 不能按纳秒换算 asi8, 先统一到毫秒。
+    """
+    return dates.tz_localize(DB_TZ).as_unit("ms").asi8.astype(np.int64)
+
+def get_level_order(names: List[str]) -> List[str]:
+    """逐 K 线分辨率按从细到粗排序"""
+    bar_levels = [name for name in names if name == RESOLUTION_BAR or name.startswith("x")]
+    return sorted(bar_levels, key=lambda name: 1 if name == RESOLUTION_BAR else int(name[1:]))
+
+def select_resolution(levels: Dict[str, np.ndarray], start: Optional[int], end: Optional[int], points: int) -> Optional[str]:
+    """选择区间内点数不超过 points 的最细分辨率
+
+    levels 为各分辨率的时间列, 无逐 K 线曲线时使用日线。
+    """
+    order = get_level_order(list(levels))
+    if not order:
+        return RESOLUTION_DAILY if RESOLUTION_DAILY in levels else None
+
+    for name in order:
+        lo, hi = get_slice(levels[name], start, end)
+        if hi - lo <= points:
+            return name
+    return order[-1]
+
+def get_slice(time: np.ndarray, start: Optional[int], end: Optional[int]) -> tuple:
+    """时间区间在有序时间列中的位置, 包含区间开始前的最后一个点"""
+    lo = 0 if start is None else max(int(np.searchsorted(time, start, side="right")) - 1, 0)
+    hi = len(time) if end is None else int(np.searchsorted(time, end, side="right"))
+    return lo, hi
+
+def to_epoch(value: Optional[datetime]) -> Optional[int]:
+    """查询时间转换为毫秒时间戳, 不带时区时按数据库时区处理"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=DB_TZ)
+    return int(value.timestamp() * 1000)
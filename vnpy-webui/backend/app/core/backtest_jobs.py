@@ -0,0 +1,377 @@
+# 回测任务管理
+
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from queue import Empty
+from threading import Lock, Thread
+from typing import Dict, List, Optional, Tuple
+
+from app.core.backtest_runner import BacktestCancelled, get_strategy_hash, init_worker, run_backtest
+from app.core.backtest_optimizer import OptimizationRunner
+from app.core.backtest_store import backtest_store
+from app.core.backtest_walk_forward import WalkForwardRunner
+from app.core.shared_bars import shared_bar_cache
+from app.core.vector_backtest import ENGINE_VECTOR, run_vector_backtest
+from app.core.websocket import broadcast_backtest
+from app.utils.config import settings
+
+# 任务类型
+JOB_BACKTEST = "backtest"
+JOB_OPTIMIZATION = "optimization"
+JOB_WALK_FORWARD = "walk_forward"
+
+# 任务状态
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_FINISHED = "finished"
+STATUS_FAILED = "failed"
+STATUS_STOPPED = "stopped"
+
+FINISHED_STATUSES = {STATUS_FINISHED, STATUS_FAILED, STATUS_STOPPED}
+
+# 准备历史数据并提交任务的线程数
+DISPATCH_THREADS = 4
+
+class QueueFullError(Exception):
+    """等待中的回测任务已达上限"""
+    pass
+
+class BacktestJobManager:
+    """回测任务管理器
+
+    回测在进程池中执行, 不占用事件循环和 API 线程。等待中的任务数有上限,
+    超出时拒绝提交。子进程通过队列汇报进度, 由后台线程更新任务状态并通过
+    WebSocket 推送; 停止请求写入共享字典, 子进程在回放过程中检查后中断。
+    内存中只保留未结束的任务, 结束后写入结果存储, 查询已结束的任务时
+    从存储读取。
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, dict] = {}
+        self.futures: Dict[str, Future] = {}
+        self.lock = Lock()
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.dispatcher: Optional[ThreadPoolExecutor] = None
+        self.sync_manager = None
+        self.progress_queue = None
+        self.cancel_flags = None
+        self.progress_thread: Optional[Thread] = None
+        self.active = False
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """启动进程池"""
+        if self.active:
+            return
+
+        self.loop = loop
+
+        # 使用 spawn 启动子进程, 避免复制主进程中的事件引擎线程和网关连接
+        context = multiprocessing.get_context("spawn")
+        self.sync_manager = context.Manager()
+        self.progress_queue = context.Queue()
+        self.cancel_flags = self.sync_manager.dict()
+        self.executor = ProcessPoolExecutor(
+            max_workers=settings.BACKTEST_MAX_WORKERS or None,
+            mp_context=context,
+            initializer=init_worker,
+            initargs=(self.progress_queue, self.cancel_flags)
+        )
+
+        self.dispatcher = ThreadPoolExecutor(max_workers=DISPATCH_THREADS)
+
+        self.active = True
+        self.progress_thread = Thread(target=self.process_progress, daemon=True)
+        self.progress_thread.start()
+
+    def stop(self):
+        """关闭进程池, 未开始的任务标记为已停止"""
+        if not self.active:
+            return
+        self.active = False
+
+        with self.lock:
+            job_ids = list(self.jobs)
+        for job_id in job_ids:
+            self.cancel(job_id)
+        self.dispatcher.shutdown(wait=False, cancel_futures=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        shared_bar_cache.clear()
+
+        self.progress_queue.put(None)
+        self.progress_thread.join()
+        self.sync_manager.shutdown()
+        backtest_store.close()
+
+    def submit(self, config: dict) -> Tuple[dict, bool]:
+        """提交回测任务, 等待中的任务已满时抛出 QueueFullError
+
+        相同内容的回测已完成时直接返回已有结果, 正在执行时返回该任务,
+        返回值第二项表示是否复用了已有任务。
+        """
+        cache_key = get_cache_key(config)
+
+        with self.lock:
+            for job in self.jobs.values():
+                if job.get("cache_key") == cache_key and job["status"] not in FINISHED_STATUSES:
+                    return job, True
+
+            cached = backtest_store.find_cached(cache_key)
+            if cached:
+                return cached, True
+
+            job = self.create_job(config, JOB_BACKTEST)
+            job["cache_key"] = cache_key
+
+        self.dispatcher.submit(self.dispatch, job["id"], config)
+        return job, False
+
+    def dispatch(self, job_id: str, config: dict):
+        """准备共享历史数据后提交到进程池"""
+        try:
+            config = {**config, "history": shared_bar_cache.get(config)}
+        except Exception:
+            # 共享内存不可用时子进程自行从数据库加载
+            pass
+
+        with self.lock:
+            cancelled = self.is_cancelled(job_id)
+            if not cancelled:
+                func = run_vector_backtest if config.get("engine") == ENGINE_VECTOR else run_backtest
+                future = self.executor.submit(func, job_id, config)
+                self.futures[job_id] = future
+
+        if cancelled:
+            self.finish(job_id, STATUS_STOPPED)
+            return
+
+        future.add_done_callback(lambda f: self.on_done(job_id, f))
+
+    def submit_optimization(self, config: dict, optimization: dict) -> dict:
+        """提交参数优化任务, 由后台线程拆分后提交到进程池"""
+        with self.lock:
+            job = self.create_job(config, JOB_OPTIMIZATION)
+            job["optimization"] = optimization
+
+        runner = OptimizationRunner(self, job["id"], config, optimization)
+        Thread(target=self.run_optimization, args=(job["id"], runner), daemon=True).start()
+        return job
+
+    def submit_walk_forward(self, config: dict, optimization: dict, walk_forward: dict) -> dict:
+        """提交滚动窗口回测任务, 由后台线程拆分窗口后提交到进程池"""
+        with self.lock:
+            job = self.create_job(config, JOB_WALK_FORWARD)
+            job["optimization"] = optimization
+            job["walk_forward"] = walk_forward
+
+        runner = WalkForwardRunner(self, job["id"], config, optimization, walk_forward)
+        Thread(target=self.run_optimization, args=(job["id"], runner), daemon=True).start()
+        return job
+
+    def run_optimization(self, job_id: str, runner):
+        """执行参数优化或滚动窗口回测并记录结束状态"""
+        try:
+            results = runner.run()
+        except BacktestCancelled:
+            self.finish(job_id, STATUS_STOPPED)
+        except Exception as e:
+            self.finish(job_id, STATUS_FAILED, error=str(e))
+        else:
+            self.finish(job_id, STATUS_FINISHED, results)
+
+    def create_job(self, config: dict, job_type: str) -> dict:
+        """创建任务记录, 调用方需持有锁"""
+        queued = sum(1 for job in self.jobs.values() if job["status"] == STATUS_QUEUED)
+        if queued >= settings.BACKTEST_QUEUE_SIZE:
+            raise QueueFullError(f"等待中的回测任务已达上限 {settings.BACKTEST_QUEUE_SIZE}")
+
+        job_id = f"{job_type}_{uuid.uuid4().hex[:12]}"
+        job = {
+            "id": job_id,
+            "type": job_type,
+            "strategy_name": config["class_name"],
+            "symbol": config["vt_symbol"],
+            "interval": config["interval"],
+            "start_date": config["start"],
+            "end_date": config["end"],
+            "parameters": config["parameters"],
+            "config": config,
+            "status": STATUS_QUEUED,
+            "phase": None,
+            "progress": 0,
+            "created_at": datetime.now().isoformat(),
+            "results": {}
+        }
+        self.jobs[job_id] = job
+        return job
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """停止回测, 未开始的任务直接取消, 运行中的任务通知子进程中断"""
+        job = self.jobs.get(job_id)
+        if not job or job["status"] in FINISHED_STATUSES:
+            return job
+
+        self.cancel_flags[job_id] = True
+        future = self.futures.get(job_id)
+        if future and future.cancel():
+            # 取消成功时 done 回调已同步执行
+            return job
+
+        job["stopping"] = True
+        self.publish(job)
+        return job
+
+    def on_done(self, job_id: str, future: Future):
+        """任务结束回调, 在进程池管理线程中执行
+
+        未开始的任务被取消时回调在调用 cancel 的线程 (事件循环) 中同步执行,
+        保存结果转交调度线程, 不阻塞事件循环。
+        """
+        self.futures.pop(job_id, None)
+
+        if future.cancelled():
+            if self.active:
+                self.dispatcher.submit(self.finish, job_id, STATUS_STOPPED)
+            else:
+                self.finish(job_id, STATUS_STOPPED)
+            return
+
+        try:
+            results = future.result()
+        except BacktestCancelled:
+            self.finish(job_id, STATUS_STOPPED)
+        except Exception as e:
+            self.finish(job_id, STATUS_FAILED, error=str(e))
+        else:
+            self.finish(job_id, STATUS_FINISHED, results)
+
+    def finish(self, job_id: str, status: str, results: dict = None, error: str = None):
+        """记录任务结束状态, 保存后移出内存并推送
+
+        可能由进程池回调、调度线程及优化线程同时调用, 只有第一次调用生效。
+        保存结果期间任务仍留在内存中, 保存不持有锁。
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job["status"] in FINISHED_STATUSES:
+                return
+
+            job["status"] = status
+            if results is not None:
+                job["results"] = results
+            if status == STATUS_FINISHED:
+                job["progress"] = 1
+            if error:
+                job["error"] = error
+
+            job.pop("stopping", None)
+            job["phase"] = None
+            job["finished_at"] = datetime.now().isoformat()
+            if status == STATUS_STOPPED:
+                job["stopped_at"] = job["finished_at"]
+
+        if self.active:
+            self.cancel_flags.pop(job_id, None)
+        backtest_store.save(get_job_summary(job), job["config"], job["results"])
+
+        with self.lock:
+            self.jobs.pop(job_id, None)
+        self.publish(job)
+
+    def update_progress(self, job_id: str, phase: str, progress: float):
+        """更新运行中任务的进度"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job["status"] in FINISHED_STATUSES:
+                return
+
+            job["status"] = STATUS_RUNNING
+            job["phase"] = phase
+            job["progress"] = progress
+            job.setdefault("started_at", datetime.now().isoformat())
+        self.publish(job)
+
+    def is_cancelled(self, job_id: str) -> bool:
+        """是否收到停止请求"""
+        return job_id in self.cancel_flags
+
+    def process_progress(self):
+        """读取子进程进度并推送"""
+        while True:
+            try:
+                item = self.progress_queue.get(timeout=1)
+            except Empty:
+                continue
+            if item is None:
+                return
+
+            self.update_progress(*item)
+
+    def publish(self, job: dict):
+        """通过 WebSocket 推送任务状态"""
+        if not self.loop or self.loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(broadcast_backtest(get_job_summary(job)), self.loop)
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """获取任务, 已结束的任务返回存储中的概要"""
+        job = self.jobs.get(job_id)
+        if job:
+            return job
+        return backtest_store.get(job_id, detail=True)
+
+    def get_all_jobs(self, limit: Optional[int] = None, offset: int = 0) -> Tuple[List[dict], int]:
+        """获取任务概要及任务总数
+
+        未结束的任务按创建时间倒序排在前面, 之后为存储中已结束的任务,
+        limit/offset 作用于合并后的列表。
+        """
+        with self.lock:
+            active = [
+                get_job_summary(job) for job in self.jobs.values()
+                if job["status"] not in FINISHED_STATUSES
+            ]
+        active.sort(key=lambda job: job["created_at"], reverse=True)
+
+        jobs = active[offset:] if limit is None else active[offset:offset + limit]
+        remaining = None if limit is None else limit - len(jobs)
+        if remaining is None or remaining > 0:
+            jobs += backtest_store.list(remaining, max(offset - len(active), 0))
+        return jobs, len(active) + backtest_store.count()
+
+    def get_results(self, job_id: str) -> Optional[dict]:
+        """获取任务结果, 运行中的优化任务返回当前最优结果"""
+        job = self.jobs.get(job_id)
+        if job:
+            return job["results"]
+        return backtest_store.load_results(job_id)
+
+def get_cache_key(config: dict) -> str:
+    """回测内容键: 策略源码哈希、回测配置、持久化的数据版本号及数据库概要
+
+    数据库概要 data_stamp 由提交时的配置带入, 覆盖不经过本服务写入数据的情况。
+    """
+    content = {key: value for key, value in config.items() if key not in ("history", "data_version")}
+    content["strategy_hash"] = get_strategy_hash(config["class_name"])
+    content["data_version"] = backtest_store.get_data_version(config["vt_symbol"])
+
+    text = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def get_job_summary(job: dict) -> dict:
+    """任务概要, 不含回测结果; 优化任务附带当前最优的参数组合, 滚动窗口任务附带已完成的窗口"""
+    summary = {key: value for key, value in job.items() if key not in ("results", "config")}
+    if job.get("type") == JOB_OPTIMIZATION and job.get("results"):
+        summary["top"] = job["results"].get("top", [])
+    elif job.get("type") == JOB_WALK_FORWARD and job.get("results"):
+        summary["windows"] = job["results"].get("windows", [])
+        summary["summary"] = job["results"].get("summary", {})
+    return summary
+
+backtest_job_manager = BacktestJobManager()
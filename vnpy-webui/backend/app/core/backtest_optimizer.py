@@ -0,0 +1,246 @@
+# 参数优化
+
+import heapq
+import math
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from random import choice, random
+from typing import Dict, List, Set
+
+from deap import algorithms, base, creator, tools
+# 导入时注册 DEAP 的 FitnessMax 及 Individual 类型
+from vnpy.trader.optimize import OptimizationSetting
+
+from app.core.backtest_runner import BacktestCancelled, run_optimization_chunk
+from app.core.shared_bars import shared_bar_cache
+from app.core.vector_backtest import ENGINE_VECTOR, run_vector_optimization_chunk
+from app.utils.config import settings
+
+# 优化算法: bf 穷举, ga 遗传算法
+OPTIMIZATION_BF = "bf"
+OPTIMIZATION_GA = "ga"
+OPTIMIZATION_MODES = {OPTIMIZATION_BF, OPTIMIZATION_GA}
+
+PHASE_OPTIMIZING = "optimizing"
+
+# 进度推送的最小间隔 (秒)
+PUBLISH_INTERVAL = 0.5
+
+# 目标值缺失时的排序值
+MIN_TARGET = -sys.float_info.max
+
+def build_optimization_setting(parameters: dict, target_name: str) -> OptimizationSetting:
+    """请求中的参数范围转换为 OptimizationSetting, 无效时抛出 ValueError
+
+    参数可以是 {"start", "end", "step"} 范围、取值列表或单个固定值。
+    """
+    setting = OptimizationSetting()
+
+    for name, value in parameters.items():
+        if isinstance(value, dict):
+            if value.get("start") is None:
+                raise ValueError(f"参数 {name} 缺少起始值")
+            success, msg = setting.add_parameter(name, value["start"], value.get("end"), value.get("step"))
+            if not success:
+                raise ValueError(f"参数 {name}: {msg}")
+        elif isinstance(value, list):
+            if not value:
+                raise ValueError(f"参数 {name} 取值为空")
+            setting.params[name] = value
+        else:
+            setting.add_parameter(name, value)
+
+    if not setting.params:
+        raise ValueError("优化参数为空")
+
+    count = math.prod(len(values) for values in setting.params.values())
+    if count > settings.BACKTEST_OPTIMIZATION_MAX_SETTINGS:
+        raise ValueError(f"参数组合数 {count} 超过上限 {settings.BACKTEST_OPTIMIZATION_MAX_SETTINGS}")
+
+    setting.set_target(target_name)
+    return setting
+
+def get_target_value(result: dict) -> float:
+    """排序用的目标值"""
+    value = result["target"]
+    return MIN_TARGET if value is None else value
+
+def mutate_individual(individual: list, parameter_tuples: List[list], indpb: float) -> tuple:
+    """随机替换部分参数为另一组合中的取值"""
+    paramlist = choice(parameter_tuples)
+    for i in range(len(individual)):
+        if random() < indpb:
+            individual[i] = paramlist[i]
+    return individual,
+
+class OptimizationRunner:
+    """参数优化
+
+    参数组合按块提交到回测进程池, 子进程对同一合约及区间只加载一次历史数据。
+    在途的块数量有限, 其他用户的回测可以穿插执行, 停止时未开始的块直接取消。
+    每完成一块即合并当前最优的 top_n 组参数并推送。遗传算法每一代的个体
+    同样按块并行评估, 已评估过的参数组合直接复用结果。
+    """
+
+    def __init__(self, manager, job_id: str, config: dict, optimization: dict):
+        self.manager = manager
+        self.job_id = job_id
+        self.config = config
+
+        self.mode = optimization["mode"]
+        self.target_name = optimization["target"]
+        self.top_n = optimization["top_n"]
+        self.pop_size = optimization["pop_size"]
+        self.ngen = optimization["ngen"]
+        self.setting = build_optimization_setting(optimization["parameters"], self.target_name)
+
+        # 向量化模式下每组参数只需数毫秒, 适合先大范围筛选
+        if config.get("engine") == ENGINE_VECTOR:
+            self.chunk_func = run_vector_optimization_chunk
+        else:
+            self.chunk_func = run_optimization_chunk
+
+        self.workers = settings.BACKTEST_MAX_WORKERS or os.cpu_count() or 1
+        self.total = 0
+        self.evaluated = 0
+        self.top: List[dict] = []
+        self.last_publish = 0
+
+        # 遗传算法中已评估参数组合的目标值
+        self.cache: Dict[tuple, float] = {}
+        self.generation = 0
+        self.use_ga = False
+
+    def run(self) -> dict:
+        """执行优化, 返回最优参数组合"""
+        setting_list = self.setting.generate_settings()
+        self.total = len(setting_list)
+
+        # 历史数据加载到共享内存, 各子进程直接附加
+        if not self.config.get("history"):
+            try:
+                self.config = {**self.config, "history": shared_bar_cache.get(self.config)}
+            except Exception:
+                pass
+
+        # 单个参数无法交叉, 遗传算法退化为穷举
+        self.use_ga = self.mode == OPTIMIZATION_GA and len(self.setting.params) > 1
+        if self.use_ga:
+            self.run_ga(setting_list)
+        else:
+            self.evaluate(setting_list)
+
+        return self.get_results()
+
+    def evaluate(self, setting_list: List[dict]) -> List[dict]:
+        """分块并行回测参数组合"""
+        chunk_size = max(1, min(
+            settings.BACKTEST_OPTIMIZATION_CHUNK_SIZE,
+            math.ceil(len(setting_list) / (self.workers * 4))
+        ))
+        chunks = [setting_list[i: i + chunk_size] for i in range(0, len(setting_list), chunk_size)]
+
+        results: List[dict] = []
+        pending: Set[Future] = set()
+        index = 0
+
+        try:
+            while index < len(chunks) or pending:
+                if self.manager.is_cancelled(self.job_id):
+                    raise BacktestCancelled()
+
+                while index < len(chunks) and len(pending) < self.workers * 2:
+                    future = self.manager.executor.submit(
+                        self.chunk_func,
+                        self.job_id,
+                        self.config,
+                        chunks[index],
+                        self.target_name
+                    )
+                    pending.add(future)
+                    index += 1
+
+                done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_results = future.result()
+                    results.extend(chunk_results)
+                    self.add_results(chunk_results)
+        finally:
+            for future in pending:
+                future.cancel()
+
+        return results
+
+    def add_results(self, results: List[dict]):
+        """合并最优结果, 按间隔推送进度"""
+        self.evaluated += len(results)
+        self.top = heapq.nlargest(self.top_n, self.top + results, key=get_target_value)
+
+        now = time.monotonic()
+        if now - self.last_publish >= PUBLISH_INTERVAL:
+            self.last_publish = now
+            self.publish()
+
+    def get_progress(self) -> float:
+        """优化进度"""
+        if self.use_ga:
+            progress = self.generation / (self.ngen + 1)
+        else:
+            progress = self.evaluated / self.total if self.total else 0
+        return min(progress, 1)
+
+    def publish(self):
+        """更新任务进度及当前最优结果"""
+        job = self.manager.get_job(self.job_id)
+        job["results"] = self.get_results()
+        self.manager.update_progress(self.job_id, PHASE_OPTIMIZING, round(self.get_progress(), 4))
+
+    def get_results(self) -> dict:
+        """优化结果"""
+        return {
+            "mode": self.mode,
+            "target": self.target_name,
+            "total": self.total,
+            "evaluated": self.evaluated,
+            "top": self.top
+        }
+
+    def run_ga(self, setting_list: List[dict]):
+        """遗传算法优化, 与 vnpy run_ga_optimization 使用相同的算子"""
+        parameter_tuples = [list(setting.items()) for setting in setting_list]
+
+        toolbox = base.Toolbox()
+        toolbox.register("individual", tools.initIterate, creator.Individual, lambda: choice(parameter_tuples))
+        toolbox.register("population", tools.initRepeat, list, toolbox.individual)
+        toolbox.register("mate", tools.cxTwoPoint)
+        toolbox.register("mutate", mutate_individual, parameter_tuples=parameter_tuples, indpb=1.0)
+        toolbox.register("select", tools.selNSGA2)
+        toolbox.register("map", self.ga_map)
+        toolbox.register("evaluate", lambda individual: (self.cache[tuple(individual)],))
+
+        cxpb = 0.95
+        algorithms.eaMuPlusLambda(
+            toolbox.population(self.pop_size),
+            toolbox,
+            int(self.pop_size * 0.8),
+            self.pop_size,
+            cxpb,
+            1 - cxpb,
+            self.ngen,
+            verbose=False
+        )
+
+    def ga_map(self, func, individuals: list) -> list:
+        """并行评估一代个体, 替代 DEAP 默认的逐个评估"""
+        keys = [tuple(individual) for individual in individuals]
+        new_keys = [key for key in dict.fromkeys(keys) if key not in self.cache]
+
+        if new_keys:
+            for result in self.evaluate([dict(key) for key in new_keys]):
+                self.cache[tuple(result["setting"].items())] = get_target_value(result)
+
+        self.generation += 1
+        self.publish()
+        return [func(individual) for individual in individuals]
@@ -0,0 +1,363 @@
+# 回测执行 (运行于进程池子进程)
+
+import hashlib
+from bisect import bisect_left, bisect_right
+import importlib
+import importlib.util
+import inspect
+import os
+import pkgutil
+import sys
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from vnpy.trader.constant import Direction, Interval
+from vnpy.trader.database import DB_TZ
+from vnpy_ctastrategy import CtaTemplate
+from vnpy_ctastrategy.backtesting import BacktestingEngine, BacktestingMode
+
+from app.core.backtest_chart import build_chart, calculate_bar_equity
+from app.core.shared_bars import load_shared_bars
+from app.utils.config import settings
+
+# 任务阶段
+PHASE_LOADING = "loading"
+PHASE_RUNNING = "running"
+PHASE_CALCULATING = "calculating"
+
+# 成交模型: 策略发出的限价单在下一根 K 线 (Tick) 按最高/最低价撮合
+FILL_LIMIT_ORDER = "limit_order"
+
+# 策略目录加载后的包名
+STRATEGY_PACKAGE = "strategies"
+
+# 子进程全局状态, 由 init_worker 在进程启动时设置
+progress_queue = None
+cancel_flags = None
+
+# 子进程内缓存的历史数据, 同一优化任务的多组参数只加载一次
+HISTORY_CACHE_SIZE = 2
+history_cache: "OrderedDict[tuple, list]" = OrderedDict()
+
+class BacktestCancelled(Exception):
+    """回测被用户停止"""
+    pass
+
+def init_worker(queue, flags):
+    """进程池初始化, 保存进度队列和停止标记"""
+    global progress_queue, cancel_flags
+    progress_queue = queue
+    cancel_flags = flags
+
+@lru_cache()
+def get_strategy_classes() -> Dict[str, type]:
+    """加载 vnpy_ctastrategy 自带策略及策略目录下的策略类"""
+    classes: Dict[str, type] = {}
+
+    import vnpy_ctastrategy.strategies as package
+    for module_info in pkgutil.iter_modules(package.__path__):
+        try:
+            module = importlib.import_module(f"{package.__name__}.{module_info.name}")
+        except Exception:
+            continue
+        load_classes_from_module(module, classes)
+
+    path = os.path.abspath(os.path.expanduser(settings.STRATEGY_PATH))
+    if os.path.isdir(path):
+        load_strategy_package(path)
+        for filename in sorted(os.listdir(path)):
+            if not filename.endswith(".py") or filename.startswith("_"):
+                continue
+            try:
+                module = importlib.import_module(f"{STRATEGY_PACKAGE}.{filename[:-3]}")
+            except Exception:
+                continue
+            load_classes_from_module(module, classes)
+
+    return classes
+
+def load_strategy_package(path: str):
+    """策略目录注册为 strategies 包, 策略文件可相对导入包内的指标库等模块"""
+    spec = importlib.util.spec_from_file_location(
+        STRATEGY_PACKAGE,
+        os.path.join(path, "__init__.py"),
+        submodule_search_locations=[path]
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[STRATEGY_PACKAGE] = package
+    if os.path.exists(spec.origin):
+        spec.loader.exec_module(package)
+
+def load_classes_from_module(module, classes: Dict[str, type]):
+    """收集模块中定义的策略类"""
+    for name, value in inspect.getmembers(module, inspect.isclass):
+        if issubclass(value, CtaTemplate) and value is not CtaTemplate and value.__module__ == module.__name__:
+            classes[name] = value
+
+def get_strategy_class(class_name: str) -> Optional[type]:
+    """按类名查找策略类"""
+    return get_strategy_classes().get(class_name)
+
+@lru_cache()
+def get_strategy_hash(class_name: str) -> str:
+    """策略源码哈希, 策略目录下的策略包含整个目录的源码, 以覆盖包内引用的模块"""
+    strategy_class = get_strategy_class(class_name)
+    filepath = inspect.getsourcefile(strategy_class)
+
+    if strategy_class.__module__.startswith(STRATEGY_PACKAGE + "."):
+        path = os.path.dirname(filepath)
+        filepaths = [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".py")]
+    else:
+        filepaths = [filepath]
+
+    digest = hashlib.sha256()
+    for filepath in filepaths:
+        with open(filepath, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+class JobBacktestingEngine(BacktestingEngine):
+    """回测引擎, 回放过程中汇报进度并响应停止请求"""
+
+    def __init__(self, job_id: str, report: bool = True):
+        super().__init__()
+        self.job_id = job_id
+        self.report = report
+        self.bar_count = 0
+        self.report_step = 1
+        self.cancelled = False
+
+    def output(self, msg: str):
+        """回测日志只保留在引擎内, 不打印"""
+        self.logs.append(msg)
+
+    def run_backtesting(self):
+        """回放前按数据量确定汇报间隔, 约每 1% 汇报一次"""
+        self.bar_count = 0
+        self.report_step = max(len(self.history_data) // 100, 1)
+        super().run_backtesting()
+
+        if self.cancelled:
+            raise BacktestCancelled()
+
+    def new_bar(self, bar):
+        self.bar_count += 1
+        if self.bar_count % self.report_step == 0:
+            self.check_progress()
+        super().new_bar(bar)
+
+    def new_tick(self, tick):
+        self.bar_count += 1
+        if self.bar_count % self.report_step == 0:
+            self.check_progress()
+        super().new_tick(tick)
+
+    def check_progress(self):
+        """汇报回放进度, 收到停止请求时中断回放"""
+        if is_cancelled(self.job_id):
+            # 基类 run_backtesting 捕获异常后结束回放
+            self.cancelled = True
+            raise BacktestCancelled()
+
+        if self.report:
+            report_progress(self.job_id, PHASE_RUNNING, self.bar_count / len(self.history_data))
+
+def report_progress(job_id: str, phase: str, progress: float):
+    """发送进度到主进程"""
+    if progress_queue is not None:
+        progress_queue.put((job_id, phase, round(progress, 4)))
+
+def to_python(value):
+    """统计结果中的 NumPy 及日期类型转换为可序列化的值"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+def is_cancelled(job_id: str) -> bool:
+    """是否收到停止请求"""
+    return cancel_flags is not None and job_id in cancel_flags
+
+def create_engine(job_id: str, config: dict, setting: dict, report: bool = True) -> JobBacktestingEngine:
+    """按回测配置创建引擎并添加策略"""
+    strategy_class = get_strategy_class(config["class_name"])
+    if not strategy_class:
+        raise ValueError(f"策略 {config['class_name']} 不存在")
+
+    interval = Interval(config["interval"])
+    engine = JobBacktestingEngine(job_id, report)
+    engine.set_parameters(
+        vt_symbol=config["vt_symbol"],
+        interval=interval,
+        start=datetime.fromisoformat(config["start"]),
+        end=datetime.fromisoformat(config["end"]),
+        rate=config["rate"],
+        slippage=config["slippage"],
+        size=config["size"],
+        pricetick=config["pricetick"],
+        capital=config["capital"],
+        mode=BacktestingMode.TICK if interval == Interval.TICK else BacktestingMode.BAR
+    )
+    engine.add_strategy(strategy_class, setting)
+    return engine
+
+def load_history(engine: BacktestingEngine, config: dict):
+    """加载历史数据, 同一进程内相同合约、区间及数据版本直接复用
+
+    配置中带有共享内存描述时从主进程共享的列式数据构建, 否则从数据库加载。
+    共享内存中的数据可以覆盖比回测更长的区间 (滚动窗口回测各窗口共用),
+    按回测区间截取后使用。
+    """
+    descriptor = config.get("history")
+    if descriptor:
+        key = ("shared", descriptor["name"])
+    else:
+        key = (engine.vt_symbol, engine.interval, engine.start, engine.end, get_data_key(config))
+
+    history = history_cache.get(key)
+    if history is None:
+        if descriptor:
+            try:
+                history = load_shared_bars(descriptor, engine.symbol, engine.exchange, engine.interval)
+            except FileNotFoundError:
+                # 共享内存已释放, 按回测区间从数据库加载
+                key = (engine.vt_symbol, engine.interval, engine.start, engine.end, get_data_key(config))
+                history = history_cache.get(key)
+
+        if history is None:
+            engine.load_data()
+            history = list(engine.history_data)
+        history_cache[key] = history
+        while len(history_cache) > HISTORY_CACHE_SIZE:
+            history_cache.popitem(last=False)
+    else:
+        history_cache.move_to_end(key)
+
+    if key[0] == "shared":
+        history = slice_history(history, engine.start, engine.end)
+
+    # 回放过程只读取历史数据, 多个引擎可共用同一列表
+    engine.history_data = history
+    if not history:
+        raise ValueError("回测区间内没有历史数据")
+
+def get_data_key(config: dict) -> tuple:
+    """回测配置中的数据版本号及数据库概要"""
+    return (config.get("data_version", 0), config.get("data_stamp", ""))
+
+def slice_history(history: list, start: datetime, end: datetime) -> list:
+    """截取回测区间内的数据, 区间与整段数据相同时不复制"""
+    start = start.replace(tzinfo=DB_TZ) if start.tzinfo is None else start
+    end = end.replace(tzinfo=DB_TZ) if end.tzinfo is None else end
+
+    lo = bisect_left(history, start, key=lambda data: data.datetime)
+    hi = bisect_right(history, end, key=lambda data: data.datetime)
+    if lo == 0 and hi == len(history):
+        return history
+    return history[lo:hi]
+
+def run_backtest(job_id: str, config: dict) -> dict:
+    """执行单个回测, 返回统计指标、逐日结果和成交记录"""
+    if is_cancelled(job_id):
+        raise BacktestCancelled()
+
+    engine = create_engine(job_id, config, config["parameters"])
+
+    report_progress(job_id, PHASE_LOADING, 0)
+    load_history(engine, config)
+
+    report_progress(job_id, PHASE_RUNNING, 0)
+    engine.run_backtesting()
+
+    report_progress(job_id, PHASE_CALCULATING, 1)
+    df = engine.calculate_result()
+    statistics = engine.calculate_statistics(df, output=False)
+
+    return {
+        "statistics": {key: to_python(value) for key, value in statistics.items()},
+        "daily": get_daily_columns(engine),
+        "trades": get_trade_rows(engine),
+        "chart": get_engine_chart(engine, config),
+        "fill_model": FILL_LIMIT_ORDER
+    }
+
+def run_optimization_chunk(job_id: str, config: dict, setting_list: List[dict], target_name: str) -> List[dict]:
+    """在同一子进程内依次回测一组参数, 返回每组参数的目标值及统计指标"""
+    results = []
+
+    for setting in setting_list:
+        if is_cancelled(job_id):
+            raise BacktestCancelled()
+
+        engine = create_engine(job_id, config, {**config["parameters"], **setting}, report=False)
+        load_history(engine, config)
+        engine.run_backtesting()
+        df = engine.calculate_result()
+        statistics = engine.calculate_statistics(df, output=False)
+
+        if statistics and target_name not in statistics:
+            raise ValueError(f"无效的优化目标: {target_name}")
+
+        results.append({
+            "setting": setting,
+            "target": to_python(statistics.get(target_name)),
+            "statistics": {key: to_python(value) for key, value in statistics.items()}
+        })
+
+    return results
+
+def get_daily_columns(engine: BacktestingEngine) -> Dict[str, list]:
+    """逐日结果转换为列式数据, 只保留数值列"""
+    df = engine.daily_df
+    if df is None or df.empty:
+        return {}
+
+    columns = {"date": [d.isoformat() for d in df.index]}
+    for name in df.columns:
+        if name == "trades":
+            continue
+        columns[name] = [to_python(value) for value in df[name].tolist()]
+    return columns
+
+def get_engine_chart(engine: BacktestingEngine, config: dict) -> dict:
+    """由回放数据和成交记录计算逐 K 线资金曲线及多分辨率曲线"""
+    history = engine.history_data
+    epoch = np.array([int(data.datetime.timestamp() * 1000) for data in history], dtype=np.int64)
+    if engine.mode == BacktestingMode.TICK:
+        close = np.array([tick.last_price for tick in history], dtype=np.float64)
+    else:
+        close = np.array([bar.close_price for bar in history], dtype=np.float64)
+
+    trades = engine.get_all_trades()
+    trade_epoch = np.array([int(trade.datetime.timestamp() * 1000) for trade in trades], dtype=np.int64)
+    trade_index = np.maximum(np.searchsorted(epoch, trade_epoch, side="right") - 1, 0)
+    trade_volume = np.array(
+        [trade.volume if trade.direction == Direction.LONG else -trade.volume for trade in trades],
+        dtype=np.float64
+    )
+    trade_price = np.array([trade.price for trade in trades], dtype=np.float64)
+
+    equity = calculate_bar_equity(epoch, close, trade_index, trade_volume, trade_price, config)
+    return build_chart(epoch, equity, engine.daily_df)
+
+def get_trade_rows(engine: BacktestingEngine) -> List[dict]:
+    """成交记录转换为字典"""
+    return [
+        {
+            "tradeid": trade.tradeid,
+            "orderid": trade.orderid,
+            "datetime": trade.datetime.isoformat(),
+            "direction": trade.direction.value if trade.direction else "",
+            "offset": trade.offset.value,
+            "price": trade.price,
+            "volume": trade.volume
+        }
+        for trade in engine.get_all_trades()
+    ]
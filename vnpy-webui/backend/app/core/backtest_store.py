@@ -0,0 +1,296 @@
+# 回测结果存储
+
+import json
+import os
+import shutil
+import sqlite3
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.core.backtest_chart import (
+    RESOLUTION_DAILY,
+    RESOLUTION_WEEKLY,
+    get_level_order,
+    get_slice,
+    select_resolution
+)
+from app.core.backtest_runner import to_python
+from app.core.data_service import save_listeners
+from app.utils.config import settings
+
+# 按列存储的结果表
+TABLE_DAILY = "daily"
+TABLE_TRADES = "trades"
+COLUMN_TABLES = (TABLE_DAILY, TABLE_TRADES)
+
+# 各分辨率资金曲线的表名前缀
+CHART_PREFIX = "chart_"
+
+INDEX_FILENAME = "index.db"
+
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS backtests (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    config TEXT,
+    results TEXT,
+    cache_key TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_backtests_created_at ON backtests (created_at);
+CREATE INDEX IF NOT EXISTS ix_backtests_cache_key ON backtests (cache_key);
+CREATE TABLE IF NOT EXISTS data_versions (
+    vt_symbol TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+# 任务概要中来自结果的字段, 不写入索引
+RESULT_SUMMARY_KEYS = ("top", "windows")
+
+def to_column_array(values: list) -> np.ndarray:
+    """列数据转换为 NumPy 数组, 数值列为 int64/float64, 其余为定长字符串"""
+    if isinstance(values, np.ndarray):
+        return values
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        return np.array(values, dtype=np.int64)
+    if all(value is None or isinstance(value, (int, float)) for value in values):
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    return np.array(["" if value is None else str(value) for value in values], dtype=np.str_)
+
+class BacktestStore:
+    """回测结果存储
+
+    SQLite 只保存任务概要、配置及统计指标等元数据, 列表查询不读取结果数据。
+    逐日结果、成交记录及各分辨率资金曲线按列保存为 .npy 文件, 读取时以
+    内存映射方式打开, 只加载需要的列和区间。参数优化结果较小, 直接以
+    JSON 保存在索引中。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = Lock()
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def get_connection(self) -> sqlite3.Connection:
+        """首次使用时创建目录及索引库"""
+        if not self.connection:
+            os.makedirs(self.path, exist_ok=True)
+            self.connection = sqlite3.connect(
+                os.path.join(self.path, INDEX_FILENAME),
+                check_same_thread=False
+            )
+            self.connection.executescript(CREATE_SQL)
+        return self.connection
+
+    def get_job_path(self, job_id: str) -> str:
+        return os.path.join(self.path, job_id)
+
+    def save(self, summary: dict, config: dict, results: dict):
+        """保存已结束的任务, 逐日结果和成交记录按列写入文件"""
+        # 优化结果中的最优参数及滚动窗口结果只保存在结果中, 列表查询不读取
+        summary = {key: value for key, value in summary.items() if key not in RESULT_SUMMARY_KEYS}
+        results = dict(results or {})
+        tables = {name: results.pop(name) for name in COLUMN_TABLES if name in results}
+        for name, level in results.pop("chart", {}).items():
+            tables[CHART_PREFIX + name] = level
+
+        if tables:
+            self.save_columns(summary["id"], tables)
+            summary = {**summary, "statistics": results.pop("statistics", {})}
+
+        with self.lock:
+            connection = self.get_connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO backtests (id, type, status, created_at, summary, config, results, cache_key) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    summary["id"],
+                    summary["type"],
+                    summary["status"],
+                    summary["created_at"],
+                    json.dumps(summary, ensure_ascii=False),
+                    json.dumps(config, ensure_ascii=False),
+                    json.dumps(results, ensure_ascii=False) if results else None,
+                    summary.get("cache_key")
+                )
+            )
+            connection.commit()
+
+    def save_columns(self, job_id: str, tables: Dict[str, object]):
+        """按列写入 .npy 文件, 先写临时目录再整体替换"""
+        path = self.get_job_path(job_id)
+        temp_path = path + ".tmp"
+        shutil.rmtree(temp_path, ignore_errors=True)
+
+        for table, data in tables.items():
+            # 成交记录为行列表, 转换为列式
+            if isinstance(data, list):
+                data = {name: [row[name] for row in data] for name in (data[0] if data else {})}
+
+            table_path = os.path.join(temp_path, table)
+            os.makedirs(table_path)
+            for name, values in data.items():
+                np.save(os.path.join(table_path, f"{name}.npy"), to_column_array(values))
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(temp_path, path)
+
+    def get(self, job_id: str, detail: bool = False) -> Optional[dict]:
+        """任务概要, detail 为 True 时附带回测配置"""
+        with self.lock:
+            row = self.get_connection().execute(
+                "SELECT summary, config FROM backtests WHERE id = ?", (job_id,)
+            ).fetchone()
+
+        if not row:
+            return None
+
+        summary = json.loads(row[0])
+        if detail and row[1]:
+            summary["config"] = json.loads(row[1])
+        return summary
+
+    def list(self, limit: Optional[int] = None, offset: int = 0) -> List[dict]:
+        """按创建时间倒序列出任务概要"""
+        with self.lock:
+            rows = self.get_connection().execute(
+                "SELECT summary FROM backtests ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def find_cached(self, cache_key: str) -> Optional[dict]:
+        """查找内容键相同且已完成的回测"""
+        with self.lock:
+            row = self.get_connection().execute(
+                "SELECT summary FROM backtests WHERE cache_key = ? AND status = 'finished' "
+                "ORDER BY created_at DESC LIMIT 1",
+                (cache_key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_data_version(self, vt_symbol: str) -> int:
+        """合约的持久化数据版本号, 服务重启后保持不变"""
+        with self.lock:
+            row = self.get_connection().execute(
+                "SELECT version FROM data_versions WHERE vt_symbol = ?", (vt_symbol,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def increase_data_version(self, vt_symbol: str):
+        """合约数据写入后递增数据版本号, 使缓存的回测结果失效"""
+        with self.lock:
+            connection = self.get_connection()
+            connection.execute(
+                "INSERT INTO data_versions (vt_symbol, version) VALUES (?, 1) "
+                "ON CONFLICT (vt_symbol) DO UPDATE SET version = version + 1",
+                (vt_symbol,)
+            )
+            connection.commit()
+
+    def count(self) -> int:
+        """任务总数"""
+        with self.lock:
+            return self.get_connection().execute("SELECT COUNT(*) FROM backtests").fetchone()[0]
+
+    def load_columns(self, job_id: str, table: str, names: Iterable[str] = None) -> Dict[str, np.ndarray]:
+        """以内存映射方式打开结果列, names 为空时打开全部列"""
+        table_path = os.path.join(self.get_job_path(job_id), table)
+        if not os.path.isdir(table_path):
+            return {}
+
+        if names is None:
+            names = sorted(filename[:-4] for filename in os.listdir(table_path) if filename.endswith(".npy"))
+
+        columns = {}
+        for name in names:
+            filepath = os.path.join(table_path, f"{name}.npy")
+            if os.path.exists(filepath):
+                columns[name] = np.load(filepath, mmap_mode="r")
+        return columns
+
+    def load_results(self, job_id: str) -> Optional[dict]:
+        """读取完整结果, 结构与任务执行返回的结果相同"""
+        with self.lock:
+            row = self.get_connection().execute(
+                "SELECT summary, results FROM backtests WHERE id = ?", (job_id,)
+            ).fetchone()
+
+        if not row:
+            return None
+
+        results = json.loads(row[1]) if row[1] else {}
+        daily = self.load_columns(job_id, TABLE_DAILY)
+        trades = self.load_columns(job_id, TABLE_TRADES)
+        if not daily and not trades:
+            return results
+
+        # 日期列放在最前, 与回测结果的列顺序一致
+        daily_columns = {name: daily[name] for name in ["date"] + [name for name in daily if name != "date"] if name in daily}
+        trade_columns = {name: column.tolist() for name, column in trades.items()}
+
+        return {
+            **results,
+            "statistics": json.loads(row[0]).get("statistics", {}),
+            "daily": {name: [to_python(value) for value in column.tolist()] for name, column in daily_columns.items()},
+            "trades": [dict(zip(trade_columns, values)) for values in zip(*trade_columns.values())]
+        }
+
+    def load_chart(
+        self,
+        job_id: str,
+        resolution: str = "auto",
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        points: int = 1000
+    ) -> dict:
+        """读取资金及回撤曲线的一个区间
+
+        resolution 为 auto 时选择区间内点数不超过 points 的最细分辨率。
+        只映射所选分辨率的列并按时间切片, 无效的分辨率抛出 ValueError。
+        """
+        times = self.load_chart_times(job_id)
+        if not times:
+            # 未完成或没有逐日结果的任务
+            return {"resolution": None, "resolutions": [], "chart": {"time": [], "equity": [], "drawdown": []}}
+
+        if resolution == "auto":
+            resolution = select_resolution(times, start, end, points)
+        elif resolution not in times:
+            raise ValueError(f"无效的分辨率: {resolution}")
+
+        lo, hi = get_slice(times[resolution], start, end)
+        columns = self.load_columns(job_id, CHART_PREFIX + resolution)
+        chart = {name: [to_python(value) for value in column[lo:hi].tolist()] for name, column in columns.items()}
+
+        return {
+            "resolution": resolution,
+            "resolutions": get_level_order(list(times)) + [name for name in (RESOLUTION_DAILY, RESOLUTION_WEEKLY) if name in times],
+            "chart": chart
+        }
+
+    def load_chart_times(self, job_id: str) -> Dict[str, np.ndarray]:
+        """各分辨率资金曲线的时间列"""
+        path = self.get_job_path(job_id)
+        if not os.path.isdir(path):
+            return {}
+
+        times = {}
+        for name in sorted(os.listdir(path)):
+            if name.startswith(CHART_PREFIX):
+                times[name[len(CHART_PREFIX):]] = self.load_columns(job_id, name, ["time"])["time"]
+        return times
+
+    def close(self):
+        with self.lock:
+            if self.connection:
+                self.connection.close()
+                self.connection = None
+
+backtest_store = BacktestStore(settings.BACKTEST_RESULT_PATH)
+save_listeners.append(backtest_store.increase_data_version)
@@ -0,0 +1,210 @@
+# 滚动窗口回测
+
+import math
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import List, Optional
+
+from app.core.backtest_optimizer import (
+    PHASE_OPTIMIZING,
+    PUBLISH_INTERVAL,
+    OptimizationRunner,
+    build_optimization_setting
+)
+from app.core.backtest_runner import to_python
+from app.core.shared_bars import shared_bar_cache
+from app.utils.config import settings
+
+def split_windows(
+    start: str,
+    end: str,
+    in_sample_days: int,
+    out_sample_days: int,
+    step_days: int,
+    anchored: bool = False
+) -> List[dict]:
+    """回测区间拆分为样本内/样本外窗口
+
+    样本内区间长度为 in_sample_days, 紧接其后的 out_sample_days 为样本外区间,
+    每次向后滚动 step_days。anchored 为 True 时样本内区间始终从回测开始日期
+    起算。最后一个样本外区间截止到回测结束日期。
+    """
+    start_dt = datetime.fromisoformat(start)
+    end_dt = datetime.fromisoformat(end)
+
+    windows = []
+    current = start_dt
+    while True:
+        out_start = current + timedelta(days=in_sample_days)
+        if out_start > end_dt:
+            break
+
+        out_end = min(out_start + timedelta(days=out_sample_days - 1), end_dt)
+        windows.append({
+            "index": len(windows),
+            "in_sample_start": (start_dt if anchored else current).isoformat(),
+            "in_sample_end": (out_start - timedelta(days=1)).isoformat(),
+            "out_sample_start": out_start.isoformat(),
+            "out_sample_end": out_end.isoformat()
+        })
+        current += timedelta(days=step_days)
+    return windows
+
+def check_walk_forward(config: dict, optimization: dict, walk_forward: dict) -> List[dict]:
+    """校验滚动窗口设置, 返回窗口列表, 无效时抛出 ValueError"""
+    windows = split_windows(
+        config["start"],
+        config["end"],
+        walk_forward["in_sample_days"],
+        walk_forward["out_sample_days"],
+        walk_forward["step_days"],
+        walk_forward["anchored"]
+    )
+    if not windows:
+        raise ValueError("回测区间不足一个样本内窗口")
+
+    setting = build_optimization_setting(optimization["parameters"], optimization["target"])
+    count = math.prod(len(values) for values in setting.params.values()) * len(windows)
+    if count > settings.BACKTEST_OPTIMIZATION_MAX_SETTINGS:
+        raise ValueError(f"窗口数与参数组合数之积 {count} 超过上限 {settings.BACKTEST_OPTIMIZATION_MAX_SETTINGS}")
+    return windows
+
+class WindowOptimizationRunner(OptimizationRunner):
+    """单个样本内窗口的参数优化, 进度汇总到所属的滚动窗口任务"""
+
+    def __init__(self, parent: "WalkForwardRunner", config: dict, optimization: dict):
+        super().__init__(parent.manager, parent.job_id, config, optimization)
+        self.parent = parent
+
+    def publish(self):
+        self.parent.publish()
+
+class WalkForwardRunner:
+    """滚动窗口回测
+
+    各窗口在样本内区间优化参数, 以目标值最优的参数回测紧接其后的样本外区间。
+    整个回测区间的历史数据只加载一次到共享内存, 各窗口在子进程中按区间切片;
+    多个窗口同时优化, 参数组合共用回测进程池。
+    """
+
+    def __init__(self, manager, job_id: str, config: dict, optimization: dict, walk_forward: dict):
+        self.manager = manager
+        self.job_id = job_id
+        self.config = config
+        self.optimization = optimization
+        self.walk_forward = walk_forward
+        self.windows = check_walk_forward(config, optimization, walk_forward)
+
+        self.runners: List[WindowOptimizationRunner] = []
+        self.results: List[Optional[dict]] = [None] * len(self.windows)
+        self.lock = Lock()
+        self.last_publish = 0
+
+    def run(self) -> dict:
+        """执行全部窗口, 返回各窗口结果及汇总"""
+        try:
+            self.config = {**self.config, "history": shared_bar_cache.get(self.config)}
+        except Exception:
+            pass
+
+        self.runners = [
+            WindowOptimizationRunner(
+                self,
+                {**self.config, "start": window["in_sample_start"], "end": window["in_sample_end"]},
+                self.optimization
+            )
+            for window in self.windows
+        ]
+
+        with ThreadPoolExecutor(max_workers=min(len(self.windows), self.runners[0].workers)) as pool:
+            futures = [pool.submit(self.run_window, i) for i in range(len(self.windows))]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+
+            for future in done:
+                if future.exception():
+                    # 一个窗口失败后通知其他窗口尽快结束
+                    self.manager.cancel_flags[self.job_id] = True
+                    raise future.exception()
+
+        return self.get_results()
+
+    def run_window(self, index: int):
+        """样本内优化后回测样本外区间"""
+        window = self.windows[index]
+        runner = self.runners[index]
+        runner.run()
+
+        best = runner.top[0] if runner.top else None
+        result = {**window, "setting": None, "in_sample_target": None, "out_sample_target": None, "out_sample_statistics": {}}
+
+        if best and best["target"] is not None:
+            out_config = {**self.config, "start": window["out_sample_start"], "end": window["out_sample_end"]}
+            future = self.manager.executor.submit(
+                runner.chunk_func,
+                self.job_id,
+                out_config,
+                [best["setting"]],
+                self.optimization["target"]
+            )
+            out_sample = future.result()[0]
+
+            result.update({
+                "setting": best["setting"],
+                "in_sample_target": best["target"],
+                "out_sample_target": out_sample["target"],
+                "out_sample_statistics": out_sample["statistics"]
+            })
+
+        self.results[index] = result
+        self.publish(force=True)
+
+    def publish(self, force: bool = False):
+        """汇总各窗口进度并推送"""
+        with self.lock:
+            now = time.monotonic()
+            if not force and now - self.last_publish < PUBLISH_INTERVAL:
+                return
+            self.last_publish = now
+
+            # 每个窗口的样本外回测计为该窗口的最后一份进度
+            progress = sum(
+                1 if self.results[i] else runner.get_progress() * 0.95
+                for i, runner in enumerate(self.runners)
+            ) / len(self.windows)
+
+            job = self.manager.get_job(self.job_id)
+            job["results"] = self.get_results()
+            self.manager.update_progress(self.job_id, PHASE_OPTIMIZING, round(progress, 4))
+
+    def get_results(self) -> dict:
+        """已完成窗口的结果及样本外汇总"""
+        windows = [result for result in self.results if result]
+        out_targets = [w["out_sample_target"] for w in windows if w["out_sample_target"] is not None]
+        in_targets = [w["in_sample_target"] for w in windows if w["in_sample_target"] is not None]
+
+        summary = {
+            "windows": len(self.windows),
+            "finished_windows": len(windows),
+            "out_sample_net_pnl": sum(
+                w["out_sample_statistics"].get("total_net_pnl") or 0 for w in windows
+            ),
+            "average_in_sample_target": sum(in_targets) / len(in_targets) if in_targets else None,
+            "average_out_sample_target": sum(out_targets) / len(out_targets) if out_targets else None
+        }
+
+        # 样本外与样本内目标均值之比, 衡量参数的外推效果
+        # 样本内均值不为正时比值没有意义 (两个负值相除会得到大于 1 的效率)
+        in_sample = summary["average_in_sample_target"]
+        if in_sample is not None and in_sample > 0 and summary["average_out_sample_target"] is not None:
+            summary["efficiency"] = summary["average_out_sample_target"] / in_sample
+        else:
+            summary["efficiency"] = None
+
+        return {
+            "target": self.optimization["target"],
+            "walk_forward": self.walk_forward,
+            "summary": {key: to_python(value) for key, value in summary.items()},
+            "windows": windows
+        }
@@ -0,0 +1,215 @@
+# K 线周期合成
+
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import DB_TZ
+
+from app.core.data_service import get_data_stamp, get_data_version, iter_bar_chunks, save_listeners
+from app.utils.config import settings
+
+# 由 1 分钟 K 线合成的分钟周期
+RESAMPLE_MINUTES = {
+    "5m": 5,
+    "15m": 15,
+    "30m": 30,
+    "1h": 60,
+}
+
+# 所有可合成的周期, d/w 按交易日合成
+RESAMPLE_PERIODS = set(RESAMPLE_MINUTES) | {"d", "w"}
+
+# 夜盘 21:00 起归属下一交易日, 时间后移 3 小时后取日期即为自然日归属
+NIGHT_SHIFT = np.timedelta64(3, "h")
+
+# 列式 K 线数组
+BarArrays = Dict[str, np.ndarray]
+
+def load_bar_arrays(
+    symbol: str,
+    exchange: Exchange,
+    interval: Interval,
+    start: datetime,
+    end: datetime
+) -> BarArrays:
+    """分段读取 K 线并转换为 NumPy 数组"""
+    chunks: Dict[str, List[np.ndarray]] = {
+        "epoch": [], "wall": [], "open": [], "high": [], "low": [],
+        "close": [], "volume": [], "turnover": [], "open_interest": []
+    }
+
+    for bars in iter_bar_chunks(symbol, exchange, interval, start, end):
+        chunks["epoch"].append(np.array(
+            [int(bar.datetime.timestamp() * 1000) for bar in bars], dtype=np.int64
+        ))
+        chunks["wall"].append(np.array(
+            [bar.datetime.replace(tzinfo=None) for bar in bars], dtype="datetime64[ms]"
+        ))
+        chunks["open"].append(np.array([bar.open_price for bar in bars]))
+        chunks["high"].append(np.array([bar.high_price for bar in bars]))
+        chunks["low"].append(np.array([bar.low_price for bar in bars]))
+        chunks["close"].append(np.array([bar.close_price for bar in bars]))
+        chunks["volume"].append(np.array([bar.volume for bar in bars]))
+        chunks["turnover"].append(np.array([bar.turnover for bar in bars]))
+        chunks["open_interest"].append(np.array([bar.open_interest for bar in bars]))
+
+    if not chunks["epoch"]:
+        return {
+            "epoch": np.empty(0, dtype=np.int64),
+            "wall": np.empty(0, dtype="datetime64[ms]"),
+            **{key: np.empty(0) for key in chunks if key not in ("epoch", "wall")}
+        }
+    return {key: np.concatenate(values) for key, values in chunks.items()}
+
+def get_trading_days(wall: np.ndarray) -> np.ndarray:
+    """计算每根 K 线所属交易日, 周五夜盘归属下周一"""
+    days = (wall + NIGHT_SHIFT).astype("datetime64[D]")
+    return np.busday_offset(days, 0, roll="forward")
+
+def get_bucket_labels(wall: np.ndarray, period: str) -> np.ndarray:
+    """计算每根 K 线所属合成周期的起始时间 (交易所本地时间)"""
+    if period in RESAMPLE_MINUTES:
+        step = np.timedelta64(RESAMPLE_MINUTES[period], "m")
+        minutes = wall.astype("datetime64[m]")
+        return (minutes - (minutes - np.datetime64(0, "m")) % step).astype("datetime64[ms]")
+
+    trading_days = get_trading_days(wall)
+    if period == "d":
+        return trading_days.astype("datetime64[ms]")
+
+    if period == "w":
+        # 1970-01-01 为周四, 偏移 3 天后按周取整得到周一
+        days = trading_days.astype(np.int64)
+        monday = (days + 3) // 7 * 7 - 3
+        return monday.astype("datetime64[D]").astype("datetime64[ms]")
+
+    raise ValueError(f"无效的合成周期: {period}")
+
+def resample_arrays(arrays: BarArrays, period: str) -> BarArrays:
+    """将 1 分钟 K 线合成为指定周期"""
+    wall = arrays["wall"]
+    if not len(wall):
+        return arrays
+
+    labels = get_bucket_labels(wall, period)
+
+    # 时间桶变化处即为新 K 线的起点, 分钟周期同时按交易日切分, 不会跨越夜盘与日盘
+    changed = labels[1:] != labels[:-1]
+    if period in RESAMPLE_MINUTES:
+        trading_days = get_trading_days(wall)
+        changed |= trading_days[1:] != trading_days[:-1]
+    starts = np.concatenate(([0], np.flatnonzero(changed) + 1))
+
+    result = aggregate_arrays(arrays, starts)
+
+    # 标签对应的时间戳: 首根 K 线时间戳减去其与标签的本地时间差
+    label_wall = labels[starts]
+    result["epoch"] = arrays["epoch"][starts] - (wall[starts] - label_wall).astype(np.int64)
+    result["wall"] = label_wall
+    return result
+
+def aggregate_arrays(arrays: BarArrays, starts: np.ndarray) -> BarArrays:
+    """按分组起点合并 K 线, 保留每组的开高低收, 时间取每组首根"""
+    ends = np.concatenate((starts[1:], [len(arrays["epoch"])])) - 1
+
+    return {
+        "epoch": arrays["epoch"][starts],
+        "wall": arrays["wall"][starts],
+        "open": arrays["open"][starts],
+        "high": np.maximum.reduceat(arrays["high"], starts),
+        "low": np.minimum.reduceat(arrays["low"], starts),
+        "close": arrays["close"][ends],
+        "volume": np.add.reduceat(arrays["volume"], starts),
+        "turnover": np.add.reduceat(arrays["turnover"], starts),
+        "open_interest": arrays["open_interest"][ends],
+    }
+
+def arrays_to_columns(arrays: BarArrays) -> Dict[str, list]:
+    """数组转换为与 bars_to_columns 相同的列式数据"""
+    return {
+        "datetime": arrays["epoch"].tolist(),
+        "open": arrays["open"].tolist(),
+        "high": arrays["high"].tolist(),
+        "low": arrays["low"].tolist(),
+        "close": arrays["close"].tolist(),
+        "volume": arrays["volume"].tolist(),
+        "turnover": arrays["turnover"].tolist(),
+        "open_interest": arrays["open_interest"].tolist()
+    }
+
+def arrays_to_rows(arrays: BarArrays) -> List[dict]:
+    """数组转换为与 bar_to_dict 相同的行式数据"""
+    columns = arrays_to_columns(arrays)
+    columns["datetime"] = [
+        datetime.fromtimestamp(ms / 1000, DB_TZ).isoformat() for ms in columns["datetime"]
+    ]
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*columns.values())]
+
+class ResampleCache:
+    """合成 K 线 LRU 缓存
+
+    缓存键包含合约数据版本号及数据库中 1 分钟 K 线的数据概要, 通过本服务
+    或其他程序 (DataRecorder、DataManager 等) 写入新数据后旧结果不会再被
+    命中; 通过 save_bars 写入时还会经 save_listeners 回调立即清理该合约的缓存。
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[Tuple, BarArrays]" = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key: Tuple):
+        """查询缓存"""
+        with self.lock:
+            arrays = self.entries.get(key)
+            if arrays is not None:
+                self.entries.move_to_end(key)
+            return arrays
+
+    def put(self, key: Tuple, arrays: BarArrays):
+        """写入缓存, 超出容量时淘汰最久未使用的结果"""
+        with self.lock:
+            self.entries[key] = arrays
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, vt_symbol: str):
+        """清理合约的全部缓存"""
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == vt_symbol]:
+                del self.entries[key]
+
+resample_cache = ResampleCache(settings.DATA_RESAMPLE_CACHE_SIZE)
+save_listeners.append(resample_cache.invalidate)
+
+def get_resampled_bars(
+    symbol: str,
+    exchange: Exchange,
+    period: str,
+    start: datetime,
+    end: datetime
+) -> BarArrays:
+    """获取合成周期 K 线, 优先使用缓存"""
+    vt_symbol = f"{symbol}.{exchange.value}"
+    key = (
+        vt_symbol,
+        period,
+        start,
+        end,
+        get_data_version(vt_symbol),
+        get_data_stamp(vt_symbol, Interval.MINUTE.value)
+    )
+
+    arrays = resample_cache.get(key)
+    if arrays is None:
+        minute_arrays = load_bar_arrays(symbol, exchange, Interval.MINUTE, start, end)
+        arrays = resample_arrays(minute_arrays, period)
+        resample_cache.put(key, arrays)
+    return arrays
@@ -0,0 +1,143 @@
+# 行情推送编码
+
+import json
+import struct
+import time
+from datetime import datetime
+from typing import Dict, List, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from app.core.tick_cache import TickRecord
+
+# 支持的编码, 连接时通过 ?encoding= 协商, 默认 JSON
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+ENCODING_BINARY = "binary"
+
+def get_encodings() -> set:
+    """当前环境可用的编码"""
+    encodings = {ENCODING_JSON, ENCODING_BINARY}
+    if msgpack:
+        encodings.add(ENCODING_MSGPACK)
+    return encodings
+
+# 二进制帧中价格统一乘以该系数后取整
+PRICE_SCALE = 10000
+
+BINARY_TICK_TYPE = 1
+BINARY_BATCH_TYPE = 2
+
+# 批量帧头: 消息类型 uint8, Tick 数量 uint32, 后接定长 Tick 记录
+BATCH_HEADER_STRUCT = struct.Struct("<BI")
+
+# 二进制帧字段布局 (小端):
+# 消息类型 uint8, 合约编号 uint32, 行情时间 int64 (毫秒)
+# 价格 int64 x 17 (乘以 PRICE_SCALE), 成交量 int64,
+# 现手及五档挂单量 int32 x 11, 成交额 float64, 持仓量 float64
+PRICE_FIELDS = [
+    "last_price", "open_price", "high_price", "low_price", "pre_close",
+    "limit_up", "limit_down",
+    "bid_price_1", "bid_price_2", "bid_price_3", "bid_price_4", "bid_price_5",
+    "ask_price_1", "ask_price_2", "ask_price_3", "ask_price_4", "ask_price_5",
+]
+VOLUME_FIELDS = [
+    "last_volume",
+    "bid_volume_1", "bid_volume_2", "bid_volume_3", "bid_volume_4", "bid_volume_5",
+    "ask_volume_1", "ask_volume_2", "ask_volume_3", "ask_volume_4", "ask_volume_5",
+]
+BINARY_FIELDS = (
+    ["type", "symbol_id", "datetime"] + PRICE_FIELDS
+    + ["volume"] + VOLUME_FIELDS + ["turnover", "open_interest"]
+)
+TICK_STRUCT = struct.Struct(
+    "<BIq" + "q" * len(PRICE_FIELDS) + "q" + "i" * len(VOLUME_FIELDS) + "dd"
+)
+
+# msgpack 数组字段顺序
+MSGPACK_FIELDS = ["vt_symbol", "datetime"] + PRICE_FIELDS + ["volume"] + VOLUME_FIELDS + ["turnover", "open_interest"]
+
+# 合约编号, 进程内唯一且不复用
+symbol_ids: Dict[str, int] = {}
+
+def get_symbol_id(vt_symbol: str) -> int:
+    """获取合约编号, 首次出现时分配"""
+    symbol_id = symbol_ids.get(vt_symbol)
+    if symbol_id is None:
+        symbol_id = len(symbol_ids) + 1
+        symbol_ids[vt_symbol] = symbol_id
+    return symbol_id
+
+def to_millis(dt: datetime) -> int:
+    """datetime 转换为毫秒时间戳"""
+    if not dt:
+        return 0
+    return int(dt.timestamp() * 1000)
+
+def encode_tick(record: TickRecord, encoding: str) -> Union[str, bytes]:
+    """按编码序列化 Tick, JSON 返回文本帧, 其余返回二进制帧"""
+    if encoding == ENCODING_BINARY:
+        return TICK_STRUCT.pack(
+            BINARY_TICK_TYPE,
+            get_symbol_id(record.vt_symbol),
+            to_millis(record.datetime),
+            *[round(getattr(record, field) * PRICE_SCALE) for field in PRICE_FIELDS],
+            int(record.volume),
+            *[int(getattr(record, field)) for field in VOLUME_FIELDS],
+            record.turnover,
+            record.open_interest
+        )
+
+    if encoding == ENCODING_MSGPACK:
+        return msgpack.packb([
+            "tick",
+            record.vt_symbol,
+            to_millis(record.datetime),
+            *[getattr(record, field) for field in MSGPACK_FIELDS[2:]],
+            int(time.time() * 1000)
+        ])
+
+    return json.dumps({
+        "type": "tick",
+        "data": record.to_dict(),
+        "timestamp": datetime.now().isoformat()
+    }, ensure_ascii=False)
+
+def encode_batch(payloads: List[Union[str, bytes]], encoding: str) -> Union[str, bytes]:
+    """将已编码的多个 Tick 拼接为一帧, 不重新序列化"""
+    if encoding == ENCODING_BINARY:
+        return BATCH_HEADER_STRUCT.pack(BINARY_BATCH_TYPE, len(payloads)) + b"".join(payloads)
+
+    if encoding == ENCODING_MSGPACK:
+        # msgpack 数组头后直接拼接各元素
+        count = len(payloads)
+        if count < 16:
+            header = bytes([0x90 | count])
+        elif count < 0x10000:
+            header = b"\xdc" + count.to_bytes(2, "big")
+        else:
+            header = b"\xdd" + count.to_bytes(4, "big")
+        return header + b"".join(payloads)
+
+    return '{"type": "ticks", "data": [' + ", ".join(payloads) + "]}"
+
+def get_layout(encoding: str) -> dict:
+    """编码说明, 连接建立时发送给非 JSON 客户端"""
+    if encoding == ENCODING_BINARY:
+        return {
+            "format": TICK_STRUCT.format,
+            "size": TICK_STRUCT.size,
+            "batch_header": BATCH_HEADER_STRUCT.format,
+            "fields": BINARY_FIELDS,
+            "price_scale": PRICE_SCALE
+        }
+
+    if encoding == ENCODING_MSGPACK:
+        return {
+            "fields": ["type"] + MSGPACK_FIELDS + ["timestamp"]
+        }
+
+    return {}
@@ -0,0 +1,209 @@
+# 历史数据导出
+
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import DB_TZ
+
+from app.core.data_service import (
+    BAR_COLUMNS,
+    TICK_COLUMNS,
+    bars_to_columns,
+    iter_bar_chunks,
+    iter_tick_chunks,
+    ticks_to_columns
+)
+
+# 支持的导出格式及对应的扩展名和 MIME 类型
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrows", "application/vnd.apache.arrow.stream"),
+}
+
+# 支持的压缩方式及对应的扩展名和 MIME 类型
+EXPORT_COMPRESSIONS = {
+    "gzip": ("gz", "application/gzip"),
+    "zstd": ("zst", "application/zstd"),
+}
+
+def check_export_options(file_format: str, compression: Optional[str]):
+    """校验导出格式及压缩方式, 无效时抛出 ValueError"""
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {file_format}")
+    if file_format != "csv" and not pyarrow:
+        raise ValueError(f"导出 {file_format} 文件需要安装 pyarrow")
+
+    if compression and compression not in EXPORT_COMPRESSIONS:
+        raise ValueError(f"不支持的压缩方式: {compression}")
+    if compression == "zstd" and not zstandard:
+        raise ValueError("zstd 压缩需要安装 zstandard")
+
+def get_export_filename(
+    symbol: str,
+    exchange: str,
+    interval: str,
+    file_format: str,
+    compression: Optional[str]
+) -> str:
+    """生成下载文件名"""
+    filename = f"{symbol}.{exchange}_{interval}.{EXPORT_FORMATS[file_format][0]}"
+    if compression:
+        filename += "." + EXPORT_COMPRESSIONS[compression][0]
+    return filename
+
+class ChunkSink:
+    """只追加的内存输出, 供 pyarrow 写入后按块取走已生成的字节"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        """取走当前缓冲的全部字节"""
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+class DataExporter:
+    """流式数据导出
+
+    按时间分段从数据库读取 K 线或 Tick, 每段转换为列式数据后立即编码
+    输出, 可选在输出过程中压缩。任意时刻只在内存中保留一段数据。
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: str,
+        start: datetime,
+        end: datetime,
+        file_format: str = "csv",
+        compression: Optional[str] = None
+    ):
+        check_export_options(file_format, compression)
+
+        self.symbol = symbol
+        self.exchange = exchange
+        self.is_tick = interval == Interval.TICK.value
+        self.interval = None if self.is_tick else Interval(interval)
+        self.start = start
+        self.end = end
+        self.file_format = file_format
+        self.compression = compression
+
+        self.columns = TICK_COLUMNS if self.is_tick else BAR_COLUMNS
+
+    def __iter__(self) -> Iterator[bytes]:
+        """生成导出文件内容"""
+        compressor = self.get_compressor()
+
+        for data in self.iter_encoded():
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                yield data
+
+        if compressor:
+            yield compressor.flush()
+
+    def get_compressor(self):
+        """创建流式压缩器"""
+        if self.compression == "gzip":
+            return zlib.compressobj(wbits=31)
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor().compressobj()
+        return None
+
+    def iter_columns(self) -> Iterator[Dict[str, list]]:
+        """分段读取数据并转换为列式数据"""
+        if self.is_tick:
+            for ticks in iter_tick_chunks(self.symbol, self.exchange, self.start, self.end):
+                yield ticks_to_columns(ticks)
+        else:
+            chunks = iter_bar_chunks(self.symbol, self.exchange, self.interval, self.start, self.end)
+            for bars in chunks:
+                yield bars_to_columns(bars)
+
+    def iter_encoded(self) -> Iterator[bytes]:
+        """按格式编码各段数据"""
+        if self.file_format == "csv":
+            return self.iter_csv()
+        return self.iter_arrow()
+
+    def iter_csv(self) -> Iterator[bytes]:
+        """CSV 编码, 时间输出为数据库时区的 ISO 格式"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.columns)
+
+        for columns in self.iter_columns():
+            columns["datetime"] = [
+                datetime.fromtimestamp(ms / 1000, DB_TZ).isoformat() for ms in columns["datetime"]
+            ]
+            writer.writerows(zip(*[columns[name] for name in self.columns]))
+
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+        # 无数据时仍输出表头
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    def get_schema(self) -> "pyarrow.Schema":
+        """Arrow 表结构, 时间为带时区的毫秒时间戳"""
+        fields = [pyarrow.field("datetime", pyarrow.timestamp("ms", tz=str(DB_TZ)))]
+        fields += [pyarrow.field(name, pyarrow.float64()) for name in self.columns[1:]]
+        return pyarrow.schema(fields)
+
+    def iter_arrow(self) -> Iterator[bytes]:
+        """Parquet 或 Arrow IPC 流编码, 每段写为一个行组/记录批"""
+        schema = self.get_schema()
+        sink = ChunkSink()
+
+        if self.file_format == "parquet":
+            writer = pyarrow.parquet.ParquetWriter(sink, schema)
+        else:
+            writer = pyarrow.ipc.new_stream(sink, schema)
+
+        for columns in self.iter_columns():
+            table = pyarrow.table(columns, schema=schema)
+            writer.write_table(table)
+            yield sink.drain()
+
+        writer.close()
+        yield sink.drain()
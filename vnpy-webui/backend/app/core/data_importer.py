@@ -0,0 +1,292 @@
+# 历史数据导入
+
+import os
+from operator import attrgetter
+from typing import BinaryIO, Callable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import DB_TZ, convert_tz
+from vnpy.trader.object import BarData, TickData
+
+from app.core.data_service import get_data_end, get_db, save_bars, save_ticks
+from app.utils.config import settings
+
+# 支持的文件格式
+IMPORT_FORMATS = {"csv", "parquet", "feather"}
+
+# 常见列名到 VnPy 字段的映射
+COLUMN_ALIASES = {
+    "date": "datetime",
+    "time": "datetime",
+    "timestamp": "datetime",
+    "open": "open_price",
+    "high": "high_price",
+    "low": "low_price",
+    "close": "close_price",
+    "price": "last_price",
+    "last": "last_price",
+    "oi": "open_interest",
+    "bid_price": "bid_price_1",
+    "ask_price": "ask_price_1",
+    "bid_volume": "bid_volume_1",
+    "ask_volume": "ask_volume_1",
+}
+
+BAR_REQUIRED = ["datetime", "open_price", "high_price", "low_price", "close_price", "volume"]
+BAR_OPTIONAL = ["turnover", "open_interest"]
+
+TICK_REQUIRED = ["datetime", "last_price", "volume"]
+TICK_OPTIONAL = (
+    ["turnover", "open_interest", "open_price", "high_price", "low_price", "pre_close",
+     "limit_up", "limit_down"]
+    + [f"{side}_{kind}_{i}" for side in ("bid", "ask") for kind in ("price", "volume") for i in range(1, 6)]
+)
+
+def detect_format(filename: str, file_format: Optional[str]) -> str:
+    """根据参数或扩展名确定文件格式"""
+    if not file_format:
+        file_format = os.path.splitext(filename or "")[1].lstrip(".").lower()
+
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"不支持的文件格式: {file_format}")
+    if file_format != "csv" and not pyarrow:
+        raise ValueError(f"导入 {file_format} 文件需要安装 pyarrow")
+    return file_format
+
+class DataImporter:
+    """流式数据导入
+
+    按块读取 CSV/Parquet/Feather 文件, 每块按列清洗、按时间去重后
+    逐条生成 BarData/TickData, 攒够一批后写入数据库。整个过程在线程池中
+    执行, 内存占用与文件大小无关。
+
+    追加在已有数据之后的批次按流式写入, 数据库只累加数据概要中的数量, 不再
+    每批统计整张表; 最后一批通过 save_bars/save_ticks 写入, 重新统计数据
+    概要并通知数据变化一次。
+    """
+
+    def __init__(
+        self,
+        fileobj: BinaryIO,
+        filename: str,
+        symbol: str,
+        exchange: Exchange,
+        interval: str,
+        file_format: Optional[str] = None,
+        progress_callback: Optional[Callable[[dict], None]] = None
+    ):
+        self.fileobj = fileobj
+        self.filename = filename
+        self.symbol = symbol
+        self.exchange = exchange
+        self.is_tick = interval == Interval.TICK.value
+        self.interval = None if self.is_tick else Interval(interval)
+        self.file_format = detect_format(filename, file_format)
+        self.progress_callback = progress_callback
+
+        self.chunk_rows = settings.DATA_IMPORT_CHUNK_ROWS
+        self.batch_size = settings.DATA_IMPORT_BATCH_SIZE
+
+        self.total_rows = 0
+        self.saved_rows = 0
+        self.invalid_rows = 0
+        self.duplicate_rows = 0
+        self.last_datetime = None
+        # 数据库中该合约数据的最后时间, 在其之后的批次可以流式写入
+        self.data_end = None
+
+    def run(self) -> dict:
+        """执行导入, 返回统计结果"""
+        batch: list = []
+        vt_symbol = f"{self.symbol}.{self.exchange.value}"
+        interval = Interval.TICK.value if self.is_tick else self.interval.value
+        self.data_end = get_data_end(vt_symbol, interval)
+
+        for df, progress in self.iter_frames():
+            self.total_rows += len(df)
+            df = self.clean(df)
+
+            records = self.iter_ticks(df) if self.is_tick else self.iter_bars(df)
+            for record in records:
+                batch.append(record)
+                # 保留最后一条, 保证结束时还有一批数据用于更新数据概要
+                if len(batch) > self.batch_size:
+                    self.save(batch[:-1])
+                    batch = batch[-1:]
+
+            self.report(progress)
+
+        if batch:
+            self.save(batch, final=True)
+        self.report(1.0, finished=True)
+        return self.get_result()
+
+    def iter_frames(self) -> Iterator[tuple]:
+        """按块读取文件, 返回 (DataFrame, 进度)"""
+        if self.file_format == "csv":
+            size = self.get_file_size()
+            for df in pd.read_csv(self.fileobj, chunksize=self.chunk_rows):
+                progress = self.fileobj.tell() / size if size else 0
+                yield df, min(progress, 1.0)
+
+        elif self.file_format == "parquet":
+            parquet_file = pyarrow.parquet.ParquetFile(self.fileobj)
+            total = parquet_file.metadata.num_rows or 1
+            count = 0
+            for batch in parquet_file.iter_batches(batch_size=self.chunk_rows):
+                count += batch.num_rows
+                yield batch.to_pandas(), count / total
+
+        else:
+            reader = pyarrow.ipc.open_file(self.fileobj)
+            total = reader.num_record_batches or 1
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).to_pandas(), (i + 1) / total
+
+    def get_file_size(self) -> int:
+        """获取上传文件大小"""
+        self.fileobj.seek(0, os.SEEK_END)
+        size = self.fileobj.tell()
+        self.fileobj.seek(0)
+        return size
+
+    def clean(self, df: pd.DataFrame) -> pd.DataFrame:
+        """统一列名, 校验必填字段, 按时间排序去重"""
+        df = df.rename(columns=lambda name: str(name).strip().lower())
+        df = df.rename(columns=COLUMN_ALIASES)
+
+        required = TICK_REQUIRED if self.is_tick else BAR_REQUIRED
+        missing = [name for name in required if name not in df.columns]
+        if missing:
+            raise ValueError(f"缺少字段: {', '.join(missing)}")
+
+        optional = TICK_OPTIONAL if self.is_tick else BAR_OPTIONAL
+        df = df[required + [name for name in optional if name in df.columns]].copy()
+
+        df["datetime"] = pd.to_datetime(df["datetime"], errors="coerce")
+        for name in df.columns[1:]:
+            df[name] = pd.to_numeric(df[name], errors="coerce")
+
+        count = len(df)
+        df = df.dropna(subset=required)
+        if not self.is_tick:
+            df = df[(df["high_price"] >= df["low_price"]) & (df["low_price"] > 0)]
+        self.invalid_rows += count - len(df)
+
+        # 按时间去重, 块内及跨块重复的记录均保留最先出现的一条
+        count = len(df)
+        df = df.sort_values("datetime", kind="stable").drop_duplicates("datetime", keep="first")
+        if self.last_datetime is not None:
+            df = df[df["datetime"] != self.last_datetime]
+        self.duplicate_rows += count - len(df)
+
+        if len(df):
+            self.last_datetime = df["datetime"].iloc[-1]
+
+        # 不带时区的时间按数据库时区解释
+        if df["datetime"].dt.tz is None:
+            df["datetime"] = df["datetime"].dt.tz_localize(DB_TZ, ambiguous="NaT", nonexistent="NaT")
+            df = df.dropna(subset=["datetime"])
+        return df
+
+    def iter_bars(self, df: pd.DataFrame) -> Iterator[BarData]:
+        """逐条生成 BarData, 不预先构造整块对象"""
+        datetimes = df["datetime"].dt.to_pydatetime()
+        columns = {name: df[name].to_numpy(dtype=np.float64).tolist() for name in df.columns[1:]}
+        zeros = [0.0] * len(df)
+
+        for dt, open_price, high_price, low_price, close_price, volume, turnover, open_interest in zip(
+            datetimes,
+            columns["open_price"],
+            columns["high_price"],
+            columns["low_price"],
+            columns["close_price"],
+            columns["volume"],
+            columns.get("turnover", zeros),
+            columns.get("open_interest", zeros)
+        ):
+            yield BarData(
+                symbol=self.symbol,
+                exchange=self.exchange,
+                datetime=dt,
+                interval=self.interval,
+                volume=volume,
+                turnover=turnover,
+                open_interest=open_interest,
+                open_price=open_price,
+                high_price=high_price,
+                low_price=low_price,
+                close_price=close_price,
+                gateway_name="DB"
+            )
+
+    def iter_ticks(self, df: pd.DataFrame) -> Iterator[TickData]:
+        """逐条生成 TickData, 不预先构造整块对象"""
+        datetimes = df["datetime"].dt.to_pydatetime()
+        names = list(df.columns[1:])
+        columns = [df[name].to_numpy(dtype=np.float64).tolist() for name in names]
+
+        for dt, values in zip(datetimes, zip(*columns)):
+            yield TickData(
+                symbol=self.symbol,
+                exchange=self.exchange,
+                datetime=dt,
+                gateway_name="DB",
+                **dict(zip(names, values))
+            )
+
+    def save(self, batch: List, final: bool = False):
+        """批量写入数据库
+
+        数据库按批次首尾两条记录更新数据概要的起止时间, 写入前按时间排序。
+        """
+        batch.sort(key=attrgetter("datetime"))
+        first = convert_tz(batch[0].datetime)
+        last = convert_tz(batch[-1].datetime)
+
+        if final:
+            if self.is_tick:
+                save_ticks(batch)
+            else:
+                save_bars(batch)
+        else:
+            stream = self.data_end is None or first > self.data_end
+            if self.is_tick:
+                get_db().save_tick_data(batch, stream=stream)
+            else:
+                get_db().save_bar_data(batch, stream=stream)
+
+        self.data_end = last if self.data_end is None else max(self.data_end, last)
+        self.saved_rows += len(batch)
+
+    def report(self, progress: float, finished: bool = False):
+        """回调导入进度"""
+        if not self.progress_callback:
+            return
+
+        result = self.get_result()
+        result["progress"] = round(progress, 4)
+        result["finished"] = finished
+        self.progress_callback(result)
+
+    def get_result(self) -> dict:
+        """导入统计"""
+        return {
+            "file": self.filename,
+            "symbol": self.symbol,
+            "exchange": self.exchange.value,
+            "interval": Interval.TICK.value if self.is_tick else self.interval.value,
+            "total_rows": self.total_rows,
+            "saved_rows": self.saved_rows,
+            "invalid_rows": self.invalid_rows,
+            "duplicate_rows": self.duplicate_rows
+        }
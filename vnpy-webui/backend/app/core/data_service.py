@@ -0,0 +1,247 @@
+# 历史数据服务
+
+import time
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import BaseDatabase, get_database
+from vnpy.trader.object import BarData, TickData
+
+from app.utils.config import settings
+
+# 分段读取时每段覆盖的天数, 控制单次查询返回的 K 线数量
+CHUNK_DAYS = {
+    Interval.MINUTE: 7,
+    Interval.HOUR: 180,
+    Interval.DAILY: 3650,
+    Interval.WEEKLY: 3650,
+}
+
+# 分段读取 Tick 时每段覆盖的小时数
+TICK_CHUNK_HOURS = 6
+
+# 列式输出的字段, datetime 为毫秒时间戳
+BAR_COLUMNS = [
+    "datetime", "open", "high", "low", "close",
+    "volume", "turnover", "open_interest"
+]
+
+# 每个合约的数据版本号, 通过 save_bars 写入数据时递增
+data_versions: Dict[str, int] = {}
+data_versions_lock = Lock()
+
+# 数据写入后的回调, 参数为 vt_symbol, 用于清理派生数据缓存
+save_listeners: List[Callable[[str], None]] = []
+
+def get_db() -> BaseDatabase:
+    """获取 VnPy 数据库, 首次调用时按 vt_setting 初始化"""
+    return get_database()
+
+def get_data_version(vt_symbol: str) -> int:
+    """获取合约的数据版本号, 用于判断派生数据是否过期"""
+    return data_versions.get(vt_symbol, 0)
+
+def get_data_stamp(vt_symbol: str, interval: str) -> str:
+    """数据库中合约数据的概要 (数量、起止时间)
+
+    数据版本号只在通过 save_bars 写入时递增, DataManager、脚本等直接写入
+    数据库时由数据库维护的概要变化, 两者结合判断派生数据是否过期。
+    """
+    return data_stamp_cache.get(vt_symbol, interval)
+
+def load_data_stamps() -> Dict[Tuple[str, str], str]:
+    """读取数据库中全部合约的数据概要, 键为 (vt_symbol, interval)"""
+    database = get_db()
+    stamps = {}
+
+    overviews = [(overview, overview.interval) for overview in database.get_bar_overview()]
+    overviews += [(overview, Interval.TICK) for overview in database.get_tick_overview()]
+    for overview, interval in overviews:
+        if not overview.exchange or not interval:
+            continue
+        start = overview.start.isoformat() if overview.start else ""
+        end = overview.end.isoformat() if overview.end else ""
+        key = (f"{overview.symbol}.{overview.exchange.value}", interval.value)
+        stamps[key] = f"{overview.count}:{start}:{end}"
+    return stamps
+
+def get_data_end(vt_symbol: str, interval: str) -> Optional[datetime]:
+    """数据库中合约数据的最后时间 (数据库时区, 不带时区), 没有数据时为 None
+
+    直接读取数据库的数据概要, 不经过缓存。
+    """
+    database = get_db()
+    if interval == Interval.TICK.value:
+        overviews = database.get_tick_overview()
+    else:
+        overviews = [
+            overview for overview in database.get_bar_overview()
+            if overview.interval and overview.interval.value == interval
+        ]
+
+    for overview in overviews:
+        if overview.exchange and f"{overview.symbol}.{overview.exchange.value}" == vt_symbol:
+            return overview.end
+    return None
+
+class DataStampCache:
+    """数据库数据概要缓存
+
+    vnpy 数据库只能查询全部合约的概要, sqlite 实现每次查询还会统计整张
+    K 线表, 读取一次后缓存 DATA_STAMP_TTL 秒。通过 save_bars/save_ticks
+    写入时立即失效。
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.stamps: Dict[Tuple[str, str], str] = {}
+        self.loaded: Optional[float] = None
+        self.lock = Lock()
+
+    def get(self, vt_symbol: str, interval: str) -> str:
+        """合约数据概要, 数据库中没有数据时为空字符串"""
+        with self.lock:
+            now = time.monotonic()
+            if self.loaded is None or now - self.loaded >= self.ttl:
+                self.stamps = load_data_stamps()
+                self.loaded = now
+            return self.stamps.get((vt_symbol, interval), "")
+
+    def invalidate(self):
+        with self.lock:
+            self.loaded = None
+
+data_stamp_cache = DataStampCache(settings.DATA_STAMP_TTL)
+
+def save_bars(bars: List[BarData]) -> bool:
+    """保存 K 线并递增相关合约的数据版本号"""
+    # 数据库保存时会改写 BarData 的字段, 需在保存前取出合约代码
+    vt_symbols = {bar.vt_symbol for bar in bars}
+    result = get_db().save_bar_data(bars)
+    data_stamp_cache.invalidate()
+
+    with data_versions_lock:
+        for vt_symbol in vt_symbols:
+            data_versions[vt_symbol] = data_versions.get(vt_symbol, 0) + 1
+
+    for vt_symbol in vt_symbols:
+        for listener in save_listeners:
+            listener(vt_symbol)
+    return result
+
+def parse_exchange(exchange: str) -> Exchange:
+    """解析交易所, 无效时抛出 ValueError"""
+    try:
+        return Exchange(exchange)
+    except ValueError:
+        raise ValueError(f"无效的交易所: {exchange}")
+
+def parse_interval(interval: str) -> Interval:
+    """解析 K 线周期, 无效时抛出 ValueError"""
+    try:
+        return Interval(interval)
+    except ValueError:
+        raise ValueError(f"无效的 K 线周期: {interval}")
+
+def parse_datetime(value: Optional[str], default: datetime) -> datetime:
+    """解析 ISO 格式时间, 为空时返回默认值"""
+    if not value:
+        return default
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"无效的时间: {value}")
+
+def iter_bar_chunks(
+    symbol: str,
+    exchange: Exchange,
+    interval: Interval,
+    start: datetime,
+    end: datetime,
+    chunk_days: Optional[int] = None
+) -> Iterator[List[BarData]]:
+    """按时间分段读取 K 线, 每次只在内存中保留一段"""
+    database = get_db()
+    delta = timedelta(days=chunk_days or CHUNK_DAYS.get(interval, 30))
+
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + delta, end)
+        bars = database.load_bar_data(symbol, exchange, interval, chunk_start, chunk_end)
+        if bars:
+            yield bars
+
+        # 查询区间两端均包含, 下一段从结束时间之后开始
+        chunk_start = chunk_end + timedelta(microseconds=1)
+
+def save_ticks(ticks: List[TickData]) -> bool:
+    """保存 Tick"""
+    result = get_db().save_tick_data(ticks)
+    data_stamp_cache.invalidate()
+    return result
+
+def bar_to_dict(bar: BarData) -> dict:
+    """BarData 转换为字典"""
+    return {
+        "datetime": bar.datetime.isoformat(),
+        "open": bar.open_price,
+        "high": bar.high_price,
+        "low": bar.low_price,
+        "close": bar.close_price,
+        "volume": bar.volume,
+        "turnover": bar.turnover,
+        "open_interest": bar.open_interest
+    }
+
+def bars_to_columns(bars: List[BarData]) -> Dict[str, list]:
+    """BarData 列表转换为列式数据"""
+    return {
+        "datetime": [int(bar.datetime.timestamp() * 1000) for bar in bars],
+        "open": [bar.open_price for bar in bars],
+        "high": [bar.high_price for bar in bars],
+        "low": [bar.low_price for bar in bars],
+        "close": [bar.close_price for bar in bars],
+        "volume": [bar.volume for bar in bars],
+        "turnover": [bar.turnover for bar in bars],
+        "open_interest": [bar.open_interest for bar in bars]
+    }
+
+# 导出 Tick 时的字段, datetime 为毫秒时间戳
+TICK_COLUMNS = [
+    "datetime", "volume", "turnover", "open_interest",
+    "last_price", "last_volume", "limit_up", "limit_down",
+    "open_price", "high_price", "low_price", "pre_close",
+    "bid_price_1", "bid_price_2", "bid_price_3", "bid_price_4", "bid_price_5",
+    "ask_price_1", "ask_price_2", "ask_price_3", "ask_price_4", "ask_price_5",
+    "bid_volume_1", "bid_volume_2", "bid_volume_3", "bid_volume_4", "bid_volume_5",
+    "ask_volume_1", "ask_volume_2", "ask_volume_3", "ask_volume_4", "ask_volume_5",
+]
+
+def iter_tick_chunks(
+    symbol: str,
+    exchange: Exchange,
+    start: datetime,
+    end: datetime,
+    chunk_hours: int = TICK_CHUNK_HOURS
+) -> Iterator[List[TickData]]:
+    """按时间分段读取 Tick, 每次只在内存中保留一段"""
+    database = get_db()
+    delta = timedelta(hours=chunk_hours)
+
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + delta, end)
+        ticks = database.load_tick_data(symbol, exchange, chunk_start, chunk_end)
+        if ticks:
+            yield ticks
+
+        chunk_start = chunk_end + timedelta(microseconds=1)
+
+def ticks_to_columns(ticks: List[TickData]) -> Dict[str, list]:
+    """TickData 列表转换为列式数据"""
+    columns = {"datetime": [int(tick.datetime.timestamp() * 1000) for tick in ticks]}
+    for name in TICK_COLUMNS[1:]:
+        columns[name] = [getattr(tick, name) for tick in ticks]
+    return columns
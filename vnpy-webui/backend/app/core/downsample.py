@@ -0,0 +1,84 @@
+# 图表数据降采样
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+from app.core.bar_resampler import BarArrays, aggregate_arrays
+
+# 降采样方式: ohlc 按桶合并保留开高低收, lttb 用于折线 (按收盘价选点)
+DOWNSAMPLE_OHLC = "ohlc"
+DOWNSAMPLE_LTTB = "lttb"
+DOWNSAMPLE_MODES = {DOWNSAMPLE_OHLC, DOWNSAMPLE_LTTB}
+
+def bucket_starts(length: int, max_points: int) -> np.ndarray:
+    """将 length 个点均分为不超过 max_points 个桶, 返回每个桶的起点"""
+    return np.unique(np.linspace(0, length, max_points, endpoint=False).astype(np.int64))
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets 选点, 返回保留点的下标"""
+    length = len(x)
+    if max_points >= length or max_points < 3:
+        return np.arange(length)
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+
+    # 首尾点固定保留, 中间点分为 max_points - 2 个桶
+    every = (length - 2) / (max_points - 2)
+    edges = (np.arange(max_points - 1) * every).astype(np.int64) + 1
+
+    # 预先计算每个桶的均值, 作为上一个桶选点时的第三个顶点
+    counts = np.diff(np.append(edges, length))
+    avg_x = np.add.reduceat(x, edges) / counts
+    avg_y = np.add.reduceat(y, edges) / counts
+
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = length - 1
+
+    a = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - avg_x[i + 1]) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y[i + 1] - y[a])
+        )
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+
+    return indices
+
+def downsample_arrays(arrays: BarArrays, max_points: int, mode: str) -> Tuple[BarArrays, Dict]:
+    """降采样 K 线数组, 返回结果及缩放元信息"""
+    length = len(arrays["epoch"])
+    meta = {
+        "mode": mode,
+        "max_points": max_points,
+        "original_count": length,
+        "downsampled": False,
+        "bucket_size": 1,
+        "start": int(arrays["epoch"][0]) if length else None,
+        "end": int(arrays["epoch"][-1]) if length else None,
+    }
+
+    if length <= max_points:
+        meta["count"] = length
+        return arrays, meta
+
+    if mode == DOWNSAMPLE_LTTB:
+        indices = lttb_indices(arrays["epoch"], arrays["close"], max_points)
+        result = {key: values[indices] for key, values in arrays.items()}
+    else:
+        result = aggregate_arrays(arrays, bucket_starts(length, max_points))
+
+    count = len(result["epoch"])
+    meta["downsampled"] = True
+    meta["count"] = count
+    meta["bucket_size"] = length / count
+    # 每个点平均覆盖的时间 (毫秒), 以及可获得原始精度的最大可见时间跨度:
+    # 客户端缩放到小于 full_resolution_span 的区间时按新区间重新请求即可
+    span = meta["end"] - meta["start"]
+    meta["bucket_ms"] = int(span / count)
+    meta["full_resolution_span"] = int(span * max_points / length)
+    return result, meta
@@ -0,0 +1,232 @@
+# 委托、成交、持仓及账户的增量同步
+
+import asyncio
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from vnpy.event import Event
+from vnpy.trader.event import EVENT_ACCOUNT, EVENT_ORDER, EVENT_POSITION, EVENT_TRADE
+from vnpy.trader.object import AccountData, OrderData, PositionData, TradeData
+
+from app.core.order_router import order_router, order_to_dict, trade_to_dict
+from app.core.order_store import order_store
+from app.core.vnpy_engine import vnpy_engine
+from app.core.websocket import (
+    broadcast_account,
+    broadcast_order,
+    broadcast_position,
+    broadcast_trade
+)
+
+# 同步的数据集合
+ORDERS = "orders"
+TRADES = "trades"
+POSITIONS = "positions"
+ACCOUNTS = "accounts"
+COLLECTIONS = [ORDERS, TRADES, POSITIONS, ACCOUNTS]
+
+BROADCASTS = {
+    ORDERS: broadcast_order,
+    TRADES: broadcast_trade,
+    POSITIONS: broadcast_position,
+    ACCOUNTS: broadcast_account
+}
+
+def position_to_dict(position: PositionData) -> dict:
+    """持仓转换为字典"""
+    return {
+        "vt_positionid": position.vt_positionid,
+        "symbol": position.symbol,
+        "exchange": position.exchange.value,
+        "vt_symbol": position.vt_symbol,
+        "direction": position.direction.value,
+        "volume": position.volume,
+        "yd_volume": position.yd_volume,
+        "frozen": position.frozen,
+        "price": position.price,
+        "pnl": position.pnl,
+        "gateway_name": position.gateway_name
+    }
+
+def account_to_dict(account: AccountData) -> dict:
+    """账户转换为字典"""
+    return {
+        "vt_accountid": account.vt_accountid,
+        "accountid": account.accountid,
+        "balance": account.balance,
+        "frozen": account.frozen,
+        "available": account.available,
+        "gateway_name": account.gateway_name
+    }
+
+class OmsHub:
+    """OMS 数据分发中心
+
+    在 EventEngine 上注册委托、成交、持仓及账户事件, 在 asyncio 事件循环中
+    为每次变化分配全局递增的序号, 更新委托索引后推送到 WebSocket, 推送消息
+    带有 seq。每个集合按最后变化的序号排列, 查询 since_seq 之后的变化只遍历
+    变化的记录。网关定时推送的持仓和账户未发生变化时不分配序号也不推送。
+
+    session 在每次启动时重新生成, 客户端提供的 session 不一致或 since_seq
+    超过当前序号时返回全量数据。委托和成交保存对象本身, 持仓和账户数量少,
+    保存事件到达时的快照用于比较是否变化。
+    """
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+
+        self.session = uuid.uuid4().hex[:12]
+        self.seq = 0
+        # 集合 -> 主键 -> [序号, 记录], 按序号递增排列
+        self.records: Dict[str, "OrderedDict[str, list]"] = {
+            collection: OrderedDict() for collection in COLLECTIONS
+        }
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """载入已有数据并启动分发, 需在事件循环中调用"""
+        if self.task:
+            return
+
+        main_engine = vnpy_engine.main_engine
+        for order in main_engine.get_all_orders():
+            self.update(ORDERS, order.vt_orderid, order)
+        for trade in main_engine.get_all_trades():
+            self.update(TRADES, trade.vt_tradeid, trade)
+        for position in main_engine.get_all_positions():
+            self.update(POSITIONS, position.vt_positionid, position_to_dict(position))
+        for account in main_engine.get_all_accounts():
+            self.update(ACCOUNTS, account.vt_accountid, account_to_dict(account))
+
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.task = loop.create_task(self.run())
+
+        event_engine = vnpy_engine.event_engine
+        event_engine.register(EVENT_ORDER, self.process_order_event)
+        event_engine.register(EVENT_TRADE, self.process_trade_event)
+        event_engine.register(EVENT_POSITION, self.process_position_event)
+        event_engine.register(EVENT_ACCOUNT, self.process_account_event)
+
+    def stop(self):
+        """停止分发"""
+        if not self.task:
+            return
+
+        event_engine = vnpy_engine.event_engine
+        event_engine.unregister(EVENT_ORDER, self.process_order_event)
+        event_engine.unregister(EVENT_TRADE, self.process_trade_event)
+        event_engine.unregister(EVENT_POSITION, self.process_position_event)
+        event_engine.unregister(EVENT_ACCOUNT, self.process_account_event)
+        self.task.cancel()
+        self.task = None
+
+    def put(self, collection: str, key: str, record, latency: Optional[dict] = None):
+        """EventEngine 线程中转交事件循环"""
+        loop = self.loop
+        if loop and not loop.is_closed():
+            loop.call_soon_threadsafe(self.queue.put_nowait, (collection, key, record, latency))
+
+    def process_order_event(self, event: Event):
+        """委托回报, 首个回报的计时在事件线程中记录"""
+        order: OrderData = event.data
+        self.put(ORDERS, order.vt_orderid, order, order_router.record_ack(order))
+
+    def process_trade_event(self, event: Event):
+        trade: TradeData = event.data
+        self.put(TRADES, trade.vt_tradeid, trade)
+
+    def process_position_event(self, event: Event):
+        """持仓对象可能被网关复用, 在事件线程中生成快照"""
+        position: PositionData = event.data
+        self.put(POSITIONS, position.vt_positionid, position_to_dict(position))
+
+    def process_account_event(self, event: Event):
+        account: AccountData = event.data
+        self.put(ACCOUNTS, account.vt_accountid, account_to_dict(account))
+
+    async def run(self):
+        """按到达顺序更新并推送"""
+        while True:
+            collection, key, record, latency = await self.queue.get()
+            try:
+                seq = self.update(collection, key, record)
+                if seq is None:
+                    continue
+
+                data = to_dict(collection, record)
+                if latency:
+                    data["latency"] = latency
+                await BROADCASTS[collection](data, seq)
+            except Exception as e:
+                print(f"OMS 推送失败: {e}")
+
+    def update(self, collection: str, key: str, record) -> Optional[int]:
+        """写入记录并分配序号, 持仓和账户未变化时返回 None"""
+        records = self.records[collection]
+        item = records.get(key)
+        if item and isinstance(record, dict) and item[1] == record:
+            return None
+
+        self.seq += 1
+        if item:
+            item[0] = self.seq
+            item[1] = record
+            records.move_to_end(key)
+        else:
+            records[key] = [self.seq, record]
+
+        if collection == ORDERS:
+            order_store.update_order(record)
+        elif collection == TRADES:
+            order_store.update_trade(record)
+        return self.seq
+
+    def get(self, collection: str, key: str) -> Optional[dict]:
+        """按主键查询记录"""
+        item = self.records[collection].get(key)
+        return to_dict(collection, item[1]) if item else None
+
+    def get_all(self, collection: str) -> List[dict]:
+        """集合内全部记录"""
+        return [to_dict(collection, record) for _, record in self.records[collection].values()]
+
+    def get_changes(self, collection: str, since_seq: int) -> List[dict]:
+        """序号大于 since_seq 的记录, 从最近的变化向前遍历"""
+        changes = []
+        for seq, record in reversed(self.records[collection].values()):
+            if seq <= since_seq:
+                break
+            changes.append(record)
+        return [to_dict(collection, record) for record in reversed(changes)]
+
+    def get_delta(
+        self,
+        collections: List[str],
+        since_seq: Optional[int] = None,
+        session: Optional[str] = None
+    ) -> dict:
+        """增量数据, 无法增量同步时返回全量数据并标记 full"""
+        full = (
+            since_seq is None
+            or since_seq < 0
+            or since_seq > self.seq
+            or bool(session and session != self.session)
+        )
+
+        delta = {"session": self.session, "seq": self.seq, "full": full}
+        for collection in collections:
+            delta[collection] = self.get_changes(collection, 0 if full else since_seq)
+        return delta
+
+def to_dict(collection: str, record) -> dict:
+    """记录转换为推送及查询使用的字典"""
+    if collection == ORDERS:
+        return order_to_dict(record)
+    if collection == TRADES:
+        return trade_to_dict(record)
+    return dict(record)
+
+oms_hub = OmsHub()
@@ -0,0 +1,385 @@
+# 委托下单通道
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Deque, Dict, List, Optional
+
+from vnpy.trader.constant import Direction, Exchange, Offset, OrderType, Status
+from vnpy.trader.object import CancelRequest, OrderData, OrderRequest, TradeData
+from vnpy.trader.utility import round_to
+from vnpy_ctastrategy.base import APP_NAME as CTA_APP_NAME
+
+from app.core.risk_engine import risk_engine
+from app.core.vnpy_engine import vnpy_engine
+
+# 前端传入的方向、开平及委托类型, 同时兼容 vnpy 的枚举值
+DIRECTIONS = {"long": Direction.LONG, "short": Direction.SHORT}
+OFFSETS = {
+    "open": Offset.OPEN,
+    "close": Offset.CLOSE,
+    "closetoday": Offset.CLOSETODAY,
+    "closeyesterday": Offset.CLOSEYESTERDAY
+}
+ORDER_TYPES = {
+    "limit": OrderType.LIMIT,
+    "market": OrderType.MARKET,
+    "fak": OrderType.FAK,
+    "fok": OrderType.FOK
+}
+
+# 未指定 reference 时的委托来源
+DEFAULT_REFERENCE = "webui"
+
+# 每段耗时保留的最近样本数
+LATENCY_SAMPLES = 1000
+
+# 等待回报的委托上限, 超出后丢弃最早的计时记录
+PENDING_LIMIT = 10000
+
+# 各段耗时: 接收→发送 (排队), 网关调用, 发送→首个回报, 接收→首个回报
+HOP_QUEUE = "queue"
+HOP_GATEWAY = "gateway"
+HOP_ACK = "ack"
+HOP_TOTAL = "total"
+HOPS = [HOP_QUEUE, HOP_GATEWAY, HOP_ACK, HOP_TOTAL]
+
+class GatewayError(Exception):
+    """网关未连接或拒绝请求"""
+
+def parse_enum(value, mapping: dict, enum_type, name: str):
+    """按前端名称或 vnpy 枚举值解析"""
+    if isinstance(value, str):
+        result = mapping.get(value.lower())
+        if result:
+            return result
+        if value in enum_type._value2member_map_:
+            return enum_type(value)
+    raise ValueError(f"无效的{name}: {value}")
+
+def build_order_request(request: dict) -> OrderRequest:
+    """校验下单参数并生成 OrderRequest, 无效时抛出 ValueError"""
+    symbol = request.get("symbol")
+    exchange = request.get("exchange")
+    if not symbol or exchange not in Exchange._value2member_map_:
+        raise ValueError(f"无效的合约: {symbol}.{exchange}")
+
+    direction = parse_enum(request.get("direction"), DIRECTIONS, Direction, "方向")
+    offset = parse_enum(request.get("offset", "open"), OFFSETS, Offset, "开平")
+    order_type = parse_enum(request.get("order_type", "limit"), ORDER_TYPES, OrderType, "委托类型")
+
+    try:
+        volume = float(request.get("volume"))
+        price = float(request.get("price") or 0)
+    except (TypeError, ValueError):
+        raise ValueError("委托数量和价格必须为数字")
+
+    if volume <= 0:
+        raise ValueError(f"委托数量必须为正数: {volume}")
+    if price < 0 or (order_type != OrderType.MARKET and not price):
+        raise ValueError(f"无效的委托价格: {price}")
+
+    vt_symbol = f"{symbol}.{exchange}"
+    contract = vnpy_engine.main_engine.get_contract(vt_symbol)
+    if not contract:
+        raise ValueError(f"合约 {vt_symbol} 不存在")
+    if contract.min_volume and round_to(volume, contract.min_volume) != volume:
+        raise ValueError(f"委托数量 {volume} 不是最小交易数量 {contract.min_volume} 的整数倍")
+    if price and contract.pricetick and round_to(price, contract.pricetick) != price:
+        raise ValueError(f"委托价格 {price} 不是最小价格变动 {contract.pricetick} 的整数倍")
+
+    return OrderRequest(
+        symbol=symbol,
+        exchange=Exchange(exchange),
+        direction=direction,
+        type=order_type,
+        volume=volume,
+        price=price,
+        offset=offset,
+        reference=str(request.get("reference") or DEFAULT_REFERENCE)
+    )
+
+def get_references(strategy: str) -> List[str]:
+    """策略对应的委托来源, 兼容 CTA 策略下单时的 reference 格式"""
+    return [strategy, f"{CTA_APP_NAME}_{strategy}"]
+
+def match_order(order: OrderData, vt_symbol: Optional[str] = None, strategy: Optional[str] = None) -> bool:
+    """按合约及策略筛选委托, strategy 匹配委托来源或 CTA 策略名"""
+    if vt_symbol and order.vt_symbol != vt_symbol:
+        return False
+    if strategy and order.reference not in get_references(strategy):
+        return False
+    return True
+
+def order_to_dict(order: OrderData) -> dict:
+    """委托转换为字典"""
+    return {
+        "vt_orderid": order.vt_orderid,
+        "orderid": order.orderid,
+        "symbol": order.symbol,
+        "exchange": order.exchange.value,
+        "vt_symbol": order.vt_symbol,
+        "direction": order.direction.value if order.direction else None,
+        "offset": order.offset.value,
+        "order_type": order.type.value,
+        "price": order.price,
+        "volume": order.volume,
+        "traded": order.traded,
+        "status": order.status.value,
+        "active": order.is_active(),
+        "datetime": order.datetime.isoformat() if order.datetime else None,
+        "reference": order.reference,
+        "gateway_name": order.gateway_name
+    }
+
+def trade_to_dict(trade: TradeData) -> dict:
+    """成交转换为字典"""
+    return {
+        "vt_tradeid": trade.vt_tradeid,
+        "tradeid": trade.tradeid,
+        "vt_orderid": trade.vt_orderid,
+        "symbol": trade.symbol,
+        "exchange": trade.exchange.value,
+        "vt_symbol": trade.vt_symbol,
+        "direction": trade.direction.value if trade.direction else None,
+        "offset": trade.offset.value,
+        "price": trade.price,
+        "volume": trade.volume,
+        "datetime": trade.datetime.isoformat() if trade.datetime else None,
+        "gateway_name": trade.gateway_name
+    }
+
+class OrderLatency:
+    """单笔委托各环节的时间点 (perf_counter_ns)"""
+
+    __slots__ = ["received", "sent", "returned", "acked"]
+
+    def __init__(self, received: int):
+        self.received = received
+        self.sent = 0
+        self.returned = 0
+        self.acked = 0
+
+    def to_dict(self) -> dict:
+        """各段耗时 (微秒), 未到达的环节为 None"""
+        def span(start: int, end: int) -> Optional[float]:
+            return round((end - start) / 1000, 1) if start and end else None
+
+        return {
+            HOP_QUEUE: span(self.received, self.sent),
+            HOP_GATEWAY: span(self.sent, self.returned),
+            HOP_ACK: span(self.sent, self.acked),
+            HOP_TOTAL: span(self.received, self.acked)
+        }
+
+class OrderRouter:
+    """委托路由
+
+    所有下单和撤单请求在一个专用线程中按到达顺序调用 MainEngine,
+    网关接口调用不占用 asyncio 事件循环, 也不与回测等任务共用线程池。
+    委托发送前在同一线程中通过风控检查, 风控耗时计入排队环节。
+    下单在网关返回委托号后立即响应, 委托回报由 OmsHub 推送到 WebSocket。
+    每笔委托记录 HTTP 接收、网关发送及首个回报的时间点。
+    计时记录由下单线程写入、EventEngine 线程读取, 通过锁保护。网关可能在
+    send_order 返回前就推送首个回报, 此时先暂存回报时间, 由下单线程取得
+    委托号后补记。
+    """
+
+    def __init__(self):
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.lock = Lock()
+
+        # vt_orderid -> 等待首个回报的计时记录
+        self.pending: "OrderedDict[str, OrderLatency]" = OrderedDict()
+        # 网关接口调用期间到达的首个回报时间, 调用返回后按委托号匹配
+        self.sending = False
+        self.early_acks: Dict[str, int] = {}
+        self.samples: Dict[str, Deque[int]] = {hop: deque(maxlen=LATENCY_SAMPLES) for hop in HOPS}
+        self.order_count = 0
+
+    def start(self):
+        """启动下单线程"""
+        if self.executor:
+            return
+
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="order")
+
+    def stop(self):
+        """停止下单线程"""
+        if not self.executor:
+            return
+
+        self.executor.shutdown(wait=False)
+        self.executor = None
+
+    async def send_order(self, req: OrderRequest, received: int) -> dict:
+        """在下单线程中发送委托, 返回委托号及网关前各段耗时"""
+        if not self.executor:
+            raise GatewayError("下单服务未启动")
+
+        future = self.executor.submit(self.send_order_sync, req, received)
+        vt_orderid, latency = await asyncio.wrap_future(future)
+        return {"vt_orderid": vt_orderid, "latency": latency.to_dict()}
+
+    async def send_orders(self, reqs: List[OrderRequest], received: int) -> List[dict]:
+        """在下单线程中依次发送一批委托, 逐笔返回委托号或错误信息"""
+        if not self.executor:
+            raise GatewayError("下单服务未启动")
+
+        future = self.executor.submit(self.send_orders_sync, reqs, received)
+        results = await asyncio.wrap_future(future)
+        return [
+            {"error": str(result)} if isinstance(result, Exception)
+            else {"vt_orderid": result[0], "latency": result[1].to_dict()}
+            for result in results
+        ]
+
+    def send_orders_sync(self, reqs: List[OrderRequest], received: int) -> list:
+        """下单线程: 单次任务内循环发送, 单笔失败不影响其他委托"""
+        results = []
+        for req in reqs:
+            try:
+                results.append(self.send_order_sync(req, received))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def send_order_sync(self, req: OrderRequest, received: int):
+        """下单线程: 风控检查通过后调用网关发送委托"""
+        gateway_name = self.get_gateway_name()
+        risk_engine.check(req)
+
+        latency = OrderLatency(received)
+        vt_orderid = ""
+        with self.lock:
+            self.sending = True
+        try:
+            latency.sent = time.perf_counter_ns()
+            vt_orderid = vnpy_engine.main_engine.send_order(req, gateway_name)
+            latency.returned = time.perf_counter_ns()
+        finally:
+            self.register(vt_orderid, latency)
+
+        if not vt_orderid:
+            raise GatewayError(f"网关 {gateway_name} 拒绝委托")
+        risk_engine.add_order(req, vt_orderid)
+        return vt_orderid, latency
+
+    def register(self, vt_orderid: str, latency: OrderLatency):
+        """登记等待首个回报的委托, 网关返回委托号前已到达的回报直接补记"""
+        with self.lock:
+            self.sending = False
+            acked = self.early_acks.pop(vt_orderid, 0)
+            self.early_acks.clear()
+            if not vt_orderid:
+                return
+
+            self.order_count += 1
+            self.record(HOP_QUEUE, latency.sent - latency.received)
+            self.record(HOP_GATEWAY, latency.returned - latency.sent)
+
+            if acked:
+                self.record_acked(latency, acked)
+                return
+
+            self.pending[vt_orderid] = latency
+            if len(self.pending) > PENDING_LIMIT:
+                self.pending.popitem(last=False)
+
+    async def cancel_order(self, order: OrderData):
+        """在下单线程中发送撤单请求"""
+        if not self.executor:
+            raise GatewayError("下单服务未启动")
+
+        req: CancelRequest = order.create_cancel_request()
+        future = self.executor.submit(vnpy_engine.main_engine.cancel_order, req, order.gateway_name)
+        await asyncio.wrap_future(future)
+
+    async def cancel_orders(self, orders: List[OrderData]) -> List[Optional[str]]:
+        """在下单线程中依次撤单, 逐笔返回 None 或错误信息"""
+        if not self.executor:
+            raise GatewayError("下单服务未启动")
+
+        future = self.executor.submit(self.cancel_orders_sync, orders)
+        return await asyncio.wrap_future(future)
+
+    def cancel_orders_sync(self, orders: List[OrderData]) -> List[Optional[str]]:
+        """下单线程: 单次任务内循环撤单"""
+        main_engine = vnpy_engine.main_engine
+        errors = []
+        for order in orders:
+            try:
+                main_engine.cancel_order(order.create_cancel_request(), order.gateway_name)
+                errors.append(None)
+            except Exception as e:
+                errors.append(str(e))
+        return errors
+
+    def get_gateway_name(self) -> str:
+        """下单使用的网关, 未连接时抛出 GatewayError"""
+        if not vnpy_engine.connected:
+            raise GatewayError("交易网关未连接")
+        return vnpy_engine.gateway_name
+
+    def record_ack(self, order: OrderData) -> Optional[dict]:
+        """EventEngine 线程中记录首个回报耗时, 返回该委托的各段耗时"""
+        # 网关发送时本地生成的提交中状态不算作回报
+        if order.status == Status.SUBMITTING or not (self.pending or self.sending):
+            return None
+
+        acked = time.perf_counter_ns()
+        with self.lock:
+            latency = self.pending.pop(order.vt_orderid, None)
+            if not latency:
+                # 网关接口返回委托号前回报已到达, 由下单线程登记时补记
+                if self.sending:
+                    self.early_acks.setdefault(order.vt_orderid, acked)
+                return None
+
+            self.record_acked(latency, acked)
+        return latency.to_dict()
+
+    def record_acked(self, latency: OrderLatency, acked: int):
+        """记录首个回报时间及相关耗时, 调用方需持有锁"""
+        latency.acked = acked
+        self.record(HOP_ACK, latency.acked - latency.sent)
+        self.record(HOP_TOTAL, latency.acked - latency.received)
+
+    def record(self, hop: str, duration: int):
+        """记录一段耗时 (纳秒), 调用方需持有锁"""
+        self.samples[hop].append(duration)
+
+    def get_latency_stats(self) -> dict:
+        """各段耗时的最近样本统计 (微秒)"""
+        with self.lock:
+            hop_values = {hop: list(samples) for hop, samples in self.samples.items()}
+            order_count = self.order_count
+            pending = len(self.pending)
+
+        stats = {}
+        for hop, values in hop_values.items():
+            values.sort()
+            if not values:
+                stats[hop] = {"count": 0}
+                continue
+
+            def percentile(p: float) -> float:
+                return round(values[min(int(len(values) * p), len(values) - 1)] / 1000, 1)
+
+            stats[hop] = {
+                "count": len(values),
+                "p50": percentile(0.5),
+                "p90": percentile(0.9),
+                "p99": percentile(0.99),
+                "max": round(values[-1] / 1000, 1)
+            }
+
+        return {
+            "orders": order_count,
+            "pending": pending,
+            "hops": stats
+        }
+
+order_router = OrderRouter()
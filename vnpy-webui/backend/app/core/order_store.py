@@ -0,0 +1,289 @@
+# 委托及成交索引
+
+import heapq
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from vnpy.trader.object import OrderData, TradeData
+
+from app.core.order_router import get_references
+
+# 委托状态筛选
+STATUS_ACTIVE = "active"
+STATUS_FINISHED = "finished"
+ORDER_STATUSES = {STATUS_ACTIVE, STATUS_FINISHED}
+
+# 分页默认条数及上限
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# 时间索引的桶宽度 (秒)
+TIME_BUCKET_SECONDS = 60
+
+class RecordIndex:
+    """按到达顺序编号的记录及二级索引
+
+    每条记录首次到达时分配递增序号, 游标即上一页最后一条记录的序号。
+    合约、策略等二级索引为序号的有序列表。记录时间优先使用委托/成交自带
+    的时间, 没有时使用到达时间, 按时间桶建立索引, 每个桶内为序号的有序
+    列表; 网关乱序推送或时间超前 (如夜盘委托带交易日日期) 的记录只影响
+    自身所在的桶。
+    """
+
+    def __init__(self, *fields: str):
+        self.keys: List[str] = []
+        self.times: List[float] = []
+        self.positions: Dict[str, int] = {}
+        self.records: dict = {}
+        # 索引字段 -> 字段值 -> 序号列表
+        self.indexes: Dict[str, Dict[str, List[int]]] = {field: {} for field in fields}
+        # 时间桶 -> 序号列表, 及有序的时间桶列表
+        self.buckets: Dict[int, List[int]] = {}
+        self.bucket_ids: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: str, record, values: Dict[str, str], timestamp: Optional[float] = None) -> Tuple[int, bool]:
+        """写入记录, 返回序号及是否为新记录, timestamp 为空时使用到达时间"""
+        self.records[key] = record
+
+        position = self.positions.get(key)
+        if position is not None:
+            return position, False
+
+        position = len(self.keys)
+        if timestamp is None:
+            timestamp = time.time()
+
+        self.keys.append(key)
+        self.times.append(timestamp)
+        self.positions[key] = position
+        for field, value in values.items():
+            self.indexes[field].setdefault(value, []).append(position)
+
+        bucket_id = int(timestamp // TIME_BUCKET_SECONDS)
+        bucket = self.buckets.get(bucket_id)
+        if bucket is None:
+            bucket = self.buckets[bucket_id] = []
+            insort(self.bucket_ids, bucket_id)
+        bucket.append(position)
+        return position, True
+
+    def get(self, key: str):
+        return self.records.get(key)
+
+    def get_buckets(self, start: Optional[float], end: Optional[float]) -> List[List[int]]:
+        """覆盖时间区间的时间桶, 边界桶中的记录需再按时间判断"""
+        bucket_ids = self.bucket_ids
+        first = 0 if start is None else bisect_left(bucket_ids, int(start // TIME_BUCKET_SECONDS))
+        last = len(bucket_ids) if end is None else bisect_right(bucket_ids, int(end // TIME_BUCKET_SECONDS))
+        return [self.buckets[bucket_id] for bucket_id in bucket_ids[first:last]]
+
+    def get_candidates(self, field: str, values: List[str]) -> List[int]:
+        """二级索引中若干字段值对应的序号, 按序号排序"""
+        lists = [self.indexes[field].get(value, []) for value in values]
+        lists = [positions for positions in lists if positions]
+        if len(lists) <= 1:
+            return lists[0] if lists else []
+        return list(heapq.merge(*lists))
+
+    def query(
+        self,
+        candidates: List[Iterable[int]],
+        start: Optional[float],
+        end: Optional[float],
+        cursor: Optional[int],
+        match,
+        limit: int
+    ) -> Tuple[list, Optional[int]]:
+        """从最小的候选集合中按序号取一页满足条件的记录
+
+        candidates 为各筛选条件对应的有序序号集合, start/end 为记录时间区间,
+        都为空时扫描全部序号。返回记录列表及下一页游标, 没有更多记录时游标为 None。
+        """
+        lo = 0 if cursor is None else cursor + 1
+        smallest = min(candidates, key=len) if candidates else None
+        size = len(self.keys) - lo if smallest is None else len(smallest)
+
+        timed = start is not None or end is not None
+        buckets = self.get_buckets(start, end) if timed else []
+        if timed and sum(len(bucket) for bucket in buckets) < size:
+            positions = heapq.merge(*(iter_from(bucket, lo) for bucket in buckets))
+        elif smallest is None:
+            positions = range(lo, len(self.keys))
+        elif isinstance(smallest, list):
+            positions = iter_from(smallest, lo)
+        else:
+            positions = smallest
+
+        times = self.times
+        results = []
+        last = None
+        for position in positions:
+            if position < lo:
+                continue
+            if timed:
+                timestamp = times[position]
+                if (start is not None and timestamp < start) or (end is not None and timestamp > end):
+                    continue
+
+            record = self.records[self.keys[position]]
+            if not match(record):
+                continue
+
+            if len(results) == limit:
+                return results, last
+            results.append(record)
+            last = position
+        return results, None
+
+def iter_from(positions: List[int], lo: int) -> Iterator[int]:
+    """有序序号列表中不小于 lo 的部分"""
+    for i in range(bisect_left(positions, lo), len(positions)):
+        yield positions[i]
+
+class OrderStore:
+    """委托及成交存储
+
+    由 OmsHub 按回报到达顺序更新, 按合约、状态 (活动/结束)、策略及委托/成交
+    时间建立索引, 查询只遍历最小的候选集合, 并按游标分页。活动委托单独
+    维护, 查询活动委托的开销只与活动委托数量有关。
+    与 TickCache 相同, 只在 asyncio 事件循环中更新和读取, 无需加锁。
+    """
+
+    def __init__(self):
+        self.orders = RecordIndex("vt_symbol", "reference")
+        self.trades = RecordIndex("vt_symbol", "vt_orderid", "reference")
+        # 活动委托序号, 按序号递增排列
+        self.active_orders: Dict[int, None] = {}
+
+    def update_order(self, order: OrderData):
+        """更新委托及活动委托索引"""
+        position, _ = self.orders.add(
+            order.vt_orderid,
+            order,
+            {"vt_symbol": order.vt_symbol, "reference": order.reference},
+            get_timestamp(order)
+        )
+
+        if order.is_active():
+            self.active_orders[position] = None
+        else:
+            self.active_orders.pop(position, None)
+
+    def update_trade(self, trade: TradeData):
+        """写入成交, 成交按所属委托的 reference 建立策略索引"""
+        order = self.orders.get(trade.vt_orderid)
+        self.trades.add(
+            trade.vt_tradeid,
+            trade,
+            {
+                "vt_symbol": trade.vt_symbol,
+                "vt_orderid": trade.vt_orderid,
+                "reference": order.reference if order else ""
+            },
+            get_timestamp(trade)
+        )
+
+    def get_order(self, vt_orderid: str) -> Optional[OrderData]:
+        return self.orders.get(vt_orderid)
+
+    def get_trade(self, vt_tradeid: str) -> Optional[TradeData]:
+        return self.trades.get(vt_tradeid)
+
+    def get_active_orders(self) -> List[OrderData]:
+        """全部活动委托"""
+        orders = self.orders
+        return [orders.records[orders.keys[position]] for position in self.active_orders]
+
+    def query_orders(
+        self,
+        vt_symbol: Optional[str] = None,
+        status: Optional[str] = None,
+        strategy: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        cursor: Optional[int] = None,
+        limit: int = DEFAULT_PAGE_SIZE
+    ) -> Tuple[List[OrderData], Optional[int]]:
+        """按条件分页查询委托, start/end 为委托时间戳 (秒), 无效条件抛出 ValueError"""
+        if status and status not in ORDER_STATUSES:
+            raise ValueError(f"无效的委托状态: {status}, 可选 {', '.join(sorted(ORDER_STATUSES))}")
+        limit = check_limit(limit)
+
+        candidates = []
+        if vt_symbol:
+            candidates.append(self.orders.indexes["vt_symbol"].get(vt_symbol, []))
+        if strategy:
+            references = get_references(strategy)
+            candidates.append(self.orders.get_candidates("reference", references))
+        if status == STATUS_ACTIVE:
+            candidates.append(self.active_orders)
+
+        def match(order: OrderData) -> bool:
+            if vt_symbol and order.vt_symbol != vt_symbol:
+                return False
+            if strategy and order.reference not in references:
+                return False
+            if status and order.is_active() != (status == STATUS_ACTIVE):
+                return False
+            return True
+
+        return self.orders.query(candidates, start, end, cursor, match, limit)
+
+    def query_trades(
+        self,
+        vt_symbol: Optional[str] = None,
+        vt_orderid: Optional[str] = None,
+        strategy: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        cursor: Optional[int] = None,
+        limit: int = DEFAULT_PAGE_SIZE
+    ) -> Tuple[List[TradeData], Optional[int]]:
+        """按条件分页查询成交, 策略按成交所属委托的 reference 匹配"""
+        limit = check_limit(limit)
+
+        candidates = []
+        if vt_symbol:
+            candidates.append(self.trades.indexes["vt_symbol"].get(vt_symbol, []))
+        if vt_orderid:
+            candidates.append(self.trades.indexes["vt_orderid"].get(vt_orderid, []))
+        if strategy:
+            references = get_references(strategy)
+            candidates.append(self.trades.get_candidates("reference", references))
+
+        def match(trade: TradeData) -> bool:
+            if vt_symbol and trade.vt_symbol != vt_symbol:
+                return False
+            if vt_orderid and trade.vt_orderid != vt_orderid:
+                return False
+            if strategy:
+                order = self.orders.get(trade.vt_orderid)
+                if not order or order.reference not in references:
+                    return False
+            return True
+
+        return self.trades.query(candidates, start, end, cursor, match, limit)
+
+    def get_stats(self) -> dict:
+        """记录数统计"""
+        return {
+            "orders": len(self.orders),
+            "active_orders": len(self.active_orders),
+            "trades": len(self.trades)
+        }
+
+def get_timestamp(record) -> Optional[float]:
+    """委托或成交自带的时间戳, 网关未提供时为 None"""
+    return record.datetime.timestamp() if record.datetime else None
+
+def check_limit(limit: int) -> int:
+    """校验分页条数"""
+    if limit <= 0 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f"limit 必须在 1 到 {MAX_PAGE_SIZE} 之间")
+    return limit
+
+order_store = OrderStore()
@@ -0,0 +1,388 @@
+# 下单前置风控
+
+import heapq
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from vnpy.event import Event
+from vnpy.trader.constant import Direction, Offset
+from vnpy.trader.event import EVENT_ORDER, EVENT_POSITION, EVENT_TRADE
+from vnpy.trader.object import OrderData, OrderRequest, PositionData, TradeData
+
+from app.core.tick_cache import tick_cache
+from app.core.vnpy_engine import vnpy_engine
+from app.utils.config import settings
+
+# 风控规则
+RULE_ORDER_VOLUME = "order_volume"
+RULE_ORDER_NOTIONAL = "order_notional"
+RULE_SYMBOL_POSITION = "symbol_position"
+RULE_ACCOUNT_POSITION = "account_position"
+RULE_ORDER_RATE = "order_rate"
+RULE_SELF_TRADE = "self_trade"
+RULES = [
+    RULE_ORDER_VOLUME,
+    RULE_ORDER_NOTIONAL,
+    RULE_SYMBOL_POSITION,
+    RULE_ACCOUNT_POSITION,
+    RULE_ORDER_RATE,
+    RULE_SELF_TRADE
+]
+
+# 平仓类开平方向, 不增加持仓
+CLOSE_OFFSETS = {Offset.CLOSE, Offset.CLOSETODAY, Offset.CLOSEYESTERDAY}
+
+# 保留的已结束委托号数量, 用于识别下单返回前已结束的委托
+FINISHED_LIMIT = 10000
+
+# 合约方向, 如 ("rb2405.SHFE", Direction.LONG)
+SideKey = Tuple[str, Direction]
+
+class RiskError(ValueError):
+    """委托未通过风控检查"""
+
+    def __init__(self, rule: str, message: str):
+        super().__init__(f"风控拒绝: {message}")
+        self.rule = rule
+
+class TokenBucket:
+    """令牌桶, 每秒补充 rate 个令牌, 最多积累 capacity 个"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self) -> float:
+        """补充令牌, 返回当前令牌数"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+class PriceBook:
+    """同一合约方向上活动委托的价格, 用于查询最优价
+
+    价格计数与堆配合, 撤销的价格在堆顶时才移除, 均摊 O(log n)。最优价
+    长期不变时其下方撤销的价格不会到达堆顶, 失效条目超过有效价格数时
+    按当前价格重建堆, 堆的大小不超过有效价格数的两倍。
+    """
+
+    def __init__(self, direction: Direction):
+        # 多头取最高价, 空头取最低价, 堆中多头价格取负
+        self.sign = -1 if direction == Direction.LONG else 1
+        self.counts: Dict[float, int] = {}
+        self.heap: List[float] = []
+
+    def add(self, price: float):
+        count = self.counts.get(price, 0)
+        if not count:
+            heapq.heappush(self.heap, price * self.sign)
+        self.counts[price] = count + 1
+
+    def remove(self, price: float):
+        count = self.counts.get(price, 0)
+        if count <= 1:
+            self.counts.pop(price, None)
+            if len(self.heap) > 2 * len(self.counts):
+                self.rebuild()
+        else:
+            self.counts[price] = count - 1
+
+    def rebuild(self):
+        """按有效价格重建堆, 清除失效条目"""
+        self.heap = [price * self.sign for price in self.counts]
+        heapq.heapify(self.heap)
+
+    def best(self) -> Optional[float]:
+        """最优价格, 没有活动委托时返回 None"""
+        heap = self.heap
+        while heap:
+            price = heap[0] * self.sign
+            if price in self.counts:
+                return price
+            heapq.heappop(heap)
+        return None
+
+class OrderState:
+    """活动委托计入风控计数的部分"""
+
+    __slots__ = ["key", "is_open", "price", "remaining"]
+
+    def __init__(self, key: SideKey, is_open: bool, price: float):
+        self.key = key
+        self.is_open = is_open
+        self.price = price
+        self.remaining = 0.0
+
+class RiskEngine:
+    """下单前置风控
+
+    持仓、挂单量及活动委托价格由 EVENT_ORDER/EVENT_TRADE/EVENT_POSITION 在事件
+    线程中增量维护, 每笔委托的检查只做常数次字典查询, 不遍历委托或持仓。
+    检查在下单线程中执行, 通过后在发送前登记该委托, 同一批次的后续委托能
+    立即看到之前委托占用的额度。
+
+    持仓按合约方向统计, 开仓挂单量计入持仓额度; 网关推送持仓时以推送数据
+    为准, 两次推送之间由成交更新。限额为 0 时不检查该项。
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.started = False
+
+        self.max_order_volume = settings.RISK_MAX_ORDER_VOLUME
+        self.max_order_notional = settings.RISK_MAX_ORDER_NOTIONAL
+        self.max_symbol_position = settings.RISK_MAX_SYMBOL_POSITION
+        self.max_account_position = settings.RISK_MAX_ACCOUNT_POSITION
+        self.self_trade_check = settings.RISK_SELF_TRADE_CHECK
+        self.bucket = TokenBucket(settings.RISK_ORDER_RATE, settings.RISK_ORDER_BURST)
+
+        # 合约方向 -> 持仓量 / 活动开仓委托的未成交量
+        self.positions: Dict[SideKey, float] = {}
+        self.pending: Dict[SideKey, float] = {}
+        self.total_position = 0.0
+        self.total_pending = 0.0
+
+        # 合约方向 -> 活动委托价格
+        self.books: Dict[SideKey, PriceBook] = {}
+        self.orders: Dict[str, OrderState] = {}
+        self.finished: "OrderedDict[str, None]" = OrderedDict()
+
+        self.check_count = 0
+        self.rejects: Dict[str, int] = {rule: 0 for rule in RULES}
+
+    def start(self):
+        """载入当前持仓及活动委托并注册事件"""
+        if self.started:
+            return
+        self.started = True
+
+        main_engine = vnpy_engine.main_engine
+        with self.lock:
+            for position in main_engine.get_all_positions():
+                self.update_position(position)
+            for order in main_engine.get_all_active_orders():
+                self.update_order(order)
+
+        event_engine = vnpy_engine.event_engine
+        event_engine.register(EVENT_ORDER, self.process_order_event)
+        event_engine.register(EVENT_TRADE, self.process_trade_event)
+        event_engine.register(EVENT_POSITION, self.process_position_event)
+
+    def stop(self):
+        """注销事件"""
+        if not self.started:
+            return
+        self.started = False
+
+        event_engine = vnpy_engine.event_engine
+        event_engine.unregister(EVENT_ORDER, self.process_order_event)
+        event_engine.unregister(EVENT_TRADE, self.process_trade_event)
+        event_engine.unregister(EVENT_POSITION, self.process_position_event)
+
+    def check(self, req: OrderRequest):
+        """检查委托, 未通过时抛出 RiskError, 通过时消耗一个下单令牌"""
+        with self.lock:
+            self.check_count += 1
+            try:
+                self.check_order(req)
+            except RiskError as e:
+                self.rejects[e.rule] += 1
+                raise
+
+    def check_order(self, req: OrderRequest):
+        """依次检查各项限额, 需持有锁"""
+        volume = req.volume
+        vt_symbol = req.vt_symbol
+
+        if self.max_order_volume and volume > self.max_order_volume:
+            raise RiskError(RULE_ORDER_VOLUME, f"委托数量 {volume} 超过单笔上限 {self.max_order_volume}")
+
+        if self.max_order_notional:
+            notional = self.get_notional(req)
+            if notional > self.max_order_notional:
+                raise RiskError(
+                    RULE_ORDER_NOTIONAL,
+                    f"委托金额 {notional:.2f} 超过单笔上限 {self.max_order_notional}"
+                )
+
+        if req.offset not in CLOSE_OFFSETS:
+            key = (vt_symbol, req.direction)
+            exposure = self.positions.get(key, 0) + self.pending.get(key, 0) + volume
+            if self.max_symbol_position and exposure > self.max_symbol_position:
+                raise RiskError(
+                    RULE_SYMBOL_POSITION,
+                    f"{vt_symbol} {req.direction.value}头持仓及挂单 {exposure} 将超过上限 {self.max_symbol_position}"
+                )
+
+            total = self.total_position + self.total_pending + volume
+            if self.max_account_position and total > self.max_account_position:
+                raise RiskError(
+                    RULE_ACCOUNT_POSITION,
+                    f"账户总持仓及挂单 {total} 将超过上限 {self.max_account_position}"
+                )
+
+        if self.self_trade_check:
+            self.check_self_trade(req)
+
+        if self.bucket.rate:
+            if self.bucket.refill() < 1:
+                raise RiskError(RULE_ORDER_RATE, f"下单频率超过每秒 {self.bucket.rate} 笔")
+            self.bucket.tokens -= 1
+
+    def get_notional(self, req: OrderRequest) -> float:
+        """委托金额, 市价委托按最新价计算"""
+        price = req.price
+        if not price:
+            record = tick_cache.get(req.vt_symbol)
+            if not record or not record.last_price:
+                raise RiskError(RULE_ORDER_NOTIONAL, f"{req.vt_symbol} 暂无行情, 无法计算市价委托金额")
+            price = record.last_price
+
+        contract = vnpy_engine.main_engine.get_contract(req.vt_symbol)
+        size = contract.size if contract else 1
+        return price * req.volume * size
+
+    def check_self_trade(self, req: OrderRequest):
+        """新委托不能与自己的反向活动委托成交"""
+        opposite = Direction.SHORT if req.direction == Direction.LONG else Direction.LONG
+        book = self.books.get((req.vt_symbol, opposite))
+        best = book.best() if book else None
+        if best is None:
+            return
+
+        # 市价委托与任何反向挂单都可能成交
+        if (
+            not req.price
+            or (req.direction == Direction.LONG and req.price >= best)
+            or (req.direction == Direction.SHORT and req.price <= best)
+        ):
+            raise RiskError(
+                RULE_SELF_TRADE,
+                f"{req.vt_symbol} 价格 {req.price} 与自己的反向挂单 {best} 可能成交"
+            )
+
+    def add_order(self, req: OrderRequest, vt_orderid: str):
+        """登记下单线程刚发送的委托, 回报已先到达时忽略"""
+        with self.lock:
+            if vt_orderid in self.orders or vt_orderid in self.finished:
+                return
+            self.set_remaining(vt_orderid, req.vt_symbol, req.direction, req.offset, req.price, req.volume)
+
+    def process_order_event(self, event: Event):
+        with self.lock:
+            self.update_order(event.data)
+
+    def process_trade_event(self, event: Event):
+        """成交后更新持仓, 直到网关推送新的持仓数据"""
+        trade: TradeData = event.data
+        if not trade.direction:
+            return
+
+        with self.lock:
+            if trade.offset in CLOSE_OFFSETS:
+                direction = Direction.SHORT if trade.direction == Direction.LONG else Direction.LONG
+                self.add_position((trade.vt_symbol, direction), -trade.volume)
+            else:
+                self.add_position((trade.vt_symbol, trade.direction), trade.volume)
+
+    def process_position_event(self, event: Event):
+        with self.lock:
+            self.update_position(event.data)
+
+    def update_order(self, order: OrderData):
+        """按委托回报更新挂单量及价格, 需持有锁"""
+        if not order.direction:
+            return
+
+        remaining = order.volume - order.traded if order.is_active() else 0
+        self.set_remaining(
+            order.vt_orderid,
+            order.vt_symbol,
+            order.direction,
+            order.offset,
+            order.price,
+            remaining
+        )
+
+    def set_remaining(
+        self,
+        vt_orderid: str,
+        vt_symbol: str,
+        direction: Direction,
+        offset: Offset,
+        price: float,
+        remaining: float
+    ):
+        """更新委托的未成交量, 未成交量为 0 时视为结束, 需持有锁"""
+        state = self.orders.get(vt_orderid)
+        if not state:
+            if remaining <= 0:
+                self.add_finished(vt_orderid)
+                return
+
+            key = (vt_symbol, direction)
+            state = OrderState(key, offset not in CLOSE_OFFSETS, price)
+            self.orders[vt_orderid] = state
+            if price:
+                book = self.books.get(key)
+                if not book:
+                    book = self.books[key] = PriceBook(direction)
+                book.add(price)
+
+        remaining = max(remaining, 0)
+        if state.is_open:
+            delta = remaining - state.remaining
+            self.pending[state.key] = self.pending.get(state.key, 0) + delta
+            self.total_pending += delta
+        state.remaining = remaining
+
+        if not remaining:
+            del self.orders[vt_orderid]
+            if state.price:
+                self.books[state.key].remove(state.price)
+            self.add_finished(vt_orderid)
+
+    def add_finished(self, vt_orderid: str):
+        self.finished[vt_orderid] = None
+        if len(self.finished) > FINISHED_LIMIT:
+            self.finished.popitem(last=False)
+
+    def update_position(self, position: PositionData):
+        """以网关推送的持仓为准, 需持有锁"""
+        key = (position.vt_symbol, position.direction)
+        self.add_position(key, position.volume - self.positions.get(key, 0))
+
+    def add_position(self, key: SideKey, delta: float):
+        """调整持仓, 持仓不低于 0, 需持有锁"""
+        volume = self.positions.get(key, 0)
+        new_volume = max(volume + delta, 0)
+        self.positions[key] = new_volume
+        self.total_position += new_volume - volume
+
+    def get_stats(self) -> dict:
+        """风控限额、计数及各规则拒绝次数"""
+        with self.lock:
+            return {
+                "limits": {
+                    "max_order_volume": self.max_order_volume,
+                    "max_order_notional": self.max_order_notional,
+                    "max_symbol_position": self.max_symbol_position,
+                    "max_account_position": self.max_account_position,
+                    "order_rate": self.bucket.rate,
+                    "order_burst": self.bucket.capacity,
+                    "self_trade_check": self.self_trade_check
+                },
+                "total_position": self.total_position,
+                "total_pending": self.total_pending,
+                "active_orders": len(self.orders),
+                "order_tokens": round(self.bucket.refill(), 2),
+                "checks": self.check_count,
+                "rejects": dict(self.rejects)
+            }
+
+risk_engine = RiskEngine()
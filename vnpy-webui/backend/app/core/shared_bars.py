@@ -0,0 +1,199 @@
+# 回测历史数据共享内存缓存
+
+from collections import OrderedDict
+from datetime import datetime
+from multiprocessing import shared_memory
+from threading import Event, Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import DB_TZ
+from vnpy.trader.object import BarData
+
+from app.core.bar_resampler import BarArrays, load_bar_arrays
+from app.core.data_service import save_listeners
+from app.utils.config import settings
+
+# 共享内存中的列, 按列连续存放, datetime 为毫秒时间戳, 其余为 float64
+SHARED_COLUMNS = ["epoch", "open", "high", "low", "close", "volume", "turnover", "open_interest"]
+
+class SharedBarBlock:
+    """一段历史 K 线对应的共享内存"""
+
+    def __init__(self, arrays: BarArrays):
+        self.length = len(arrays["epoch"])
+        self.nbytes = max(self.length, 1) * 8 * len(SHARED_COLUMNS)
+        self.shm = shared_memory.SharedMemory(create=True, size=self.nbytes)
+
+        for name, column in get_column_views(self.shm, self.length).items():
+            column[:] = arrays[name]
+
+    def get_descriptor(self) -> dict:
+        """子进程附加共享内存所需的信息"""
+        return {"name": self.shm.name, "length": self.length}
+
+    def release(self):
+        """释放共享内存, 已附加的子进程映射不受影响"""
+        self.shm.close()
+        self.shm.unlink()
+
+def get_column_views(shm: shared_memory.SharedMemory, length: int) -> Dict[str, np.ndarray]:
+    """按列布局在共享内存上创建数组视图"""
+    views = {}
+    for i, name in enumerate(SHARED_COLUMNS):
+        dtype = np.int64 if name == "epoch" else np.float64
+        views[name] = np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=i * length * 8)
+    return views
+
+def get_history_key(config: dict) -> Tuple:
+    """回测配置对应的缓存键, 结束时间与 BacktestingEngine.set_parameters 一致取当天收盘"""
+    end = datetime.fromisoformat(config["end"]).replace(hour=23, minute=59, second=59)
+    return (
+        config["vt_symbol"],
+        config["interval"],
+        config["start"],
+        end.isoformat(),
+        config.get("data_version", 0),
+        config.get("data_stamp", "")
+    )
+
+class SharedBarCache:
+    """回测历史数据共享内存缓存
+
+    每个合约、周期、区间及数据版本只从数据库加载一次, 转换为列式数组后
+    写入共享内存, 进程池子进程按名称零拷贝附加。按总字节数 LRU 淘汰,
+    淘汰时 unlink 共享内存, 正在读取的子进程不受影响, 之后附加失败的
+    子进程回退为从数据库加载。
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.blocks: "OrderedDict[Tuple, SharedBarBlock]" = OrderedDict()
+        self.loading: Dict[Tuple, Event] = {}
+        self.lock = Lock()
+
+    def get(self, config: dict) -> Optional[dict]:
+        """获取回测历史数据的共享内存描述, 未缓存时加载, Tick 回测不使用共享内存"""
+        if config["interval"] == Interval.TICK.value:
+            return None
+
+        key = get_history_key(config)
+
+        while True:
+            with self.lock:
+                block = self.blocks.get(key)
+                if block:
+                    self.blocks.move_to_end(key)
+                    return block.get_descriptor()
+
+                # 同一数据正在由其他线程加载时等待其完成
+                event = self.loading.get(key)
+                if not event:
+                    event = self.loading[key] = Event()
+                    break
+            event.wait()
+
+        try:
+            block = self.load(key)
+        finally:
+            with self.lock:
+                self.loading.pop(key).set()
+
+        return block.get_descriptor() if block else None
+
+    def load(self, key: Tuple) -> Optional[SharedBarBlock]:
+        """从数据库加载并写入共享内存, 超过容量上限时不缓存"""
+        vt_symbol, interval, start, end = key[:4]
+        symbol, exchange = vt_symbol.rsplit(".", 1)
+        arrays = load_bar_arrays(
+            symbol,
+            Exchange(exchange),
+            Interval(interval),
+            datetime.fromisoformat(start),
+            datetime.fromisoformat(end)
+        )
+
+        block = SharedBarBlock(arrays)
+        if block.nbytes > self.max_bytes:
+            block.release()
+            return None
+
+        with self.lock:
+            self.blocks[key] = block
+            self.total_bytes += block.nbytes
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.blocks.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+                evicted.release()
+        return block
+
+    def invalidate(self, vt_symbol: str):
+        """合约数据更新后释放其缓存"""
+        with self.lock:
+            for key in [key for key in self.blocks if key[0] == vt_symbol]:
+                block = self.blocks.pop(key)
+                self.total_bytes -= block.nbytes
+                block.release()
+
+    def clear(self):
+        """释放全部共享内存"""
+        with self.lock:
+            for block in self.blocks.values():
+                block.release()
+            self.blocks.clear()
+            self.total_bytes = 0
+
+    def get_stats(self) -> dict:
+        """缓存统计"""
+        return {
+            "blocks": len(self.blocks),
+            "total_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes
+        }
+
+shared_bar_cache = SharedBarCache(settings.BACKTEST_SHARED_CACHE_MB * 1024 * 1024)
+save_listeners.append(shared_bar_cache.invalidate)
+
+def attach_bar_arrays(descriptor: dict) -> Tuple[shared_memory.SharedMemory, Dict[str, np.ndarray]]:
+    """子进程附加共享内存, 返回共享内存对象及列数组视图
+
+    共享内存由主进程创建和释放。进程池子进程与主进程共用同一个资源跟踪进程,
+    附加时的重复注册不会导致子进程退出时共享内存被清理。
+    """
+    try:
+        shm = shared_memory.SharedMemory(name=descriptor["name"], track=False)
+    except TypeError:
+        # Python 3.13 之前不支持 track 参数
+        shm = shared_memory.SharedMemory(name=descriptor["name"])
+    return shm, get_column_views(shm, descriptor["length"])
+
+def load_shared_bars(descriptor: dict, symbol: str, exchange: Exchange, interval: Interval) -> List[BarData]:
+    """从共享内存构建 BarData 列表, 共享内存已释放时抛出 FileNotFoundError"""
+    shm, arrays = attach_bar_arrays(descriptor)
+    try:
+        columns = {name: arrays[name].tolist() for name in SHARED_COLUMNS}
+    finally:
+        del arrays
+        shm.close()
+
+    return [
+        BarData(
+            symbol=symbol,
+            exchange=exchange,
+            datetime=datetime.fromtimestamp(epoch / 1000, DB_TZ),
+            interval=interval,
+            volume=volume,
+            turnover=turnover,
+            open_interest=open_interest,
+            open_price=open_price,
+            high_price=high_price,
+            low_price=low_price,
+            close_price=close_price,
+            gateway_name="DB"
+        )
+        for epoch, open_price, high_price, low_price, close_price, volume, turnover, open_interest
+        in zip(*columns.values())
+    ]
@@ -0,0 +1,89 @@
+# 最新 Tick 缓存
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from vnpy.trader.object import TickData
+
+# 推送给前端的 Tick 字段
+TICK_FIELDS = [
+    "name", "volume", "turnover", "open_interest",
+    "last_price", "last_volume", "limit_up", "limit_down",
+    "open_price", "high_price", "low_price", "pre_close",
+    "bid_price_1", "bid_price_2", "bid_price_3", "bid_price_4", "bid_price_5",
+    "ask_price_1", "ask_price_2", "ask_price_3", "ask_price_4", "ask_price_5",
+    "bid_volume_1", "bid_volume_2", "bid_volume_3", "bid_volume_4", "bid_volume_5",
+    "ask_volume_1", "ask_volume_2", "ask_volume_3", "ask_volume_4", "ask_volume_5",
+]
+
+class TickRecord:
+    """最新行情记录
+
+    使用 __slots__ 只保存推送所需字段, 单条记录远小于 TickData,
+    上万个合约常驻内存也不会有压力。
+    """
+
+    __slots__ = ["vt_symbol", "symbol", "exchange", "datetime"] + TICK_FIELDS
+
+    def __init__(self, tick: TickData):
+        self.vt_symbol: str = tick.vt_symbol
+        self.symbol: str = tick.symbol
+        self.exchange: str = tick.exchange.value
+        self.update(tick)
+
+    def update(self, tick: TickData):
+        """用最新 Tick 覆盖记录"""
+        self.datetime: Optional[datetime] = tick.datetime
+        for field in TICK_FIELDS:
+            setattr(self, field, getattr(tick, field))
+
+    def to_dict(self) -> dict:
+        """转换为字典"""
+        data = {
+            "symbol": self.symbol,
+            "exchange": self.exchange,
+            "vt_symbol": self.vt_symbol,
+            "datetime": self.datetime.isoformat() if self.datetime else None,
+        }
+        for field in TICK_FIELDS:
+            data[field] = getattr(self, field)
+        return data
+
+class TickCache:
+    """按 vt_symbol 保存每个合约的最新 Tick
+
+    只在 asyncio 事件循环中更新和读取, 无需加锁。
+    """
+
+    def __init__(self):
+        self.records: Dict[str, TickRecord] = {}
+        # symbol -> vt_symbol, 支持不带交易所的查询
+        self.symbol_map: Dict[str, str] = {}
+
+    def update(self, tick: TickData) -> TickRecord:
+        """更新缓存, 返回对应记录"""
+        record = self.records.get(tick.vt_symbol)
+        if record:
+            record.update(tick)
+        else:
+            record = TickRecord(tick)
+            self.records[record.vt_symbol] = record
+            self.symbol_map[record.symbol] = record.vt_symbol
+        return record
+
+    def get(self, symbol: str) -> Optional[TickRecord]:
+        """按 vt_symbol 或 symbol 查询最新 Tick"""
+        record = self.records.get(symbol)
+        if record:
+            return record
+
+        vt_symbol = self.symbol_map.get(symbol)
+        if vt_symbol:
+            return self.records.get(vt_symbol)
+        return None
+
+    def get_all(self) -> List[TickRecord]:
+        """所有合约的最新 Tick"""
+        return list(self.records.values())
+
+tick_cache = TickCache()
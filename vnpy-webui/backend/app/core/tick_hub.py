@@ -0,0 +1,60 @@
+# Tick 行情分发
+
+import asyncio
+from typing import Optional
+
+from vnpy.event import Event
+from vnpy.trader.event import EVENT_TICK
+from vnpy.trader.object import TickData
+
+from app.core.tick_cache import tick_cache
+from app.core.vnpy_engine import vnpy_engine
+from app.core.websocket import broadcast_tick
+
+class TickHub:
+    """Tick 分发中心
+
+    在 EventEngine 上只注册一次 EVENT_TICK, 将 Tick 从事件引擎线程
+    转交到 asyncio 事件循环, 更新最新行情缓存后推送给订阅了该合约的
+    WebSocket 连接。
+    """
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """启动分发, 需在事件循环中调用"""
+        if self.task:
+            return
+
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.task = loop.create_task(self.run())
+        vnpy_engine.event_engine.register(EVENT_TICK, self.process_tick_event)
+
+    def stop(self):
+        """停止分发"""
+        if not self.task:
+            return
+
+        vnpy_engine.event_engine.unregister(EVENT_TICK, self.process_tick_event)
+        self.task.cancel()
+        self.task = None
+
+    def process_tick_event(self, event: Event):
+        """EventEngine 线程回调, 不做任何阻塞操作"""
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, event.data)
+
+    async def run(self):
+        """按到达顺序更新缓存并推送 Tick"""
+        while True:
+            tick: TickData = await self.queue.get()
+            try:
+                record = tick_cache.update(tick)
+                await broadcast_tick(record)
+            except Exception as e:
+                print(f"Tick 推送失败: {e}")
+
+tick_hub = TickHub()
@@ -0,0 +1,287 @@
+# 向量化回测 (运行于进程池子进程)
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from vnpy.trader.constant import Direction, Exchange, Interval
+from vnpy.trader.database import DB_TZ
+from vnpy_ctastrategy.backtesting import BacktestingEngine
+
+from app.core.backtest_runner import (
+    PHASE_CALCULATING,
+    PHASE_LOADING,
+    PHASE_RUNNING,
+    BacktestCancelled,
+    get_daily_columns,
+    get_strategy_class,
+    is_cancelled,
+    report_progress,
+    to_python
+)
+from app.core.backtest_chart import build_chart, calculate_bar_equity, to_epoch
+from app.core.bar_resampler import BarArrays, load_bar_arrays
+from app.core.shared_bars import attach_bar_arrays, get_history_key
+
+# 回测引擎: event 逐 K 线事件驱动, vector 向量化
+ENGINE_EVENT = "event"
+ENGINE_VECTOR = "vector"
+ENGINE_MODES = {ENGINE_EVENT, ENGINE_VECTOR}
+
+# 成交模型: 收盘时的目标持仓在下一根 K 线开盘价成交, 与事件驱动回测的
+# 限价单撮合不同, 相同信号下两者的成交价和盈亏不可直接比较, 适用于参数筛选
+FILL_NEXT_OPEN = "next_open"
+
+# 策略类上声明的向量化信号函数名
+SIGNAL_FUNCTION = "vector_positions"
+
+# 子进程内缓存的列式历史数据及其共享内存
+ARRAY_CACHE_SIZE = 2
+array_cache: "OrderedDict[tuple, Tuple[object, BarArrays]]" = OrderedDict()
+
+def has_vector_signals(strategy_class: type) -> bool:
+    """策略是否声明了向量化信号函数"""
+    return callable(getattr(strategy_class, SIGNAL_FUNCTION, None))
+
+def get_strategy_setting(strategy_class: type, setting: dict) -> dict:
+    """策略参数默认值与回测参数合并"""
+    values = {name: getattr(strategy_class, name) for name in getattr(strategy_class, "parameters", [])}
+    values.update(setting)
+    return values
+
+def load_arrays(config: dict) -> BarArrays:
+    """加载列式历史数据, 优先零拷贝附加主进程的共享内存
+
+    同一进程内相同合约、区间及数据版本直接复用, 共享内存保持附加直到被淘汰。
+    共享内存中的数据可以覆盖比回测更长的区间, 按回测区间切片, 不复制数据。
+    """
+    key = get_history_key(config)
+    descriptor = config.get("history")
+    if descriptor:
+        shared_key = ("shared", descriptor["name"])
+        arrays = get_cached_arrays(shared_key)
+        if arrays is None:
+            try:
+                shm, arrays = attach_bar_arrays(descriptor)
+            except FileNotFoundError:
+                pass
+            else:
+                add_cached_arrays(shared_key, shm, arrays)
+
+        if arrays is not None:
+            return slice_arrays(arrays, key[2], key[3])
+
+    arrays = get_cached_arrays(key)
+    if arrays is None:
+        vt_symbol, interval, start, end = key[:4]
+        symbol, exchange = vt_symbol.rsplit(".", 1)
+        arrays = load_bar_arrays(
+            symbol,
+            Exchange(exchange),
+            Interval(interval),
+            datetime.fromisoformat(start),
+            datetime.fromisoformat(end)
+        )
+        add_cached_arrays(key, None, arrays)
+    return arrays
+
+def get_cached_arrays(key: tuple) -> Optional[BarArrays]:
+    """读取进程内缓存的列式数据"""
+    cached = array_cache.get(key)
+    if not cached:
+        return None
+    array_cache.move_to_end(key)
+    return cached[1]
+
+def add_cached_arrays(key: tuple, shm, arrays: BarArrays):
+    """缓存列式数据, 淘汰时关闭共享内存映射
+
+    缓存的数组设为只读, 传给策略信号函数的切片视图同样只读,
+    策略代码无法改写同一进程内其他回测及其他子进程共用的数据。
+    """
+    for column in arrays.values():
+        column.flags.writeable = False
+    array_cache[key] = (shm, arrays)
+    while len(array_cache) > ARRAY_CACHE_SIZE:
+        evicted_shm, evicted_arrays = array_cache.popitem(last=False)[1]
+        del evicted_arrays
+        if evicted_shm:
+            try:
+                evicted_shm.close()
+            except BufferError:
+                # 仍有数组视图被引用, 由垃圾回收释放映射
+                pass
+
+def slice_arrays(arrays: BarArrays, start: str, end: str) -> BarArrays:
+    """按回测区间切片, 返回视图"""
+    epoch = arrays["epoch"]
+    lo = int(np.searchsorted(epoch, to_epoch(datetime.fromisoformat(start)), side="left"))
+    hi = int(np.searchsorted(epoch, to_epoch(datetime.fromisoformat(end)), side="right"))
+    if lo == 0 and hi == len(epoch):
+        return arrays
+    return {name: column[lo:hi] for name, column in arrays.items()}
+
+def get_positions(config: dict, arrays: BarArrays, setting: dict) -> np.ndarray:
+    """调用策略的信号函数, 返回每根 K 线收盘后的目标持仓"""
+    strategy_class = get_strategy_class(config["class_name"])
+    if not strategy_class:
+        raise ValueError(f"策略 {config['class_name']} 不存在")
+    if not has_vector_signals(strategy_class):
+        raise ValueError(f"策略 {config['class_name']} 不支持向量化回测")
+
+    setting = get_strategy_setting(strategy_class, setting)
+    positions = np.asarray(getattr(strategy_class, SIGNAL_FUNCTION)(arrays, setting), dtype=np.float64)
+    if positions.shape != arrays["close"].shape:
+        raise ValueError("向量化信号长度与 K 线数量不一致")
+    return np.nan_to_num(positions)
+
+def simulate(config: dict, arrays: BarArrays, positions: np.ndarray) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """向量化撮合及逐日盈亏计算
+
+    收盘产生的目标持仓在下一根 K 线开盘价成交。逐日盈亏的计算方式与
+    vnpy DailyResult 相同: 持仓盈亏按日初持仓及前收盘价计算, 交易盈亏按
+    成交价与当日收盘价计算。返回逐日结果及成交所在的 K 线序号和数量。
+    """
+    size = config["size"]
+    open_price = arrays["open"]
+    close_price = arrays["close"]
+
+    # 第 i 根 K 线开盘后的持仓为第 i-1 根收盘时的目标持仓
+    holding = np.concatenate(([0.0], positions[:-1]))
+    change = np.diff(holding, prepend=0.0)
+    volume = np.abs(change)
+
+    # 按 K 线自然日分组, 与回测引擎使用 bar.datetime.date() 一致
+    local = pd.to_datetime(arrays["epoch"], unit="ms", utc=True).tz_convert(DB_TZ).tz_localize(None)
+    days = local.values.astype("datetime64[D]")
+    starts = np.flatnonzero(np.concatenate(([True], days[1:] != days[:-1])))
+    ends = np.append(starts[1:], len(days)) - 1
+
+    day_close = close_price[ends]
+    pre_close = np.concatenate(([1.0], day_close[:-1]))
+
+    pos_change = np.add.reduceat(change, starts)
+    end_pos = np.cumsum(pos_change)
+    start_pos = end_pos - pos_change
+
+    turnover = np.add.reduceat(volume * open_price, starts) * size
+    commission = turnover * config["rate"]
+    slippage = np.add.reduceat(volume, starts) * size * config["slippage"]
+
+    trading_pnl = (day_close * pos_change - np.add.reduceat(change * open_price, starts)) * size
+    holding_pnl = start_pos * (day_close - pre_close) * size
+    total_pnl = trading_pnl + holding_pnl
+
+    df = pd.DataFrame(
+        {
+            "close_price": day_close,
+            "pre_close": pre_close,
+            "trade_count": np.add.reduceat((change != 0).astype(np.int64), starts),
+            "start_pos": start_pos,
+            "end_pos": end_pos,
+            "turnover": turnover,
+            "commission": commission,
+            "slippage": slippage,
+            "trading_pnl": trading_pnl,
+            "holding_pnl": holding_pnl,
+            "total_pnl": total_pnl,
+            "net_pnl": total_pnl - commission - slippage
+        },
+        index=pd.Index(days[starts].astype(object), name="date")
+    )
+
+    index = np.flatnonzero(change)
+    return df, index, change[index]
+
+def create_statistics_engine(config: dict) -> BacktestingEngine:
+    """用于计算统计指标的回测引擎, 不添加策略"""
+    engine = BacktestingEngine()
+    engine.output = lambda msg: engine.logs.append(msg)
+    engine.set_parameters(
+        vt_symbol=config["vt_symbol"],
+        interval=Interval(config["interval"]),
+        start=datetime.fromisoformat(config["start"]),
+        end=datetime.fromisoformat(config["end"]),
+        rate=config["rate"],
+        slippage=config["slippage"],
+        size=config["size"],
+        pricetick=config["pricetick"],
+        capital=config["capital"]
+    )
+    return engine
+
+def calculate_vector_result(config: dict, setting: dict) -> Tuple[BacktestingEngine, dict, BarArrays, np.ndarray, np.ndarray]:
+    """向量化回测一组参数, 返回引擎、统计指标及成交"""
+    arrays = load_arrays(config)
+    if not len(arrays["close"]):
+        raise ValueError("回测区间内没有历史数据")
+
+    positions = get_positions(config, arrays, setting)
+    df, index, change = simulate(config, arrays, positions)
+
+    engine = create_statistics_engine(config)
+    engine.daily_df = df
+    statistics = engine.calculate_statistics(df, output=False)
+    return engine, statistics, arrays, index, change
+
+def run_vector_backtest(job_id: str, config: dict) -> dict:
+    """向量化执行单个回测, 返回结构与 run_backtest 相同"""
+    if is_cancelled(job_id):
+        raise BacktestCancelled()
+
+    report_progress(job_id, PHASE_LOADING, 0)
+    load_arrays(config)
+
+    report_progress(job_id, PHASE_RUNNING, 0)
+    engine, statistics, arrays, index, change = calculate_vector_result(config, config["parameters"])
+
+    report_progress(job_id, PHASE_CALCULATING, 1)
+    equity = calculate_bar_equity(arrays["epoch"], arrays["close"], index, change, arrays["open"][index], config)
+    return {
+        "statistics": {key: to_python(value) for key, value in statistics.items()},
+        "daily": get_daily_columns(engine),
+        "trades": get_vector_trade_rows(arrays, index, change),
+        "chart": build_chart(np.array(arrays["epoch"]), equity, engine.daily_df),
+        "fill_model": FILL_NEXT_OPEN
+    }
+
+def run_vector_optimization_chunk(job_id: str, config: dict, setting_list: List[dict], target_name: str) -> List[dict]:
+    """向量化回测一组参数, 返回结构与 run_optimization_chunk 相同"""
+    results = []
+
+    for setting in setting_list:
+        if is_cancelled(job_id):
+            raise BacktestCancelled()
+
+        _, statistics, _, _, _ = calculate_vector_result(config, {**config["parameters"], **setting})
+        if statistics and target_name not in statistics:
+            raise ValueError(f"无效的优化目标: {target_name}")
+
+        results.append({
+            "setting": setting,
+            "target": to_python(statistics.get(target_name)),
+            "statistics": {key: to_python(value) for key, value in statistics.items()}
+        })
+
+    return results
+
+def get_vector_trade_rows(arrays: BarArrays, index: np.ndarray, change: np.ndarray) -> List[dict]:
+    """向量化成交转换为与事件驱动回测相同格式的字典"""
+    times = pd.to_datetime(arrays["epoch"][index], unit="ms", utc=True).tz_convert(DB_TZ)
+    prices = arrays["open"][index].tolist()
+
+    return [
+        {
+            "tradeid": str(i + 1),
+            "orderid": "",
+            "datetime": dt.isoformat(),
+            "direction": (Direction.LONG if volume > 0 else Direction.SHORT).value,
+            "offset": "",
+            "price": price,
+            "volume": abs(volume)
+        }
+        for i, (dt, price, volume) in enumerate(zip(times, prices, change.tolist()))
+    ]
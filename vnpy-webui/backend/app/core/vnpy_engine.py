@@ -1,7 +1,10 @@
 # VnPy 引擎封装
 
+from typing import Dict, Set
+
 from vnpy.event import EventEngine
 from vnpy.trader.engine import MainEngine
+from vnpy.trader.constant import Exchange
 from vnpy.ctp.gateway import CtpGateway
 from vnpy_ctastrategy import CtaEngine
 
@@ -15,13 +18,23 @@ class VnPyEngine:
         self.main_engine = MainEngine(self.event_engine)
         self.cta_engine = None
         self.connected = False
+        # 已连接的交易网关, 下单时使用
+        self.gateway_name = "CTP"
+        # 行情订阅引用计数, 以及已向网关发出订阅的合约
+        self.subscription_counts: Dict[str, int] = {}
+        self.gateway_subscribed: Set[str] = set()
     
     def connect(self, gateway_setting: dict, gateway_name: str = "CTP"):
         """连接网关"""
         try:
             self.main_engine.add_gateway(CtpGateway, gateway_name)
             self.main_engine.connect(gateway_setting, gateway_name)
+            self.gateway_name = gateway_name
             self.connected = True
+            
+            # 补发连接前已登记的订阅
+            for vt_symbol in list(self.subscription_counts):
+                self.subscribe_gateway(vt_symbol)
             return True
         except Exception as e:
             print(f"连接失败: {e}")
@@ -65,16 +78,46 @@ class VnPyEngine:
         return oms_engine.get_all_contracts()
     
     def subscribe(self, symbol: str, exchange):
-        """订阅行情"""
+        """订阅行情, 同一合约只向网关订阅一次"""
+        vt_symbol = f"{symbol}.{Exchange(exchange).value}"
+        
+        count = self.subscription_counts.get(vt_symbol, 0)
+        self.subscription_counts[vt_symbol] = count + 1
+        
+        self.subscribe_gateway(vt_symbol)
+    
+    def subscribe_gateway(self, vt_symbol: str):
+        """向网关发送订阅请求"""
         from vnpy.trader.object import SubscribeRequest
         
+        # CTP 不支持退订, 已订阅过的合约无需重复发送请求
+        if vt_symbol in self.gateway_subscribed:
+            return
+        if not self.connected:
+            return
+        
+        symbol, exchange = vt_symbol.rsplit(".", 1)
         req = SubscribeRequest(
             symbol=symbol,
-            exchange=exchange
+            exchange=Exchange(exchange)
         )
-        self.main_engine.subscribe(req, "CTP")
+        self.main_engine.subscribe(req, self.gateway_name)
+        self.gateway_subscribed.add(vt_symbol)
+    
+    def unsubscribe(self, symbol: str, exchange):
+        """释放一次行情订阅引用"""
+        vt_symbol = f"{symbol}.{Exchange(exchange).value}"
+        
+        count = self.subscription_counts.get(vt_symbol, 0)
+        if count <= 1:
+            self.subscription_counts.pop(vt_symbol, None)
+        else:
+            self.subscription_counts[vt_symbol] = count - 1
     
     def close(self):
         """关闭连接"""
         # TODO: 实现关闭逻辑
         pass
+
+# 全局引擎实例, 各 API 模块共享同一个 EventEngine/MainEngine
+vnpy_engine = VnPyEngine()
@@ -1,39 +1,348 @@
 # WebSocket 处理
 
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import List
+from typing import Deque, Dict, List, Optional, Set, Union
+from collections import deque
 import asyncio
 import json
 from datetime import datetime
 
+from vnpy.trader.constant import Exchange
+
+from app.core.codec import (
+    ENCODING_JSON,
+    encode_batch,
+    encode_tick,
+    get_encodings,
+    get_layout,
+    get_symbol_id
+)
+from app.core.tick_cache import TickRecord, tick_cache
+from app.core.vnpy_engine import vnpy_engine
+from app.utils.config import settings
+
+# 发送队列策略
+QUEUE_POLICY_DROP_OLDEST = "drop_oldest"
+QUEUE_POLICY_CONFLATE = "conflate"
+QUEUE_POLICIES = {QUEUE_POLICY_DROP_OLDEST, QUEUE_POLICY_CONFLATE}
+
+# 批量发送窗口上限 (毫秒)
+MAX_BATCH_WINDOW_MS = 1000
+
+# 发送队列中全部为控制消息仍然溢出时关闭连接使用的状态码 (Try Again Later)
+CLOSE_CODE_OVERFLOW = 1013
+
+class ClientConnection:
+    """WebSocket 客户端连接
+
+    每个连接拥有独立的有界发送队列和发送任务, 慢客户端只会丢弃或合并
+    自己的消息, 不会阻塞其他连接。只有 Tick 会被丢弃或合并, 委托、成交等
+    带 seq 的消息及其他控制消息不丢弃; 队列中全部为控制消息仍然溢出时
+    关闭连接, 客户端重连后通过 resync 补齐, 不会出现无感知的缺口。
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        client_id: int,
+        maxsize: int,
+        policy: str,
+        encoding: str = ENCODING_JSON,
+        batch_window: float = 0
+    ):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.maxsize = maxsize
+        self.policy = policy
+        self.encoding = encoding
+        # 批量发送窗口 (秒), 0 表示逐条发送
+        self.batch_window = batch_window
+        self.symbols: Set[str] = set()
+
+        # 队列元素为 [key, payload], key 为 vt_symbol 时可被合并
+        # payload 为 str 时发送文本帧, 为 bytes 时发送二进制帧
+        self.queue: Deque[list] = deque()
+        self.pending: Dict[str, list] = {}
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+        self.sent_count = 0
+        self.batch_count = 0
+        self.dropped_count = 0
+        self.conflated_count = 0
+
+    def start(self):
+        """启动发送任务"""
+        self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        """停止发送任务"""
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def put(self, payload: Union[str, bytes], key: Optional[str] = None):
+        """消息入队, 不等待网络发送"""
+        if key and self.policy == QUEUE_POLICY_CONFLATE:
+            item = self.pending.get(key)
+            if item:
+                item[1] = payload
+                self.conflated_count += 1
+                return
+
+        if len(self.queue) >= self.maxsize and not self.drop_oldest_tick():
+            self.dropped_count += 1
+            if not key:
+                self.close_overflowed()
+            return
+
+        item = [key, payload]
+        self.queue.append(item)
+        if key:
+            self.pending[key] = item
+        self.ready.set()
+
+    def drop_oldest_tick(self) -> bool:
+        """丢弃队列中最早的 Tick, 没有 Tick 时返回 False"""
+        for i, item in enumerate(self.queue):
+            key = item[0]
+            if not key:
+                continue
+
+            del self.queue[i]
+            if self.pending.get(key) is item:
+                del self.pending[key]
+            self.dropped_count += 1
+            return True
+        return False
+
+    def close_overflowed(self):
+        """控制消息无法入队时断开连接"""
+        manager.disconnect(self.websocket)
+        asyncio.create_task(close_websocket(self.websocket, CLOSE_CODE_OVERFLOW))
+
+    async def run(self):
+        """按顺序发送队列中的消息"""
+        try:
+            while True:
+                await self.ready.wait()
+
+                if self.batch_window:
+                    # 等待窗口结束, 窗口内的消息合并为一帧发送
+                    await asyncio.sleep(self.batch_window)
+                    self.ready.clear()
+                    items = list(self.queue)
+                    self.queue.clear()
+                    self.pending.clear()
+                    await self.send_batch(items)
+                    continue
+
+                while self.queue:
+                    key, payload = self.queue.popleft()
+                    if key:
+                        self.pending.pop(key, None)
+                    await self.send_payload(payload)
+                self.ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            manager.disconnect(self.websocket)
+
+    async def send_payload(self, payload: Union[str, bytes]):
+        """发送单帧"""
+        if isinstance(payload, bytes):
+            await self.websocket.send_bytes(payload)
+        else:
+            await self.websocket.send_text(payload)
+        self.sent_count += 1
+
+    async def send_batch(self, items: List[list]):
+        """同一合约只保留最新 Tick, 控制消息保持原有顺序"""
+        ticks: Dict[str, Union[str, bytes]] = {}
+
+        for key, payload in items:
+            if not key:
+                await self.flush_ticks(ticks)
+                ticks = {}
+                await self.send_payload(payload)
+                continue
+
+            if key in ticks:
+                self.conflated_count += 1
+            ticks[key] = payload
+
+        await self.flush_ticks(ticks)
+
+    async def flush_ticks(self, ticks: Dict[str, Union[str, bytes]]):
+        """将多个 Tick 打包为一帧"""
+        if not ticks:
+            return
+
+        if len(ticks) == 1:
+            payload = next(iter(ticks.values()))
+        else:
+            payload = encode_batch(list(ticks.values()), self.encoding)
+            self.batch_count += 1
+        await self.send_payload(payload)
+
+    def get_stats(self) -> dict:
+        """连接统计"""
+        return {
+            "client_id": self.client_id,
+            "policy": self.policy,
+            "encoding": self.encoding,
+            "symbols": len(self.symbols),
+            "queued": len(self.queue),
+            "batch_ms": int(self.batch_window * 1000),
+            "sent": self.sent_count,
+            "batches": self.batch_count,
+            "dropped": self.dropped_count,
+            "conflated": self.conflated_count
+        }
+
+async def close_websocket(websocket: WebSocket, code: int):
+    """关闭连接, 忽略已关闭的连接"""
+    try:
+        await websocket.close(code=code)
+    except Exception:
+        pass
+
 # 存储 WebSocket 连接
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        # vt_symbol -> 订阅该合约的连接
+        self.symbol_connections: Dict[str, Set[ClientConnection]] = {}
+        self.client_count = 0
     
-    async def connect(self, websocket: WebSocket):
+    async def connect(
+        self,
+        websocket: WebSocket,
+        policy: Optional[str] = None,
+        encoding: Optional[str] = None,
+        batch_ms: Optional[int] = None
+    ) -> ClientConnection:
         """接受连接"""
+        if policy not in QUEUE_POLICIES:
+            policy = settings.WS_QUEUE_POLICY
+        if encoding not in get_encodings():
+            encoding = ENCODING_JSON
+        if batch_ms is None:
+            batch_ms = settings.WS_BATCH_WINDOW_MS
+        batch_ms = min(max(batch_ms, 0), MAX_BATCH_WINDOW_MS)
+
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.client_count += 1
+        client = ClientConnection(
+            websocket,
+            self.client_count,
+            settings.WS_QUEUE_SIZE,
+            policy,
+            encoding,
+            batch_ms / 1000
+        )
+        client.start()
+        self.active_connections[websocket] = client
+
+        # 控制消息始终为 JSON 文本帧, 告知非 JSON 客户端行情帧布局
+        if encoding != ENCODING_JSON:
+            self.send(websocket, {
+                "type": "connected",
+                "encoding": encoding,
+                "layout": get_layout(encoding)
+            })
+        return client
     
     def disconnect(self, websocket: WebSocket):
         """断开连接"""
-        self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if not client:
+            return
+        client.stop()
+        for vt_symbol in client.symbols:
+            self.remove_subscriber(client, vt_symbol)
+        client.symbols.clear()
+    
+    def subscribe(self, websocket: WebSocket, vt_symbol: str):
+        """记录连接订阅的合约, 第一个订阅者触发网关订阅"""
+        client = self.active_connections.get(websocket)
+        if not client or vt_symbol in client.symbols:
+            return
+        client.symbols.add(vt_symbol)
+        
+        connections = self.symbol_connections.setdefault(vt_symbol, set())
+        connections.add(client)
+        if len(connections) == 1:
+            symbol, exchange = vt_symbol.rsplit(".", 1)
+            vnpy_engine.subscribe(symbol, exchange)
+    
+    def unsubscribe(self, websocket: WebSocket, vt_symbol: str):
+        """移除连接订阅的合约"""
+        client = self.active_connections.get(websocket)
+        if not client or vt_symbol not in client.symbols:
+            return
+        client.symbols.remove(vt_symbol)
+        self.remove_subscriber(client, vt_symbol)
+    
+    def remove_subscriber(self, client: ClientConnection, vt_symbol: str):
+        """从合约索引中移除连接, 最后一个订阅者离开时释放网关订阅"""
+        connections = self.symbol_connections.get(vt_symbol)
+        if not connections:
+            return
+        connections.discard(client)
+        if not connections:
+            del self.symbol_connections[vt_symbol]
+            symbol, exchange = vt_symbol.rsplit(".", 1)
+            vnpy_engine.unsubscribe(symbol, exchange)
+    
+    def send(self, websocket: WebSocket, message: dict, key: Optional[str] = None):
+        """发送消息给单个连接"""
+        client = self.active_connections.get(websocket)
+        if client:
+            client.put(json.dumps(message, ensure_ascii=False), key)
     
     async def broadcast(self, message: dict):
         """广播消息"""
         if self.active_connections:
-            for connection in self.active_connections:
-                try:
-                    await connection.send_json(message)
-                except:
-                    self.active_connections.remove(connection)
+            text = json.dumps(message, ensure_ascii=False)
+            for client in self.active_connections.values():
+                client.put(text)
+    
+    def send_tick(self, websocket: WebSocket, record: TickRecord):
+        """按连接协商的编码发送单个 Tick"""
+        client = self.active_connections.get(websocket)
+        if client:
+            client.put(encode_tick(record, client.encoding), record.vt_symbol)
+    
+    def publish_tick(self, record: TickRecord):
+        """只推送给订阅了该合约的连接, 每种编码只序列化一次"""
+        connections = self.symbol_connections.get(record.vt_symbol)
+        if not connections:
+            return
+        
+        payloads: Dict[str, Union[str, bytes]] = {}
+        for client in connections:
+            payload = payloads.get(client.encoding)
+            if payload is None:
+                payload = encode_tick(record, client.encoding)
+                payloads[client.encoding] = payload
+            client.put(payload, record.vt_symbol)
+    
+    def get_stats(self) -> List[dict]:
+        """所有连接的发送统计"""
+        return [client.get_stats() for client in self.active_connections.values()]
 
 manager = ConnectionManager()
 
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket 端点"""
-    await manager.connect(websocket)
+    batch_ms = websocket.query_params.get("batch_ms")
+    await manager.connect(
+        websocket,
+        websocket.query_params.get("policy"),
+        websocket.query_params.get("encoding"),
+        int(batch_ms) if batch_ms and batch_ms.isdigit() else None
+    )
     
     try:
         while True:
@@ -48,9 +357,12 @@ async def websocket_endpoint(websocket: WebSocket):
             elif message["type"] == "unsubscribe_quote":
                 # 取消订阅行情
                 await handle_unsubscribe_quote(websocket, message)
+            elif message["type"] == "resync":
+                # 断线重连后补齐委托、成交、持仓及账户
+                await handle_resync(websocket, message)
             else:
                 # 未知消息类型
-                await websocket.send_json({
+                manager.send(websocket, {
                     "type": "error",
                     "message": f"未知消息类型: {message['type']}"
                 })
@@ -66,59 +378,121 @@ async def handle_subscribe_quote(websocket: WebSocket, message: dict):
     symbol = message.get("symbol")
     exchange = message.get("exchange")
     
-    # TODO: 实现订阅逻辑
-    await websocket.send_json({
+    if not symbol or exchange not in Exchange._value2member_map_:
+        manager.send(websocket, {
+            "type": "error",
+            "message": f"无效的合约: {symbol}.{exchange}"
+        })
+        return
+    
+    vt_symbol = f"{symbol}.{exchange}"
+    manager.subscribe(websocket, vt_symbol)
+    manager.send(websocket, {
         "type": "quote_subscribed",
         "symbol": symbol,
         "exchange": exchange,
+        "symbol_id": get_symbol_id(vt_symbol),
         "message": f"已订阅 {symbol} 行情"
     })
+    
+    # 立即推送缓存的最新行情, 无需等待下一个 Tick
+    record = tick_cache.get(vt_symbol)
+    if record:
+        manager.send_tick(websocket, record)
 
 async def handle_unsubscribe_quote(websocket: WebSocket, message: dict):
     """处理取消订阅"""
     symbol = message.get("symbol")
     exchange = message.get("exchange")
     
-    # TODO: 实现取消订阅逻辑
-    await websocket.send_json({
+    manager.unsubscribe(websocket, f"{symbol}.{exchange}")
+    manager.send(websocket, {
         "type": "quote_unsubscribed",
         "symbol": symbol,
         "exchange": exchange,
         "message": f"已取消订阅 {symbol} 行情"
     })
 
-async def broadcast_tick(tick: dict):
-    """广播 Tick 数据"""
+async def handle_resync(websocket: WebSocket, message: dict):
+    """处理增量同步
+
+    客户端发送上次收到的最大 seq 及 session, 返回之后变化的记录。返回的
+    seq 为当前序号, 之后推送的 order/trade/position/account 消息中 seq
+    不大于该值的可以忽略; full 为 true 时客户端应以返回数据替换本地数据。
+    """
+    from app.core.oms_hub import COLLECTIONS, oms_hub
+
+    since_seq = message.get("since_seq")
+    if since_seq is not None and not isinstance(since_seq, int):
+        manager.send(websocket, {
+            "type": "error",
+            "message": f"无效的 since_seq: {since_seq}"
+        })
+        return
+
+    manager.send(websocket, {
+        "type": "resync",
+        **oms_hub.get_delta(COLLECTIONS, since_seq, message.get("session"))
+    })
+
+async def broadcast_tick(record: TickRecord):
+    """推送 Tick 数据给订阅者"""
+    manager.publish_tick(record)
+
+async def broadcast_order(order: dict, seq: int):
+    """广播委托回报, seq 为增量同步序号"""
     message = {
-        "type": "tick",
-        "data": tick,
+        "type": "order",
+        "seq": seq,
+        "data": order,
         "timestamp": datetime.now().isoformat()
     }
     await manager.broadcast(message)
 
-async def broadcast_trade(trade: dict):
-    """广播成交数据"""
+async def broadcast_trade(trade: dict, seq: int):
+    """广播成交数据, seq 为增量同步序号"""
     message = {
         "type": "trade",
+        "seq": seq,
         "data": trade,
         "timestamp": datetime.now().isoformat()
     }
     await manager.broadcast(message)
 
-async def broadcast_position(position: dict):
-    """广播持仓数据"""
+async def broadcast_position(position: dict, seq: int):
+    """广播持仓数据, seq 为增量同步序号"""
     message = {
         "type": "position",
+        "seq": seq,
         "data": position,
         "timestamp": datetime.now().isoformat()
     }
     await manager.broadcast(message)
 
-async def broadcast_account(account: dict):
-    """广播账户数据"""
+async def broadcast_account(account: dict, seq: int):
+    """广播账户数据, seq 为增量同步序号"""
     message = {
         "type": "account",
+        "seq": seq,
         "data": account,
         "timestamp": datetime.now().isoformat()
     }
     await manager.broadcast(message)
+
+async def broadcast_data_import(progress: dict):
+    """广播数据导入进度"""
+    message = {
+        "type": "data_import",
+        "data": progress,
+        "timestamp": datetime.now().isoformat()
+    }
+    await manager.broadcast(message)
+
+async def broadcast_backtest(job: dict):
+    """广播回测任务状态"""
+    message = {
+        "type": "backtest",
+        "data": job,
+        "timestamp": datetime.now().isoformat()
+    }
+    await manager.broadcast(message)
@@ -4,6 +4,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import uvicorn
+import asyncio
 import os
 
 # 创建应用实例
@@ -36,6 +37,31 @@ app.include_router(trade.router, prefix="/api/trade", tags=["交易"])
 app.include_router(data.router, prefix="/api/data", tags=["数据"])
 app.include_router(report.router, prefix="/api/reports", tags=["报表"])
 
+from app.core.tick_hub import tick_hub
+from app.core.backtest_jobs import backtest_job_manager
+from app.core.order_router import order_router
+from app.core.oms_hub import oms_hub
+from app.core.risk_engine import risk_engine
+
+@app.on_event("startup")
+async def startup():
+    """启动 Tick 分发、风控、委托路由、OMS 数据分发及回测任务管理"""
+    loop = asyncio.get_running_loop()
+    tick_hub.start(loop)
+    risk_engine.start()
+    order_router.start()
+    oms_hub.start(loop)
+    backtest_job_manager.start(loop)
+
+@app.on_event("shutdown")
+async def shutdown():
+    """停止 Tick 分发、风控、委托路由、OMS 数据分发及回测任务管理"""
+    tick_hub.stop()
+    risk_engine.stop()
+    order_router.stop()
+    oms_hub.stop()
+    backtest_job_manager.stop()
+
 # 根路由
 @app.get("/")
 async def root():
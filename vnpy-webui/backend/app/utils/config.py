@@ -22,6 +22,51 @@ class Settings(BaseSettings):
     # WebSocket 配置
     WS_HOST: str = os.getenv("WS_HOST", "0.0.0.0")
     WS_PORT: int = int(os.getenv("WS_PORT", "8000"))
+    # 每个连接的发送队列长度及溢出策略: drop_oldest / conflate
+    WS_QUEUE_SIZE: int = int(os.getenv("WS_QUEUE_SIZE", "1000"))
+    WS_QUEUE_POLICY: str = os.getenv("WS_QUEUE_POLICY", "conflate")
+    # Tick 批量发送窗口 (毫秒), 0 表示逐条发送
+    WS_BATCH_WINDOW_MS: int = int(os.getenv("WS_BATCH_WINDOW_MS", "0"))
+
+    # 交易配置
+    # 批量下单及批量撤单每次请求的委托数上限
+    TRADE_BATCH_MAX_ORDERS: int = int(os.getenv("TRADE_BATCH_MAX_ORDERS", "100"))
+    # 下单前置风控, 限额为 0 时不检查该项
+    # 单笔委托数量及金额上限
+    RISK_MAX_ORDER_VOLUME: float = float(os.getenv("RISK_MAX_ORDER_VOLUME", "100"))
+    RISK_MAX_ORDER_NOTIONAL: float = float(os.getenv("RISK_MAX_ORDER_NOTIONAL", "0"))
+    # 单个合约单方向及账户全部的持仓与开仓挂单量上限
+    RISK_MAX_SYMBOL_POSITION: float = float(os.getenv("RISK_MAX_SYMBOL_POSITION", "500"))
+    RISK_MAX_ACCOUNT_POSITION: float = float(os.getenv("RISK_MAX_ACCOUNT_POSITION", "2000"))
+    # 下单频率: 每秒补充的令牌数及令牌桶容量 (允许的连续下单笔数)
+    RISK_ORDER_RATE: float = float(os.getenv("RISK_ORDER_RATE", "20"))
+    RISK_ORDER_BURST: float = float(os.getenv("RISK_ORDER_BURST", "100"))
+    # 禁止与自己的反向挂单成交
+    RISK_SELF_TRADE_CHECK: bool = os.getenv("RISK_SELF_TRADE_CHECK", "true").lower() == "true"
+
+    # 数据配置
+    # 合成周期 K 线缓存的最大条目数
+    DATA_RESAMPLE_CACHE_SIZE: int = int(os.getenv("DATA_RESAMPLE_CACHE_SIZE", "64"))
+    # 导入时每次读取的行数及每次写入数据库的条数
+    DATA_IMPORT_CHUNK_ROWS: int = int(os.getenv("DATA_IMPORT_CHUNK_ROWS", "100000"))
+    DATA_IMPORT_BATCH_SIZE: int = int(os.getenv("DATA_IMPORT_BATCH_SIZE", "50000"))
+    # 数据库数据概要的缓存秒数, 其他程序直接写入数据库的数据最多延迟该时间后生效
+    DATA_STAMP_TTL: float = float(os.getenv("DATA_STAMP_TTL", "5"))
+
+    # 回测配置
+    # 策略目录, 其中的 CtaTemplate 子类与 vnpy_ctastrategy 自带策略一起可用于回测
+    STRATEGY_PATH: str = os.getenv("STRATEGY_PATH", "../../strategies")
+    # 回测进程数, 0 表示使用 CPU 核数
+    BACKTEST_MAX_WORKERS: int = int(os.getenv("BACKTEST_MAX_WORKERS", "0"))
+    # 等待执行的回测任务上限
+    BACKTEST_QUEUE_SIZE: int = int(os.getenv("BACKTEST_QUEUE_SIZE", "50"))
+    # 参数优化的组合数上限及每个子任务包含的组合数
+    BACKTEST_OPTIMIZATION_MAX_SETTINGS: int = int(os.getenv("BACKTEST_OPTIMIZATION_MAX_SETTINGS", "100000"))
+    BACKTEST_OPTIMIZATION_CHUNK_SIZE: int = int(os.getenv("BACKTEST_OPTIMIZATION_CHUNK_SIZE", "16"))
+    # 回测历史数据共享内存缓存上限 (MB)
+    BACKTEST_SHARED_CACHE_MB: int = int(os.getenv("BACKTEST_SHARED_CACHE_MB", "1024"))
+    # 回测结果保存目录
+    BACKTEST_RESULT_PATH: str = os.getenv("BACKTEST_RESULT_PATH", "./database/backtests")
 
     # API 配置
     API_PREFIX: str = "/api"